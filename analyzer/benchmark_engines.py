@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分析引擎吞吐量基准测试
+使用模拟的Oracle驱动（每次字典查询固定延迟、会话数有上限）比较线程引擎和异步引擎的吞吐量，
+不需要连接真实数据库，也不写入Markdown和MySQL
+
+用法:
+    python benchmark_engines.py --tables 2000 --latency 0.02 --concurrency 10 --async-concurrency 200
+"""
+
+import time
+import asyncio
+import argparse
+import threading
+import contextlib
+import io
+from datetime import datetime
+
+import oracle_db_analyzer as analyzer
+
+
+def fake_rows(query, params):
+    """根据查询语句返回模拟的字典数据，结构与真实查询一致"""
+    table_name = params['table_name']
+    if query is analyzer.TABLE_COLUMNS_QUERY:
+        return [(f"COL{i}", 'VARCHAR2', 50, 'Y', None, f"列{i}", i, None, None) for i in range(1, 21)]
+    if query is analyzer.PRIMARY_KEYS_QUERY:
+        return [('COL1',)]
+    if query is analyzer.FOREIGN_KEYS_QUERY:
+        return []
+    if query is analyzer.INDICES_QUERY:
+        return [(f"PK_{table_name}", 'NORMAL', 'UNIQUE', 'COL1', 'VALID')]
+    raise ValueError("模拟驱动不支持该查询")
+
+
+class FakeCursor:
+    """模拟cx_Oracle游标，每次execute阻塞latency秒"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.arraysize = 100
+        self._rows = []
+
+    def execute(self, query, params=None):
+        time.sleep(self.latency)
+        self._rows = fake_rows(query, params)
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """模拟cx_Oracle连接"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.callTimeout = 0
+
+    def cursor(self):
+        return FakeCursor(self.latency)
+
+
+class FakePool:
+    """模拟cx_Oracle.SessionPool：最多max个会话，会话用尽时等待"""
+
+    def __init__(self, max_size, latency):
+        self.max = max_size
+        self.latency = latency
+        self._sessions = threading.BoundedSemaphore(max_size)
+
+    def acquire(self):
+        self._sessions.acquire()
+        return FakeConnection(self.latency)
+
+    def release(self, connection):
+        self._sessions.release()
+
+    def drop(self, connection):
+        self._sessions.release()
+
+
+class FakeAsyncCursor:
+    """模拟python-oracledb异步游标，每次execute等待latency秒"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self._rows = []
+
+    async def execute(self, query, params=None):
+        await asyncio.sleep(self.latency)
+        self._rows = fake_rows(query, params)
+
+    async def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakeAsyncConnection:
+    """模拟python-oracledb异步连接"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.call_timeout = 0
+
+    def cursor(self):
+        return FakeAsyncCursor(self.latency)
+
+
+class FakeAsyncPool:
+    """模拟python-oracledb异步连接池：最多max个会话，会话用尽时等待"""
+
+    def __init__(self, max_size, latency):
+        self.max = max_size
+        self.latency = latency
+        self._sessions = None
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        # 信号量需要在事件循环内创建
+        if self._sessions is None:
+            self._sessions = asyncio.Semaphore(self.max)
+        async with self._sessions:
+            yield FakeAsyncConnection(self.latency)
+
+
+def make_tables(count):
+    """生成模拟的表列表，结构与get_all_tables一致"""
+    now = datetime.now()
+    return [('BENCH', f"TABLE_{i:06d}", 'USERS', 'VALID', 1000, now, f"表{i}", now) for i in range(count)]
+
+
+def run_thread_engine(tables, concurrency, latency):
+    """运行线程引擎，返回耗时秒数"""
+    pool = FakePool(concurrency + 2, latency)
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.analyze_tables_with_pool(tables, pool, None, None, concurrency, extract_mode='table')
+    return time.time() - start_time
+
+
+def run_async_engine(tables, concurrency, latency):
+    """运行异步引擎，返回耗时秒数"""
+    pool = FakeAsyncPool(concurrency, latency)
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(analyzer.analyze_tables_async(tables, pool, None, None, concurrency))
+    return time.time() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析引擎吞吐量基准测试（模拟驱动）")
+    parser.add_argument("--tables", type=int, default=2000, help="模拟的表数")
+    parser.add_argument("--latency", type=float, default=0.02, help="每次字典查询的模拟延迟（秒）")
+    parser.add_argument("--concurrency", type=int, default=10, help="线程引擎的并发线程数")
+    parser.add_argument("--async-concurrency", type=int, default=200, help="异步引擎的在途查询数")
+    args = parser.parse_args()
+
+    tables = make_tables(args.tables)
+    print(f"模拟 {args.tables} 个表，每表4次查询，每次查询延迟 {args.latency * 1000:.0f}ms")
+
+    for name, runner, concurrency in (
+        ('thread', run_thread_engine, args.concurrency),
+        ('async', run_async_engine, args.async_concurrency),
+    ):
+        elapsed = runner(tables, concurrency, args.latency)
+        print(f"{name:>6} 引擎（并发 {concurrency}）: 耗时 {elapsed:.2f} 秒，{len(tables) / elapsed:.1f} 表/秒")
+
+
+if __name__ == "__main__":
+    main()
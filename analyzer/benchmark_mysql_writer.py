@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+MySQL写入基准测试
+使用模拟的pymysql连接（每次往返固定延迟）比较逐行写入（每行一条INSERT，另查一次表ID并无条件删除四张子表）
+和当前写入方式（LAST_INSERT_ID(id)取回表ID、executemany多行INSERT）在首次写入目录时的往返次数和耗时，
+不需要连接真实数据库
+
+用法:
+    python benchmark_mysql_writer.py --tables 500 --columns 200 --latency 0.0005
+"""
+
+import re
+import time
+import argparse
+import contextlib
+import io
+import itertools
+from datetime import datetime
+
+import oracle_db_analyzer as analyzer
+
+# pymysql的executemany只把 INSERT ... VALUES 改写为多行语句，其余语句逐行执行
+INSERT_VALUES_RE = re.compile(r"^\s*INSERT\s.+\sVALUES\s*\(", re.IGNORECASE | re.DOTALL)
+
+
+class FakeMySQLCursor:
+    """模拟pymysql游标：每次往返阻塞latency秒，目录为空表，插入总是新增行"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def execute(self, query, params=None):
+        self.connection.round_trip()
+        self.rowcount = 1
+        self.lastrowid = next(self.connection.ids)
+        return self.rowcount
+
+    def executemany(self, query, rows):
+        rows = list(rows)
+        if INSERT_VALUES_RE.match(query):
+            # 多行INSERT按max_stmt_length拆分，这里的行较短，视为一次往返
+            self.connection.round_trip()
+        else:
+            for _ in rows:
+                self.connection.round_trip()
+        self.rowcount = len(rows)
+        return self.rowcount
+
+    def fetchone(self):
+        return (self.lastrowid,)
+
+    def fetchall(self):
+        return []
+
+
+class FakeMySQLConnection:
+    """模拟pymysql连接，统计往返次数"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.round_trips = 0
+        self.ids = itertools.count(1)
+
+    def round_trip(self):
+        self.round_trips += 1
+        time.sleep(self.latency)
+
+    def cursor(self):
+        return FakeMySQLCursor(self)
+
+    def begin(self):
+        self.round_trip()
+
+    def commit(self):
+        self.round_trip()
+
+    def rollback(self):
+        self.round_trip()
+
+
+def make_table_infos(count, columns):
+    """生成模拟的表信息，结构与analyze_table_worker_with_pool的结果一致"""
+    now = datetime.now()
+    return [{
+        'owner': 'BENCH',
+        'name': f"TABLE_{i:06d}",
+        'comment': f"表{i}",
+        'rows': 1000,
+        'last_analyzed': now,
+        'last_ddl_time': now,
+        'comment_hash': None,
+        'columns': [{'name': f"COL{c}", 'data_type': 'VARCHAR2(50)', 'nullable': 'Y', 'default': '-',
+                     'comment': f"列{c}", 'column_id': c} for c in range(1, columns + 1)],
+        'primary_keys': ['COL1'],
+        'foreign_keys': [],
+        'indices': [(f"PK_TABLE_{i:06d}", 'NORMAL', 'UNIQUE', 'COL1', 'VALID')],
+    } for i in range(count)]
+
+
+def save_per_row(connection, table_info):
+    """逐行写入：改为批量写入之前save_table_info的往返模式"""
+    with connection.cursor() as cursor:
+        connection.begin()
+        cursor.execute("INSERT INTO oracle_tables ... ON DUPLICATE KEY UPDATE ...", None)
+        cursor.execute("SELECT id FROM oracle_tables WHERE owner = %s AND table_name = %s;", None)
+        table_id = cursor.fetchone()[0]
+        for table, _, _ in analyzer.CHILD_TABLE_COLUMNS:
+            cursor.execute(f"DELETE FROM {table} WHERE table_id = %s;", (table_id,))
+        for table, _, _ in analyzer.CHILD_TABLE_COLUMNS:
+            for _ in analyzer.child_rows(table, table_info):
+                cursor.execute(f"INSERT INTO {table} VALUES (...);", None)
+        connection.commit()
+
+
+def run_per_row(table_infos, latency):
+    """返回逐行写入的 (耗时秒数, 往返次数)"""
+    connection = FakeMySQLConnection(latency)
+    start_time = time.time()
+    for table_info in table_infos:
+        save_per_row(connection, table_info)
+    return time.time() - start_time, connection.round_trips
+
+
+def run_writer(table_infos, latency, load_mode='diff', batch_size=1):
+    """使用MySQLWriter写入，返回 (耗时秒数, 往返次数)"""
+    connection = FakeMySQLConnection(latency)
+    writer = analyzer.MySQLWriter('bench', 3306, 'bench', 'bench', 'bench', load_mode=load_mode)
+    writer.connection = connection
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for start in range(0, len(table_infos), batch_size):
+            failed = writer.save_tables(table_infos[start:start + batch_size])
+            if failed:
+                raise RuntimeError(f"模拟写入失败: {failed[0]['name']}")
+    return time.time() - start_time, connection.round_trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MySQL写入基准测试（模拟驱动）")
+    parser.add_argument("--tables", type=int, default=500, help="模拟的表数")
+    parser.add_argument("--columns", type=int, default=200, help="每个表的列数")
+    parser.add_argument("--latency", type=float, default=0.0005, help="每次往返的模拟延迟（秒）")
+    parser.add_argument("--batch-size", type=int, default=20, help="批量写入时每个事务的表数（同 --mysql-batch-size）")
+    args = parser.parse_args()
+
+    table_infos = make_table_infos(args.tables, args.columns)
+    print(f"模拟 {args.tables} 个表，每表 {args.columns} 列，每次往返延迟 {args.latency * 1000:.2f}ms")
+
+    for name, runner in (
+        ('per-row', lambda: run_per_row(table_infos, args.latency)),
+        ('batched', lambda: run_writer(table_infos, args.latency)),
+        (f"batched x{args.batch_size}", lambda: run_writer(table_infos, args.latency, batch_size=args.batch_size)),
+        ('staging', lambda: run_writer(table_infos, args.latency, load_mode='staging', batch_size=args.batch_size)),
+    ):
+        elapsed, round_trips = runner()
+        print(f"{name:>12}: 耗时 {elapsed:.2f} 秒，{round_trips} 次往返（每表 {round_trips / args.tables:.1f} 次），"
+              f"{args.tables / elapsed:.1f} 表/秒")
+
+
+if __name__ == "__main__":
+    main()
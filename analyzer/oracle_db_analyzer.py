@@ -19,11 +19,23 @@ import markdown  # type: ignore
 from datetime import datetime
 import time
 import argparse
-import sys
 import io
 import concurrent.futures
 import threading
 import queue
+import hashlib
+import contextlib
+import json
+import itertools
+import asyncio
+import bisect
+import shutil
+
+try:
+    # 可选依赖：异步引擎（--engine async）使用python-oracledb的异步接口
+    import oracledb  # type: ignore
+except ImportError:
+    oracledb = None
 
 # 添加一个计时装饰器
 def timer(func):
@@ -38,15 +50,26 @@ def timer(func):
     return wrapper
 
 
-def get_all_tables(cursor, owner_filter=None, table_filter=None):
-    """查询所有表，支持根据所有者和表名过滤"""
+# 分批读取表列表时每批的行数，每批使用一个短时借用的连接
+TABLE_LIST_ARRAYSIZE = 1000
+
+
+def _all_tables_query(owner_filter=None, table_filter=None, after=None, limit=None):
+    """构建查询表列表的SQL，返回 (SQL, 参数字典)
+    
+    after为上一批最后一行的 (OWNER, TABLE_NAME)，只返回排在其后的表；limit限制返回行数。
+    Oracle 11g不支持FETCH FIRST和行值比较，分页条件展开为OR，行数限制使用ROWNUM包装
+    """
     query = """
     SELECT ALL_TAB_COMMENTS.OWNER, ALL_TAB_COMMENTS.TABLE_NAME, ALL_TABLES.TABLESPACE_NAME, 
            ALL_TABLES.STATUS, ALL_TABLES.NUM_ROWS, 
-           ALL_TABLES.LAST_ANALYZED, ALL_TAB_COMMENTS.COMMENTS
+           ALL_TABLES.LAST_ANALYZED, ALL_TAB_COMMENTS.COMMENTS, ALL_OBJECTS.LAST_DDL_TIME
     FROM ALL_TAB_COMMENTS 
     JOIN ALL_TABLES ON ALL_TAB_COMMENTS.OWNER = ALL_TABLES.OWNER 
                     AND ALL_TAB_COMMENTS.TABLE_NAME = ALL_TABLES.TABLE_NAME
+    LEFT JOIN ALL_OBJECTS ON ALL_OBJECTS.OWNER = ALL_TABLES.OWNER 
+                         AND ALL_OBJECTS.OBJECT_NAME = ALL_TABLES.TABLE_NAME
+                         AND ALL_OBJECTS.OBJECT_TYPE = 'TABLE'
     WHERE ALL_TAB_COMMENTS.OWNER NOT IN ('SYS', 'SYSTEM')
     """
     
@@ -59,15 +82,68 @@ def get_all_tables(cursor, owner_filter=None, table_filter=None):
         query += " AND ALL_TAB_COMMENTS.TABLE_NAME LIKE :table_name"
         params['table_name'] = f"%{table_filter}%"
     
+    if after:
+        query += (" AND (ALL_TAB_COMMENTS.OWNER > :last_owner"
+                  " OR (ALL_TAB_COMMENTS.OWNER = :last_owner AND ALL_TAB_COMMENTS.TABLE_NAME > :last_table))")
+        params['last_owner'], params['last_table'] = after
+    
     query += " ORDER BY ALL_TAB_COMMENTS.OWNER, ALL_TAB_COMMENTS.TABLE_NAME"
     
-    cursor.execute(query, params)
+    if limit:
+        query = f"SELECT * FROM ({query}) WHERE ROWNUM <= :batch_size"
+        params['batch_size'] = limit
+    return query, params
+
+
+def _fetch_table_batch(pool, owner_filter, table_filter, after, query_timeout, retries, retry_backoff):
+    """借用一个连接读取一批表，读完立即归还；连接断开等临时错误时丢弃连接并按指数退避重试"""
+    for attempt in range(retries + 1):
+        connection = pool.acquire()
+        broken = False
+        try:
+            connection.callTimeout = query_timeout * 1000  # 毫秒
+            cursor = connection.cursor()
+            try:
+                cursor.arraysize = TABLE_LIST_ARRAYSIZE
+                cursor.execute(*_all_tables_query(owner_filter, table_filter, after, TABLE_LIST_ARRAYSIZE))
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        except cx_Oracle.Error as e:
+            broken = is_transient_oracle_error(e)
+            if not broken or attempt >= retries:
+                raise
+            delay = retry_backoff * (2 ** attempt)
+            print(f"读取表列表时连接中断，{delay:.1f} 秒后重试 ({attempt + 1}/{retries}): {e}")
+            time.sleep(delay)
+        finally:
+            release_oracle_connection(pool, connection, broken)
+
+
+def iter_all_tables(pool, owner_filter=None, table_filter=None, query_timeout=300, retries=0, retry_backoff=2.0):
+    """按 (OWNER, TABLE_NAME) 键集分页读取表列表的迭代器
+    
+    每批从连接池短时借用一个连接，分析期间不占用连接或游标，也不会因长时间打开的游标遇到ORA-01555；
+    某一批读取失败只需重试该批，内存占用与表总数无关
+    """
+    after = None
+    while True:
+        rows = _fetch_table_batch(pool, owner_filter, table_filter, after, query_timeout, retries, retry_backoff)
+        yield from rows
+        if len(rows) < TABLE_LIST_ARRAYSIZE:
+            break
+        after = (rows[-1][0], rows[-1][1])
+
+
+def get_all_tables(cursor, owner_filter=None, table_filter=None):
+    """查询所有表，支持根据所有者和表名过滤"""
+    cursor.arraysize = TABLE_LIST_ARRAYSIZE
+    cursor.execute(*_all_tables_query(owner_filter, table_filter))
     return cursor.fetchall()
 
 
-def get_table_columns(cursor, owner, table_name):
-    """查询表的列信息"""
-    query = """
+# 单表字典查询，线程引擎和异步引擎共用
+TABLE_COLUMNS_QUERY = """
     SELECT ALL_TAB_COLUMNS.COLUMN_NAME, ALL_TAB_COLUMNS.DATA_TYPE, ALL_TAB_COLUMNS.DATA_LENGTH, 
            ALL_TAB_COLUMNS.NULLABLE, ALL_TAB_COLUMNS.DATA_DEFAULT, ALL_COL_COMMENTS.COMMENTS, 
            ALL_TAB_COLUMNS.COLUMN_ID, ALL_TAB_COLUMNS.DATA_PRECISION, ALL_TAB_COLUMNS.DATA_SCALE
@@ -78,13 +154,15 @@ def get_table_columns(cursor, owner, table_name):
     WHERE ALL_COL_COMMENTS.OWNER = :owner AND ALL_COL_COMMENTS.TABLE_NAME = :table_name
     ORDER BY ALL_TAB_COLUMNS.COLUMN_ID
     """
-    cursor.execute(query, {'owner': owner, 'table_name': table_name})
+
+
+def get_table_columns(cursor, owner, table_name):
+    """查询表的列信息"""
+    cursor.execute(TABLE_COLUMNS_QUERY, {'owner': owner, 'table_name': table_name})
     return cursor.fetchall()
 
 
-def get_primary_keys(cursor, owner, table_name):
-    """获取主键信息"""
-    query = """
+PRIMARY_KEYS_QUERY = """
     SELECT ACC.COLUMN_NAME
     FROM ALL_CONSTRAINTS AC
     JOIN ALL_CONS_COLUMNS ACC ON AC.OWNER = ACC.OWNER AND AC.CONSTRAINT_NAME = ACC.CONSTRAINT_NAME
@@ -93,13 +171,15 @@ def get_primary_keys(cursor, owner, table_name):
       AND AC.OWNER = :owner
     ORDER BY ACC.POSITION
     """
-    cursor.execute(query, {'owner': owner, 'table_name': table_name})
+
+
+def get_primary_keys(cursor, owner, table_name):
+    """获取主键信息"""
+    cursor.execute(PRIMARY_KEYS_QUERY, {'owner': owner, 'table_name': table_name})
     return [row[0] for row in cursor.fetchall()]
 
 
-def get_foreign_keys(cursor, owner, table_name):
-    """获取外键信息"""
-    query = """
+FOREIGN_KEYS_QUERY = """
     SELECT AC.CONSTRAINT_NAME, 
            ACC.COLUMN_NAME,
            AC_REF.TABLE_NAME AS REFERENCED_TABLE,
@@ -114,13 +194,15 @@ def get_foreign_keys(cursor, owner, table_name):
       AND ACC.POSITION = ACC_REF.POSITION
     ORDER BY AC.CONSTRAINT_NAME, ACC.POSITION
     """
-    cursor.execute(query, {'owner': owner, 'table_name': table_name})
+
+
+def get_foreign_keys(cursor, owner, table_name):
+    """获取外键信息"""
+    cursor.execute(FOREIGN_KEYS_QUERY, {'owner': owner, 'table_name': table_name})
     return cursor.fetchall()
 
 
-def get_indices(cursor, owner, table_name):
-    """获取索引信息"""
-    query = """
+INDICES_QUERY = """
     SELECT AI.INDEX_NAME, AI.INDEX_TYPE, AI.UNIQUENESS, AIC.COLUMN_NAME, AI.STATUS
     FROM ALL_INDEXES AI
     JOIN ALL_IND_COLUMNS AIC ON AI.OWNER = AIC.INDEX_OWNER AND AI.INDEX_NAME = AIC.INDEX_NAME
@@ -128,7 +210,11 @@ def get_indices(cursor, owner, table_name):
       AND AI.TABLE_NAME = :table_name
     ORDER BY AI.INDEX_NAME, AIC.COLUMN_POSITION
     """
-    cursor.execute(query, {'owner': owner, 'table_name': table_name})
+
+
+def get_indices(cursor, owner, table_name):
+    """获取索引信息"""
+    cursor.execute(INDICES_QUERY, {'owner': owner, 'table_name': table_name})
     return cursor.fetchall()
     
     # 如果已有注释，直接返回
@@ -161,43 +247,342 @@ def get_indices(cursor, owner, table_name):
     return "无法推测含义"
 
 
+# 批量提取时每次从Oracle拉取的行数
+BULK_ARRAYSIZE = 5000
+
+
+def _group_rows_by_table(cursor):
+    """将首列为表名的查询结果按表名分组，返回 {表名: 去掉表名列后的行列表}"""
+    grouped = {}
+    while True:
+        rows = cursor.fetchmany()
+        if not rows:
+            break
+        for row in rows:
+            grouped.setdefault(row[0], []).append(tuple(row[1:]))
+    return grouped
+
+
+def _table_name_binds(table_names):
+    """构建表名IN列表的绑定变量，返回 (占位符字符串, 参数字典)"""
+    params = {f"t{i}": name for i, name in enumerate(table_names)}
+    return ", ".join(f":t{i}" for i in range(len(table_names))), params
+
+
+def get_tables_columns_bulk(cursor, owner, table_names):
+    """一次查询多个表的列信息，列顺序与get_table_columns一致"""
+    placeholders, params = _table_name_binds(table_names)
+    params['owner'] = owner
+    cursor.arraysize = BULK_ARRAYSIZE
+    cursor.execute(f"""
+    SELECT ALL_TAB_COLUMNS.TABLE_NAME,
+           ALL_TAB_COLUMNS.COLUMN_NAME, ALL_TAB_COLUMNS.DATA_TYPE, ALL_TAB_COLUMNS.DATA_LENGTH, 
+           ALL_TAB_COLUMNS.NULLABLE, ALL_TAB_COLUMNS.DATA_DEFAULT, ALL_COL_COMMENTS.COMMENTS, 
+           ALL_TAB_COLUMNS.COLUMN_ID, ALL_TAB_COLUMNS.DATA_PRECISION, ALL_TAB_COLUMNS.DATA_SCALE
+    FROM ALL_COL_COMMENTS 
+    JOIN ALL_TAB_COLUMNS ON ALL_COL_COMMENTS.OWNER = ALL_TAB_COLUMNS.OWNER 
+                        AND ALL_COL_COMMENTS.TABLE_NAME = ALL_TAB_COLUMNS.TABLE_NAME 
+                        AND ALL_COL_COMMENTS.COLUMN_NAME = ALL_TAB_COLUMNS.COLUMN_NAME
+    WHERE ALL_COL_COMMENTS.OWNER = :owner AND ALL_COL_COMMENTS.TABLE_NAME IN ({placeholders})
+    ORDER BY ALL_TAB_COLUMNS.TABLE_NAME, ALL_TAB_COLUMNS.COLUMN_ID
+    """, params)
+    return _group_rows_by_table(cursor)
+
+
+def get_tables_primary_keys_bulk(cursor, owner, table_names):
+    """一次查询多个表的主键信息"""
+    placeholders, params = _table_name_binds(table_names)
+    params['owner'] = owner
+    cursor.arraysize = BULK_ARRAYSIZE
+    cursor.execute(f"""
+    SELECT AC.TABLE_NAME, ACC.COLUMN_NAME
+    FROM ALL_CONSTRAINTS AC
+    JOIN ALL_CONS_COLUMNS ACC ON AC.OWNER = ACC.OWNER AND AC.CONSTRAINT_NAME = ACC.CONSTRAINT_NAME
+    WHERE AC.CONSTRAINT_TYPE = 'P'
+      AND AC.TABLE_NAME IN ({placeholders})
+      AND AC.OWNER = :owner
+    ORDER BY AC.TABLE_NAME, ACC.POSITION
+    """, params)
+    return {name: [row[0] for row in rows] for name, rows in _group_rows_by_table(cursor).items()}
+
+
+def get_tables_foreign_keys_bulk(cursor, owner, table_names):
+    """一次查询多个表的外键信息"""
+    placeholders, params = _table_name_binds(table_names)
+    params['owner'] = owner
+    cursor.arraysize = BULK_ARRAYSIZE
+    cursor.execute(f"""
+    SELECT AC.TABLE_NAME,
+           AC.CONSTRAINT_NAME, 
+           ACC.COLUMN_NAME,
+           AC_REF.TABLE_NAME AS REFERENCED_TABLE,
+           ACC_REF.COLUMN_NAME AS REFERENCED_COLUMN
+    FROM ALL_CONSTRAINTS AC
+    JOIN ALL_CONS_COLUMNS ACC ON AC.OWNER = ACC.OWNER AND AC.CONSTRAINT_NAME = ACC.CONSTRAINT_NAME
+    JOIN ALL_CONSTRAINTS AC_REF ON AC.R_OWNER = AC_REF.OWNER AND AC.R_CONSTRAINT_NAME = AC_REF.CONSTRAINT_NAME
+    JOIN ALL_CONS_COLUMNS ACC_REF ON AC_REF.OWNER = ACC_REF.OWNER AND AC_REF.CONSTRAINT_NAME = ACC_REF.CONSTRAINT_NAME
+    WHERE AC.CONSTRAINT_TYPE = 'R'
+      AND AC.TABLE_NAME IN ({placeholders})
+      AND AC.OWNER = :owner
+      AND ACC.POSITION = ACC_REF.POSITION
+    ORDER BY AC.TABLE_NAME, AC.CONSTRAINT_NAME, ACC.POSITION
+    """, params)
+    return _group_rows_by_table(cursor)
+
+
+def get_tables_indices_bulk(cursor, owner, table_names):
+    """一次查询多个表的索引信息"""
+    placeholders, params = _table_name_binds(table_names)
+    params['owner'] = owner
+    cursor.arraysize = BULK_ARRAYSIZE
+    cursor.execute(f"""
+    SELECT AI.TABLE_NAME, AI.INDEX_NAME, AI.INDEX_TYPE, AI.UNIQUENESS, AIC.COLUMN_NAME, AI.STATUS
+    FROM ALL_INDEXES AI
+    JOIN ALL_IND_COLUMNS AIC ON AI.OWNER = AIC.INDEX_OWNER AND AI.INDEX_NAME = AIC.INDEX_NAME
+    WHERE AI.TABLE_OWNER = :owner
+      AND AI.TABLE_NAME IN ({placeholders})
+    ORDER BY AI.TABLE_NAME, AI.INDEX_NAME, AIC.COLUMN_POSITION
+    """, params)
+    return _group_rows_by_table(cursor)
+
+
+def _normalize_comment(comment):
+    """将空注释和占位注释统一为空字符串"""
+    return '' if not comment or comment in ('无描述', '-') else comment
+
+
+def compute_comment_hash(table_comment, column_comments):
+    """计算表注释和列注释的MD5摘要，column_comments为 (列名, 注释) 序列
+    
+    COMMENT ON语句不会更新LAST_DDL_TIME，增量运行依靠该摘要发现注释变化。
+    空注释不参与计算，因此从ALL_COL_COMMENTS单独查询注释得到的摘要与完整提取时一致。
+    """
+    digest = hashlib.md5(_normalize_comment(table_comment).encode('utf-8'))
+    for column_name, comment in sorted((name, _normalize_comment(comment)) for name, comment in column_comments):
+        if comment:
+            digest.update(f"\x00{column_name}\x01{comment}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_comment_hashes(cursor, tables):
+    """按所有者批量查询列注释，返回 {(所有者, 表名): 注释摘要}"""
+    tables_by_owner = {}
+    for table in tables:
+        tables_by_owner.setdefault(table[0], []).append(table)
+    
+    hashes = {}
+    cursor.arraysize = BULK_ARRAYSIZE
+    for owner, owner_tables in tables_by_owner.items():
+        cursor.execute("""
+        SELECT TABLE_NAME, COLUMN_NAME, COMMENTS
+        FROM ALL_COL_COMMENTS
+        WHERE OWNER = :owner AND COMMENTS IS NOT NULL
+        """, {'owner': owner})
+        column_comments = _group_rows_by_table(cursor)
+        for table in owner_tables:
+            hashes[(owner, table[1])] = compute_comment_hash(table[6], column_comments.get(table[1], []))
+    return hashes
+
+
+def plan_incremental_run(cursor, tables, table_states):
+    """比较Oracle字典与MySQL中记录的DDL时间和注释摘要
+    
+    table_states为 {(所有者, 表名): (last_ddl_time, comment_hash)}。
+    返回 (需要重新分析的表列表, Oracle中已不存在的表键列表)。
+    """
+    changed = []
+    candidates = []
+    for table in tables:
+        state = table_states.get((table[0], table[1]))
+        if state is None or state[0] != table[7]:
+            # 新表或DDL时间变化的表无需再比较注释
+            changed.append(table)
+        else:
+            candidates.append(table)
+    
+    # 只为DDL未变化的表查询注释摘要
+    if candidates:
+        comment_hashes = get_comment_hashes(cursor, candidates)
+        for table in candidates:
+            key = (table[0], table[1])
+            if comment_hashes[key] != table_states[key][1]:
+                changed.append(table)
+        changed.sort(key=lambda t: (t[0], t[1]))
+    
+    current = {(table[0], table[1]) for table in tables}
+    removed = [key for key in table_states if key not in current]
+    return changed, removed
+
+
+def build_table_info(table, primary_keys, foreign_keys, indices, columns):
+    """根据表行和字典查询结果构建写入器使用的table_info"""
+    comment = table[6] if table[6] and table[6] != '无描述' else "-"
+    table_info = {
+        'owner': table[0],
+        'name': table[1],
+        'comment': comment,
+        'rows': table[4],
+        'last_analyzed': table[5],
+        'last_ddl_time': table[7] if len(table) > 7 else None,
+        'comment_hash': compute_comment_hash(table[6], [(column[0], column[5]) for column in columns]),
+        'columns': [],
+        'primary_keys': primary_keys,
+        'foreign_keys': foreign_keys,
+        'indices': indices
+    }
+    
+    for column in columns:
+        column_comment = column[5] if column[5] and column[5] != '无描述' else "-"
+        column_info = {
+            'name': column[0],
+            'data_type': f"{column[1]}({column[7] or column[2] or ''}{',' + str(column[8]) if column[8] is not None else ''})",
+            'nullable': column[3],
+            'default': column[4],
+            'comment': column_comment,
+            'column_id': column[6]
+        }
+        table_info['columns'].append(column_info)
+    
+    return table_info
+
+
+def render_table_section(table_info):
+    """渲染单个表的Markdown章节，返回 (表描述, 章节内容)"""
+    owner = table_info['owner']
+    table_name = table_info['name']
+    comment = table_info['comment'] if table_info['comment'] and table_info['comment'] != '无描述' else "-"
+    rows = table_info['rows'] or "-"
+    last_analyzed = table_info['last_analyzed'] or "-"
+    
+    # 先创建完整内容
+    content = f"### {owner}.{table_name}\n\n"
+    content += f"**表描述**: {comment}\n\n"
+    content += f"**记录数**: {rows}\n\n"
+    content += f"**最后分析时间**: {last_analyzed}\n\n"
+    
+    # 列信息
+    content += "#### 列信息\n\n"
+    content += "| 序号 | 列名 | 数据类型 | 允许空 | 默认值 | 注释 |\n"
+    content += "| --- | --- | --- | --- | --- | --- |\n"
+    
+    for i, column in enumerate(table_info['columns']):
+        column_comment = column['comment'] if column['comment'] and column['comment'] != '无描述' else "-"
+        default_value = column['default'] if column['default'] and column['default'] != "-" else "-"
+        content += f"| {i+1} | {column['name']} | {column['data_type']} | {'是' if column['nullable'] == 'Y' else '否'} | {default_value} | {column_comment} |\n"
+    
+    # 主键信息
+    if table_info['primary_keys']:
+        content += "\n#### 主键\n\n"
+        content += "| 列名 |\n"
+        content += "| --- |\n"
+        for pk in table_info['primary_keys']:
+            content += f"| {pk} |\n"
+    
+    # 外键信息
+    if table_info['foreign_keys']:
+        content += "\n#### 外键\n\n"
+        content += "| 约束名 | 列名 | 引用表 | 引用列 |\n"
+        content += "| --- | --- | --- | --- |\n"
+        for fk in table_info['foreign_keys']:
+            content += f"| {fk[0]} | {fk[1]} | {fk[2]} | {fk[3]} |\n"
+    
+    # 索引信息
+    if table_info['indices']:
+        content += "\n#### 索引\n\n"
+        content += "| 索引名 | 类型 | 唯一性 | 列名 | 状态 |\n"
+        content += "| --- | --- | --- | --- | --- |\n"
+        for idx in table_info['indices']:
+            content += f"| {idx[0]} | {idx[1]} | {idx[2]} | {idx[3]} | {idx[4]} |\n"
+    
+    content += "\n"
+    return comment, content
+
+
+def render_toc_entry(owner, table_name, comment, link_target=None):
+    """渲染目录项，link_target为空时链接到同一文档内的锚点"""
+    anchor = f"{owner.lower()}-{table_name.lower()}"
+    display_comment = comment if comment and comment != "-" else "无描述"
+    return f"- [{owner}.{table_name}]({link_target or ''}#{anchor}) - {display_comment}\n"
+
+
+def copy_file_range(source, target, offset, length):
+    """将source文件中 [offset, offset+length) 的内容追加到target，优先使用os.sendfile在内核中复制"""
+    target.flush()
+    if hasattr(os, 'sendfile'):
+        try:
+            while length > 0:
+                sent = os.sendfile(target.fileno(), source.fileno(), offset, length)
+                if sent == 0:
+                    raise IOError("源文件内容不足")
+                offset += sent
+                length -= sent
+            return
+        except OSError:
+            # 部分平台不支持普通文件之间的sendfile，剩余部分退回用户态复制
+            pass
+    source.seek(offset)
+    while length > 0:
+        chunk = source.read(min(length, 1024 * 1024))
+        if not chunk:
+            raise IOError("源文件内容不足")
+        target.write(chunk)
+        length -= len(chunk)
+
+
 class MarkdownWriter:
-    """Markdown文档写入器，支持流式写入"""
+    """Markdown文档写入器，支持流式写入
+    
+    各表章节按完成顺序追加到暂存文件（<文档>.spool），同时在索引文件（<文档>.spool.idx）中追加
+    一行JSON记录表名、表描述、偏移量和长度。finalize_toc按表名排序后写入目录，再按偏移量逐段复制章节，
+    生成确定、有序的最终文档；内存只保存索引，整个过程只对章节内容做一次读写。
+    """
     
-    def __init__(self, filename):
+    parallel = False  # 写入由结果处理线程串行完成
+    
+    def __init__(self, filename, resume=False):
         self.filename = filename
-        self.file = None
+        self.spool_filename = f"{filename}.spool"
+        self.index_filename = f"{filename}.spool.idx"
+        self.resume = resume  # 续跑时继续使用已有的暂存文件和索引
+        self.spool = None
+        self.index_file = None
+        self.spool_size = 0
         self.tables_count = 0
-        self.tables_index = {}  # 存储表名到目录项的映射
-        self.tables_content = {}  # 存储表名到表内容的映射
-        self.lock = threading.RLock()  # 使用可重入锁保护文件操作
-        self.content_lock = threading.RLock()  # 用于保护内容生成
+        self.tables_index = {}  # 表名 -> (表描述, 偏移量, 长度)
+        self.lock = threading.RLock()  # 保护暂存文件、索引文件和内存索引
     
     def open(self):
-        """打开文件并写入头部"""
+        """打开暂存文件和索引文件，续跑时恢复已写入的表"""
         with self.lock:
             try:
-                self.file = open(self.filename, 'w', encoding='utf-8')
-                self.write_header()
+                if self.resume:
+                    self._restore()
+                else:
+                    for path in (self.spool_filename, self.index_filename):
+                        if os.path.exists(path):
+                            os.remove(path)
+                self.spool = open(self.spool_filename, 'ab')
+                self.index_file = open(self.index_filename, 'a', encoding='utf-8')
+                if self.resume:
+                    print(f"续跑：恢复了 {self.tables_count} 个已写入的表")
                 return self
             except Exception as e:
                 print(f"打开文件失败: {e}")
-                if self.file:
-                    self.file.close()
-                    self.file = None
+                self.close()
                 raise
     
     def close(self):
-        """关闭文件"""
+        """关闭暂存文件和索引文件"""
         with self.lock:
-            if self.file:
-                try:
-                    self.file.flush()
-                    self.file.close()
-                except Exception as e:
-                    print(f"关闭文件失败: {e}")
-                finally:
-                    self.file = None
+            for name in ('spool', 'index_file'):
+                handle = getattr(self, name)
+                if handle:
+                    try:
+                        handle.close()
+                    except Exception as e:
+                        print(f"关闭文件失败: {e}")
+                    finally:
+                        setattr(self, name, None)
     
     def __enter__(self):
         """支持上下文管理器协议的进入方法"""
@@ -208,103 +593,139 @@ class MarkdownWriter:
         self.close()
         return False  # 不抑制异常
     
-    def write_header(self):
-        """写入文档头部"""
-        with self.lock:
-            if not self.file:
-                print("文件未打开，无法写入头部")
-                return False
-                
-            try:
-                content = "# 数据库表结构文档\n\n"
-                content += f"*生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
-                content += "## 目录\n\n"
-                content += "\n## 详细表结构\n\n"  # 预先添加分隔线
-                
-                self.file.write(content)
-                self.file.flush()
-                return True
-            except Exception as e:
-                print(f"写入文件头部失败: {e}")
-                return False
+    def _restore(self):
+        """续跑时读取索引文件；暂存文件不存在但已有最终文档时（上次运行已完成），将文档中的章节导入暂存文件"""
+        if os.path.exists(self.spool_filename) and os.path.exists(self.index_filename):
+            spool_size = os.path.getsize(self.spool_filename)
+            valid_end = 0
+            with open(self.index_filename, 'r', encoding='utf-8') as index_file:
+                for line in index_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 中断时写了一半的行
+                    if entry['offset'] + entry['length'] > spool_size:
+                        continue  # 章节内容没有完整写入
+                    self._add_index(entry['key'], entry['comment'], entry['offset'], entry['length'])
+                    valid_end = max(valid_end, entry['offset'] + entry['length'])
+            # 截掉末尾没有索引的半截章节
+            with open(self.spool_filename, 'r+b') as spool:
+                spool.truncate(valid_end)
+            self.spool_size = valid_end
+            return
+        
+        for path in (self.spool_filename, self.index_filename):
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.filename):
+            self._import_document()
+    
+    def _import_document(self):
+        """将已有文档“详细表结构”之后的各表章节导入暂存文件"""
+        with open(self.filename, 'r', encoding='utf-8') as document, \
+                open(self.spool_filename, 'ab') as spool, \
+                open(self.index_filename, 'a', encoding='utf-8') as index_file:
+            in_detail = False
+            key, comment, lines = None, "-", []
+            
+            def flush_section():
+                if key:
+                    data = "".join(lines).encode('utf-8')
+                    self._append(spool, index_file, key, comment, data)
+            
+            for line in document:
+                if not in_detail:
+                    in_detail = line.startswith("## 详细表结构")
+                    continue
+                if line.startswith("### "):
+                    flush_section()
+                    key, comment, lines = line[4:].strip(), "-", []
+                elif key and line.startswith("**表描述**: "):
+                    comment = line[len("**表描述**: "):].strip()
+                if key:
+                    lines.append(line)
+            flush_section()
+    
+    def _add_index(self, key, comment, offset, length):
+        """更新内存索引"""
+        if key not in self.tables_index:
+            self.tables_count += 1
+        self.tables_index[key] = (comment, offset, length)
+    
+    def _append(self, spool, index_file, key, comment, data):
+        """追加章节到暂存文件并记录索引，调用方需持有锁"""
+        offset = self.spool_size
+        spool.write(data)
+        spool.flush()
+        self.spool_size += len(data)
+        # 章节写入后再写索引，中断时索引中不会出现不完整的章节
+        index_file.write(json.dumps({'key': key, 'comment': comment, 'offset': offset, 'length': len(data)},
+                                    ensure_ascii=False) + "\n")
+        index_file.flush()
+        self._add_index(key, comment, offset, len(data))
     
-    def ensure_file_open(self):
-        """确保文件已打开"""
+    def has_table(self, owner, table_name):
+        """表是否已写入文档"""
         with self.lock:
-            if not self.file:
-                try:
-                    self.file = open(self.filename, 'a', encoding='utf-8')
-                    return True
-                except Exception as e:
-                    print(f"重新打开文件失败: {e}")
-                    return False
-            return True
+            return f"{owner}.{table_name}" in self.tables_index
     
-    def write_to_file(self, content):
-        """安全地写入内容到文件"""
+    def write_table_structure(self, table_info):
+        """渲染单个表的结构信息并追加到暂存文件"""
+        owner = table_info['owner']
+        table_name = table_info['name']
+        
+        # 续跑时已写入文档的表不重复写入
+        if self.has_table(owner, table_name):
+            return
+        
+        # 在锁外渲染，锁内只做一次追加写
+        comment, content = render_table_section(table_info)
         with self.lock:
-            if not self.ensure_file_open():
-                return False
-                
+            if not self.spool:
+                print("文件未打开，无法写入表结构")
+                return
             try:
-                self.file.write(content)
-                self.file.flush()
-                return True
+                self._append(self.spool, self.index_file, f"{owner}.{table_name}", comment, content.encode('utf-8'))
             except Exception as e:
                 print(f"写入文件失败: {e}")
-                return False
-    
-    def write_table_index(self, owner, table_name, comment):
-        """记录表索引到内存"""
-        with self.content_lock:
-            anchor = f"{owner.lower()}-{table_name.lower()}"
-            display_comment = comment if comment and comment != "-" else "无描述"
-            content = f"- [{owner}.{table_name}](#{anchor}) - {display_comment}\n"
-            self.tables_index[f"{owner}.{table_name}"] = content
-            self.tables_count += 1
     
     def finalize_toc(self):
-        """重新生成排序后的最终文档"""
+        """按表名排序生成最终文档：写入目录后按索引偏移量逐段复制章节"""
         with self.lock:
             final_filename = f"{self.filename}.final"
             
             try:
-                # 创建最终文件
-                with open(final_filename, 'w', encoding='utf-8') as final_file:
+                if self.spool:
+                    self.spool.flush()
+                table_keys = sorted(self.tables_index)
+                
+                with open(final_filename, 'wb') as final_file, open(self.spool_filename, 'rb') as spool:
                     # 写入文档头部
                     content = "# 数据库表结构文档\n\n"
                     content += f"*最终更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
                     content += "## 目录\n\n"
+                    final_file.write(content.encode('utf-8'))
                     
                     # 按表名排序写入目录内容
-                    for table_key in sorted(self.tables_index.keys()):
-                        final_file.write(self.tables_index[table_key])
+                    for table_key in table_keys:
+                        owner, _, table_name = table_key.partition('.')
+                        final_file.write(render_toc_entry(owner, table_name, self.tables_index[table_key][0]).encode('utf-8'))
                     
                     # 添加分隔线
-                    final_file.write("\n## 详细表结构\n\n")
+                    final_file.write("\n## 详细表结构\n\n".encode('utf-8'))
                     
-                    # 如果有保存表内容，则按照排序后的表名从内存写入表内容
-                    if self.tables_content:
-                        for table_key in sorted(self.tables_content.keys()):
-                            final_file.write(self.tables_content[table_key])
-                    # 否则，从原文件中复制表内容（跳过头部和目录）
-                    else:
-                        with open(self.filename, 'r', encoding='utf-8') as original_file:
-                            # 跳过头部和目录
-                            found_detail_section = False
-                            for line in original_file:
-                                if not found_detail_section and "## 详细表结构" in line:
-                                    found_detail_section = True
-                                    continue  # 跳过这一行
-                                
-                                if found_detail_section:
-                                    final_file.write(line)
+                    # 按排序后的表名从暂存文件复制章节
+                    for table_key in table_keys:
+                        _, offset, length = self.tables_index[table_key]
+                        copy_file_range(spool, final_file, offset, length)
                 
-                # 替换原始文件
-                self.close()  # 确保原文件已关闭
+                # 替换原始文件并清理暂存文件
+                self.close()
                 
                 try:
                     os.replace(final_filename, self.filename)
+                    os.remove(self.spool_filename)
+                    os.remove(self.index_filename)
                     print(f"已生成最终排序文档: {self.filename}")
                     return True
                 except Exception as e:
@@ -315,301 +736,1681 @@ class MarkdownWriter:
             except Exception as e:
                 print(f"生成最终文档失败: {e}")
                 return False
-    
-    def write_table_structure(self, table_info):
-        """写入单个表的结构信息，直接写入主文件"""
-        with self.content_lock:
-            owner = table_info['owner']
-            table_name = table_info['name']
-            
-            # 记录索引以便后续生成目录
-            comment = table_info['comment'] if table_info['comment'] and table_info['comment'] != '无描述' else "-"
-            self.write_table_index(owner, table_name, comment)
-            
-            # 构建表内容
-            rows = table_info['rows'] or "-"
-            last_analyzed = table_info['last_analyzed'] or "-"
-            
-            # 先创建完整内容
-            content = f"### {owner}.{table_name}\n\n"
-            content += f"**表描述**: {comment}\n\n"
-            content += f"**记录数**: {rows}\n\n"
-            content += f"**最后分析时间**: {last_analyzed}\n\n"
-            
-            # 列信息
-            content += "#### 列信息\n\n"
-            content += "| 序号 | 列名 | 数据类型 | 允许空 | 默认值 | 注释 |\n"
-            content += "| --- | --- | --- | --- | --- | --- |\n"
-            
-            for i, column in enumerate(table_info['columns']):
-                column_comment = column['comment'] if column['comment'] and column['comment'] != '无描述' else "-"
-                default_value = column['default'] if column['default'] and column['default'] != "-" else "-"
-                content += f"| {i+1} | {column['name']} | {column['data_type']} | {'是' if column['nullable'] == 'Y' else '否'} | {default_value} | {column_comment} |\n"
-            
-            # 主键信息
-            if table_info['primary_keys']:
-                content += "\n#### 主键\n\n"
-                content += "| 列名 |\n"
-                content += "| --- |\n"
-                for pk in table_info['primary_keys']:
-                    content += f"| {pk} |\n"
-            
-            # 外键信息
-            if table_info['foreign_keys']:
-                content += "\n#### 外键\n\n"
-                content += "| 约束名 | 列名 | 引用表 | 引用列 |\n"
-                content += "| --- | --- | --- | --- |\n"
-                for fk in table_info['foreign_keys']:
-                    content += f"| {fk[0]} | {fk[1]} | {fk[2]} | {fk[3]} |\n"
-            
-            # 索引信息
-            if table_info['indices']:
-                content += "\n#### 索引\n\n"
-                content += "| 索引名 | 类型 | 唯一性 | 列名 | 状态 |\n"
-                content += "| --- | --- | --- | --- | --- |\n"
-                for idx in table_info['indices']:
-                    content += f"| {idx[0]} | {idx[1]} | {idx[2]} | {idx[3]} | {idx[4]} |\n"
-            
-            content += "\n"
-            
-            # 可选：存储表内容到内存以便最终排序（如果表太多可能占用内存过多，可以删除）
-            # self.tables_content[f"{owner}.{table_name}"] = content
-            
-            # 直接写入到主文件
-            with self.lock:
-                self.write_to_file(content)
 
 
-class MySQLWriter:
-    """MySQL数据库写入器，支持将表结构信息保存到MySQL数据库"""
+def _safe_filename(name):
+    """将Oracle对象名转换为安全的文件名"""
+    return "".join('_' if ch in '/\\:*?"<>|' else ch for ch in name)
+
+
+# 分片文档目录的后缀，目录名与索引文件名区分开，避免与已有目录重名
+SHARD_DIRECTORY_SUFFIX = '.shards'
+
+
+class ShardedMarkdownWriter:
+    """分片Markdown文档写入器
     
-    def __init__(self, host, port, user, password, database):
-        self.host = host
-        self.port = port
-        self.user = user
-        self.password = password
-        self.database = database
-        self.connection = None
-        self.lock = threading.Lock()  # 添加线程锁保护数据库写入
+    output_file为索引文件，分片写入专用目录 <去掉扩展名>.shards/：
+    - shard_by=owner：每个所有者一个文档 <目录>/<OWNER>.md，各表章节先写入 <目录>/.sections/<OWNER>/<TABLE>.md
+    - shard_by=table：每个表一个文档 <目录>/<OWNER>/<TABLE>.md，每个所有者一个目录页 <目录>/<OWNER>/README.md
+    
+    每个表的章节写入独立文件，工作线程可以并行写入，不需要全局文件锁。
+    表清单保存在 <目录>/.shard_index.json 中，finalize_toc只重新生成本次有变化的所有者的分片。
+    """
+    
+    parallel = True  # 支持在工作线程中并行写入
+    
+    def __init__(self, output_file, shard_by='owner', resume=False):
+        stem, extension = os.path.splitext(output_file)
+        if not extension:
+            raise ValueError(f"分片文档的索引文件需要带扩展名（如 .md）: {output_file}")
+        self.output_file = output_file
+        self.shard_by = shard_by
+        self.resume = resume  # 保留已有分片，只更新本次写入或删除的表
+        self.directory = f"{stem}{SHARD_DIRECTORY_SUFFIX}"
+        self.sections_directory = os.path.join(self.directory, '.sections') if shard_by == 'owner' else self.directory
+        self.manifest_file = os.path.join(self.directory, '.shard_index.json')
+        self.tables = {}  # 所有者 -> {表名: 表描述}
+        self.dirty_owners = set()  # 本次有变化、需要重新生成分片的所有者
+        self.tables_count = 0
+        self.lock = threading.Lock()  # 只保护内存中的表清单，不覆盖文件写入
     
     def open(self):
-        """打开数据库连接并创建所需表"""
+        """读取已有的表清单；非续跑时清空旧的分片"""
+        manifest = None
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'r', encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+        
+        if self.resume and (manifest is None or manifest.get('shard_by') == self.shard_by):
+            if manifest:
+                self.tables = manifest.get('tables', {})
+                self.tables_count = sum(len(tables) for tables in self.tables.values())
+            self._recover_sections()
+            print(f"分片文档：保留已有的 {len(self.tables)} 个所有者、{self.tables_count} 个表")
+        elif os.path.isdir(self.directory):
+            # 全量运行或分片方式变化时重新生成全部分片；只删除带有表清单、由本写入器生成的目录
+            if manifest is not None:
+                shutil.rmtree(self.directory)
+            elif os.listdir(self.directory):
+                raise RuntimeError(f"{self.directory} 已存在且不是分片文档目录（缺少 .shard_index.json），拒绝覆盖")
+        os.makedirs(self.sections_directory, exist_ok=True)
+        return self
+    
+    def _recover_sections(self):
+        """将上次运行中断前已写入、但尚未记入表清单的章节加入清单"""
+        if not os.path.isdir(self.sections_directory):
+            return
+        known = {self._section_path(owner, table_name) for owner, tables in self.tables.items() for table_name in tables}
+        for entry in os.scandir(self.sections_directory):
+            if not entry.is_dir() or entry.name.startswith('.'):
+                continue
+            for section in os.scandir(entry.path):
+                if not section.name.endswith('.md') or section.name == 'README.md' or section.path in known:
+                    continue
+                key, comment = None, "-"
+                with open(section.path, 'r', encoding='utf-8') as section_file:
+                    for line in itertools.islice(section_file, 5):
+                        if line.startswith("### "):
+                            key = line[4:].strip()
+                        elif line.startswith("**表描述**: "):
+                            comment = line[len("**表描述**: "):].strip()
+                if key:
+                    owner, _, table_name = key.partition('.')
+                    self.tables.setdefault(owner, {})[table_name] = comment
+                    self.tables_count += 1
+                    self.dirty_owners.add(owner)
+    
+    def close(self):
+        """分片写入器没有需要关闭的文件"""
+        pass
+    
+    def __enter__(self):
+        """支持上下文管理器协议的进入方法"""
+        return self.open()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """支持上下文管理器协议的退出方法"""
+        self.close()
+        return False  # 不抑制异常
+    
+    def _section_path(self, owner, table_name):
+        return os.path.join(self.sections_directory, _safe_filename(owner), f"{_safe_filename(table_name)}.md")
+    
+    def has_table(self, owner, table_name):
+        """表是否已写入文档"""
+        with self.lock:
+            return table_name in self.tables.get(owner, {})
+    
+    def write_table_structure(self, table_info):
+        """将单个表的章节写入独立文件，可在多个线程中并行调用"""
+        owner = table_info['owner']
+        table_name = table_info['name']
+        comment, content = render_table_section(table_info)
+        
+        path = self._section_path(owner, table_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再替换，中断时不会留下半个章节
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as section_file:
+            section_file.write(content)
+        os.replace(temp_path, path)
+        
+        with self.lock:
+            owner_tables = self.tables.setdefault(owner, {})
+            if table_name not in owner_tables:
+                self.tables_count += 1
+            owner_tables[table_name] = comment
+            self.dirty_owners.add(owner)
+    
+    def remove_table(self, owner, table_name):
+        """从分片文档中删除表"""
+        path = self._section_path(owner, table_name)
+        if os.path.exists(path):
+            os.remove(path)
+        with self.lock:
+            owner_tables = self.tables.get(owner, {})
+            if owner_tables.pop(table_name, None) is not None:
+                self.tables_count -= 1
+            if not owner_tables:
+                self.tables.pop(owner, None)
+            self.dirty_owners.add(owner)
+    
+    def _owner_shard_path(self, owner):
+        """所有者分片（shard_by=owner）或所有者目录页（shard_by=table）的路径"""
+        if self.shard_by == 'owner':
+            return os.path.join(self.directory, f"{_safe_filename(owner)}.md")
+        return os.path.join(self.directory, _safe_filename(owner), "README.md")
+    
+    def _write_owner_shard(self, owner):
+        """重新生成一个所有者的分片文档"""
+        shard_path = self._owner_shard_path(owner)
+        owner_tables = self.tables.get(owner)
+        if not owner_tables:
+            # 所有者下的表已全部删除
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+            return
+        
+        table_names = sorted(owner_tables)
+        temp_path = f"{shard_path}.tmp"
+        os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as shard_file:
+            shard_file.write(f"# {owner} 表结构文档\n\n")
+            shard_file.write(f"*最终更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n")
+            shard_file.write("## 目录\n\n")
+            for table_name in table_names:
+                link_target = f"{_safe_filename(table_name)}.md" if self.shard_by == 'table' else None
+                shard_file.write(render_toc_entry(owner, table_name, owner_tables[table_name], link_target))
+            
+            if self.shard_by == 'owner':
+                shard_file.write("\n## 详细表结构\n\n")
+                for table_name in table_names:
+                    with open(self._section_path(owner, table_name), 'r', encoding='utf-8') as section_file:
+                        shutil.copyfileobj(section_file, shard_file)
+        os.replace(temp_path, shard_path)
+    
+    def _write_index(self):
+        """生成索引文件：每个所有者一行，链接到所有者分片"""
+        base = os.path.relpath(self.directory, os.path.dirname(os.path.abspath(self.output_file)) or '.')
+        temp_path = f"{self.output_file}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as index_file:
+            index_file.write("# 数据库表结构文档\n\n")
+            index_file.write(f"*最终更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n")
+            index_file.write(f"共 {len(self.tables)} 个所有者、{self.tables_count} 个表\n\n")
+            index_file.write("## 所有者\n\n")
+            for owner in sorted(self.tables):
+                link = os.path.relpath(self._owner_shard_path(owner), self.directory).replace(os.sep, '/')
+                index_file.write(f"- [{owner}]({base.replace(os.sep, '/')}/{link}) - {len(self.tables[owner])} 个表\n")
+        os.replace(temp_path, self.output_file)
+    
+    def finalize_toc(self):
+        """重新生成有变化的所有者分片、索引文件和表清单"""
         try:
-            self.connection = pymysql.connect(
-                host=self.host,
-                port=self.port,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-                charset='utf8mb4'
-            )
+            dirty_owners = sorted(self.dirty_owners)
+            if dirty_owners:
+                # 各所有者分片相互独立，并行生成
+                with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(dirty_owners))) as executor:
+                    list(executor.map(self._write_owner_shard, dirty_owners))
+            self._write_index()
             
-            # 创建所需的表
-            self._create_tables()
+            temp_path = f"{self.manifest_file}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+                json.dump({'shard_by': self.shard_by, 'tables': self.tables}, manifest_file, ensure_ascii=False)
+            os.replace(temp_path, self.manifest_file)
             
-            return self
+            print(f"已生成分片文档: {self.output_file}，更新了 {len(dirty_owners)} 个所有者的分片")
+            self.dirty_owners = set()
+            return True
         except Exception as e:
-            print(f"MySQL连接失败: {e}")
-            if self.connection:
-                self.connection.close()
-                self.connection = None
-            raise
+            print(f"生成分片文档失败: {e}")
+            return False
+
+
+def open_markdown_writer(output_file, layout='single', shard_by='owner', resume=False):
+    """根据文档布局创建Markdown写入器，output_file为None时返回空的上下文管理器"""
+    if not output_file:
+        return contextlib.nullcontext()
+    if layout == 'sharded':
+        return ShardedMarkdownWriter(output_file, shard_by, resume)
+    return MarkdownWriter(output_file, resume)
+
+
+# 目录表定义：(表名, 列定义, 键定义, 影子表加载期间保留的键定义)
+# 影子表加载期间只保留必要的键，其余索引和外键在加载完成后一次性创建；{suffix}为表名后缀
+CATALOG_TABLES = (
+    ('oracle_tables', """id INT AUTO_INCREMENT PRIMARY KEY,
+                owner VARCHAR(128) NOT NULL,
+                table_name VARCHAR(128) NOT NULL,
+                comment TEXT,
+                rows_count BIGINT,
+                last_analyzed DATETIME,
+                last_ddl_time DATETIME,
+                comment_hash CHAR(32),
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP""",
+     ("UNIQUE KEY(owner, table_name)", "KEY idx_table_name(table_name)"),
+     # 续跑时依靠唯一键识别已加载的表
+     ("UNIQUE KEY(owner, table_name)",)),
+    ('oracle_columns', """id INT AUTO_INCREMENT PRIMARY KEY,
+                table_id INT NOT NULL,
+                column_name VARCHAR(128) NOT NULL,
+                data_type VARCHAR(128),
+                nullable VARCHAR(3),
+                default_value TEXT,
+                comment TEXT,
+                column_id INT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP""",
+     ("UNIQUE KEY(table_id, column_name)",
+      "FOREIGN KEY(table_id) REFERENCES oracle_tables{suffix}(id) ON DELETE CASCADE"),
+     ()),
+    ('oracle_primary_keys', """id INT AUTO_INCREMENT PRIMARY KEY,
+                table_id INT NOT NULL,
+                column_name VARCHAR(128) NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP""",
+     ("UNIQUE KEY(table_id, column_name)",
+      "FOREIGN KEY(table_id) REFERENCES oracle_tables{suffix}(id) ON DELETE CASCADE"),
+     ()),
+    ('oracle_foreign_keys', """id INT AUTO_INCREMENT PRIMARY KEY,
+                table_id INT NOT NULL,
+                constraint_name VARCHAR(128) NOT NULL,
+                column_name VARCHAR(128) NOT NULL,
+                referenced_table VARCHAR(128) NOT NULL,
+                referenced_column VARCHAR(128) NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP""",
+     ("UNIQUE KEY(table_id, constraint_name, column_name)",
+      "FOREIGN KEY(table_id) REFERENCES oracle_tables{suffix}(id) ON DELETE CASCADE"),
+     ()),
+    ('oracle_indices', """id INT AUTO_INCREMENT PRIMARY KEY,
+                table_id INT NOT NULL,
+                index_name VARCHAR(128) NOT NULL,
+                index_type VARCHAR(128),
+                uniqueness VARCHAR(128),
+                column_name VARCHAR(128) NOT NULL,
+                status VARCHAR(128),
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP""",
+     ("FOREIGN KEY(table_id) REFERENCES oracle_tables{suffix}(id) ON DELETE CASCADE",),
+     ()),
+)
+
+STAGING_SUFFIX = '_next'  # 影子表后缀
+RETIRED_SUFFIX = '_old'  # 交换后待删除的旧表后缀
+
+# oracle_tables中按顺序比较和写入的列：id、所有者、表名之后为可变的表属性
+TABLE_ROW_COLUMNS = ('id', 'owner', 'table_name', 'comment', 'rows_count', 'last_analyzed', 'last_ddl_time',
+                     'comment_hash')
+
+# 子表的差异比较规则：(子表, 业务键列, 值列)，同一表ID下业务键唯一
+CHILD_TABLE_COLUMNS = (
+    ('oracle_columns', ('column_name',), ('data_type', 'nullable', 'default_value', 'comment', 'column_id')),
+    ('oracle_primary_keys', ('column_name',), ()),
+    ('oracle_foreign_keys', ('constraint_name', 'column_name'), ('referenced_table', 'referenced_column')),
+    ('oracle_indices', ('index_name', 'column_name'), ('index_type', 'uniqueness', 'status')),
+)
+
+
+def table_row_values(table_info):
+    """返回table_info对应的oracle_tables行（不含id），顺序与TABLE_ROW_COLUMNS一致"""
+    return (
+        table_info['owner'],
+        table_info['name'],
+        table_info['comment'] if table_info['comment'] != "-" else None,
+        table_info['rows'],
+        table_info['last_analyzed'],
+        table_info.get('last_ddl_time'),
+        table_info.get('comment_hash')
+    )
+
+
+def child_rows(table, table_info):
+    """返回table_info中指定子表的行 {业务键: 值}，列顺序与CHILD_TABLE_COLUMNS一致"""
+    if table == 'oracle_columns':
+        return {(column['name'],): (
+            column['data_type'],
+            column['nullable'],
+            column['default'] if column['default'] != "-" else None,
+            column['comment'] if column['comment'] != "-" else None,
+            column.get('column_id')
+        ) for column in table_info['columns']}
+    if table == 'oracle_primary_keys':
+        return {(pk,): () for pk in table_info['primary_keys']}
+    if table == 'oracle_foreign_keys':
+        return {(fk[0], fk[1]): (fk[2], fk[3]) for fk in table_info['foreign_keys']}
+    return {(idx[0], idx[3]): (idx[1], idx[2], idx[4]) for idx in table_info['indices']}
+
+
+def _normalize_row(values):
+    """规范化待比较的值：MySQL的DATETIME不保存小数秒"""
+    return tuple(value.replace(microsecond=0) if isinstance(value, datetime) else value for value in values)
+
+
+def new_row_counts():
+    """创建写入行数统计：tables为变化/未变化的表数，其余为各MySQL表插入、更新、删除的行数"""
+    counts = {'tables': {'changed': 0, 'unchanged': 0}}
+    for table in ('oracle_tables',) + tuple(table for table, _, _ in CHILD_TABLE_COLUMNS):
+        counts[table] = {'inserted': 0, 'updated': 0, 'deleted': 0}
+    return counts
+
+
+def merge_row_counts(total, counts):
+    """将counts累加到total"""
+    for table, values in counts.items():
+        for name, value in values.items():
+            total[table][name] += value
+    return total
+
+
+def format_row_counts(counts):
+    """格式化写入行数统计"""
+    lines = [f"MySQL写入统计: {counts['tables']['changed']} 个表有变化，{counts['tables']['unchanged']} 个表无变化"]
+    for table, values in counts.items():
+        if table != 'tables':
+            lines.append(f"  {table}: 插入 {values['inserted']} 行，更新 {values['updated']} 行，删除 {values['deleted']} 行")
+    return '\n'.join(lines)
+
+
+def history_section(table):
+    """子表在历史增量中的段名，如oracle_columns对应columns"""
+    return table[len('oracle_'):]
+
+
+def table_state_from_info(table_info):
+    """返回历史记录跟踪的表状态：表注释和各子表行 {业务键: 值}（不含记录数、分析时间等统计信息）"""
+    state = {'comment': table_row_values(table_info)[2]}
+    for table, _, _ in CHILD_TABLE_COLUMNS:
+        state[table] = child_rows(table, table_info)
+    return state
+
+
+def child_rows_delta(table, old_rows, new_rows):
+    """比较子表行 {业务键: 值}，返回 {added, removed, changed} 增量，没有差异时返回None
+    
+    added为完整的行，removed只包含业务键，changed包含业务键和变化的列 [旧值, 新值]
+    """
+    _, key_columns, value_columns = next(t for t in CHILD_TABLE_COLUMNS if t[0] == table)
+    delta = {'added': [], 'removed': [], 'changed': []}
+    for key, values in new_rows.items():
+        old_values = old_rows.get(key)
+        if old_values is None:
+            delta['added'].append(dict(zip(key_columns + value_columns, key + values)))
+            continue
+        changes = {column: [old, new] for column, old, new in zip(value_columns, old_values, values) if old != new}
+        if changes:
+            changes.update(zip(key_columns, key))
+            delta['changed'].append(changes)
+    for key in old_rows:
+        if key not in new_rows:
+            delta['removed'].append(dict(zip(key_columns, key)))
+    return {name: rows for name, rows in delta.items() if rows} or None
+
+
+def table_delta(old_state, new_state):
+    """比较两个表状态，返回 (变化类型, 增量)，没有结构变化时返回None
+    
+    变化类型为added（新增表，增量包含全部内容）、removed（删除表）或changed
+    """
+    if new_state is None:
+        return ('removed', {}) if old_state is not None else None
+    change_type = 'added' if old_state is None else 'changed'
+    old_state = old_state or {'comment': None}
+    delta = {}
+    if change_type == 'added' or old_state['comment'] != new_state['comment']:
+        delta['comment'] = [old_state['comment'], new_state['comment']]
+    for table, _, _ in CHILD_TABLE_COLUMNS:
+        rows_delta = child_rows_delta(table, old_state.get(table, {}), new_state[table])
+        if rows_delta:
+            delta[history_section(table)] = rows_delta
+    if change_type == 'changed' and not delta:
+        return None
+    return change_type, delta
+
+
+# 可重试的MySQL错误：1213 死锁（事务已被回滚），1205 锁等待超时
+RETRYABLE_MYSQL_ERRORS = (1213, 1205)
+MYSQL_RETRY_LIMIT = 3  # 写入事务的最大重试次数
+MYSQL_RETRY_BACKOFF = 0.5  # 首次重试前的等待秒数，之后每次翻倍
+
+# 影子表替换时RENAME TABLE等待元数据锁的秒数（默认的lock_wait_timeout为一年），超时后按退避间隔重试
+RENAME_LOCK_WAIT_TIMEOUT = 2
+RENAME_RETRY_LIMIT = 10
+RENAME_RETRY_BACKOFF = 1.0
+
+
+def is_retryable_mysql_error(error):
+    """判断MySQL错误是否为可整体重试事务的死锁或锁等待超时"""
+    return (isinstance(error, pymysql.err.MySQLError) and bool(error.args)
+            and error.args[0] in RETRYABLE_MYSQL_ERRORS)
+
+
+class MySQLWriter:
+    """MySQL数据库写入器，支持将表结构信息保存到MySQL数据库"""
+    
+    def __init__(self, host, port, user, password, database, load_mode='diff'):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.database = database
+        self.load_mode = load_mode  # diff: 差异写入正式表；staging: 写入影子表，完成后原子交换；bulk: 写入暂存文件
+        self.spool = None  # bulk模式下共享的BulkLoadSpool
+        self.version = None  # 本次运行的目录版本（oracle_catalog_runs.version），为None时不记录历史
+        self.connection = None
+        self.lock = threading.Lock()  # 添加线程锁保护数据库写入
+        self.row_counts = new_row_counts()  # 已提交的表数和各表插入、更新、删除的行数
+    
+    def open(self):
+        """打开数据库连接并创建所需表"""
+        try:
+            self.connection = pymysql.connect(
+                host=self.host,
+                port=self.port,
+                user=self.user,
+                password=self.password,
+                database=self.database,
+                charset='utf8mb4',
+                local_infile=self.load_mode == 'bulk'  # LOAD DATA LOCAL INFILE需要客户端开启
+            )
+            
+            # 创建所需的表
+            self._create_tables()
+            
+            return self
+        except Exception as e:
+            print(f"MySQL连接失败: {e}")
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+            raise
+    
+    def close(self):
+        """关闭数据库连接"""
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+    
+    def __enter__(self):
+        """支持上下文管理器协议的进入方法"""
+        return self.open()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """支持上下文管理器协议的退出方法"""
+        self.close()
+        return False  # 不抑制异常
+    
+    def _create_tables(self):
+        """创建必要的数据库表"""
+        with self.connection.cursor() as cursor:
+            # 创建表信息表、列信息表、主键表、外键表和索引表
+            for table, columns, keys, _ in CATALOG_TABLES:
+                definition = ",\n                ".join((columns,) + keys).format(suffix='')
+                cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {definition}
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+            """)
+                if table == 'oracle_tables':
+                    # 兼容旧版本创建的表：补建按表名查询使用的索引和增量运行使用的列
+                    self._ensure_index(cursor, 'oracle_tables', 'idx_table_name', '(table_name)')
+                    self._ensure_column(cursor, 'oracle_tables', 'last_ddl_time', 'DATETIME AFTER last_analyzed')
+                    self._ensure_column(cursor, 'oracle_tables', 'comment_hash', 'CHAR(32) AFTER last_ddl_time')
+            
+            # 创建运行版本表和表结构增量表：每次有变化的运行一个版本，每个版本只保存发生变化的表的增量
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS oracle_catalog_runs (
+                version BIGINT AUTO_INCREMENT PRIMARY KEY,
+                run_id VARCHAR(64) NOT NULL,
+                load_mode VARCHAR(16),
+                started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                finished_at DATETIME,
+                tables_added INT NOT NULL DEFAULT 0,
+                tables_changed INT NOT NULL DEFAULT 0,
+                tables_removed INT NOT NULL DEFAULT 0,
+                KEY idx_run_id(run_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+            """)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS oracle_table_deltas (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                version BIGINT NOT NULL,
+                owner VARCHAR(128) NOT NULL,
+                table_name VARCHAR(128) NOT NULL,
+                change_type VARCHAR(16) NOT NULL,
+                delta LONGTEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                KEY idx_table_version(table_name, owner, version),
+                KEY idx_version(version)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+            """)
+            
+            # 创建目录元信息表，generation在每次分析完成后递增，API据此失效缓存
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS oracle_catalog_meta (
+                id TINYINT PRIMARY KEY,
+                generation BIGINT NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+            """)
+            
+            self.connection.commit()
+    
+    def _ensure_index(self, cursor, table, index_name, columns):
+        """索引不存在时创建索引"""
+        cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s;
+        """, (table, index_name))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {index_name} {columns};")
+    
+    def _ensure_column(self, cursor, table, column_name, definition):
+        """列不存在时添加列"""
+        cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s;
+        """, (table, column_name))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column_name} {definition};")
+    
+    def load_table_states(self, owner_filter=None, table_filter=None):
+        """读取已保存表的DDL时间和注释摘要，过滤条件与get_all_tables一致（区分大小写）
+        
+        返回 {(所有者, 表名): (last_ddl_time, comment_hash)}
+        """
+        query = "SELECT owner, table_name, last_ddl_time, comment_hash FROM oracle_tables WHERE 1 = 1"
+        params = []
+        if owner_filter:
+            query += " AND owner = BINARY %s"
+            params.append(owner_filter)
+        if table_filter:
+            query += " AND table_name LIKE BINARY %s"
+            params.append(f"%{table_filter}%")
+        
+        with self.lock:
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, params)
+                return {(row[0], row[1]): (row[2], row[3]) for row in cursor.fetchall()}
+    
+    def delete_tables(self, keys):
+        """在一个事务中删除指定的表，列、主键、外键和索引通过外键级联删除，返回删除的表数"""
+        if not keys:
+            return 0
+        with self.lock:
+            with self.connection.cursor() as cursor:
+                try:
+                    self.connection.begin()
+                    deleted = 0
+                    removed = []
+                    for owner, table_name in keys:
+                        if cursor.execute("DELETE FROM oracle_tables WHERE owner = %s AND table_name = %s;",
+                                          (owner, table_name)):
+                            deleted += 1
+                            removed.append((owner, table_name, 'removed', {}))
+                    self._insert_deltas(cursor, removed)
+                    self.connection.commit()
+                    return deleted
+                except Exception:
+                    self.connection.rollback()
+                    raise
+    
+    def begin_run(self, run_id, load_mode='diff'):
+        """登记本次运行并返回目录版本；续跑时沿用同一运行ID下未完成的版本"""
+        with self.lock:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                SELECT version FROM oracle_catalog_runs
+                WHERE run_id = %s AND finished_at IS NULL
+                ORDER BY version DESC LIMIT 1;
+                """, (run_id,))
+                row = cursor.fetchone()
+                if row:
+                    self.version = row[0]
+                else:
+                    self._record_baseline(cursor, run_id)
+                    cursor.execute("INSERT INTO oracle_catalog_runs (run_id, load_mode) VALUES (%s, %s);",
+                                   (run_id, load_mode))
+                    self.version = cursor.lastrowid
+            self.connection.commit()
+        return self.version
+    
+    def _record_baseline(self, cursor, run_id):
+        """为目录中还没有任何历史增量的表登记一个基线版本，写入包含全部内容的added增量
+        
+        差异写入只为有变化的表记录增量，开始记录历史之前已在目录中的表需要基线，
+        否则其首个changed增量无法重建出完整的表结构。基线版本在本次运行的版本之前登记并立即完成。
+        """
+        cursor.execute("""
+        SELECT t.owner, t.table_name FROM oracle_tables t
+        WHERE NOT EXISTS (
+            SELECT 1 FROM oracle_table_deltas d WHERE d.table_name = t.table_name AND d.owner = t.owner
+        );
+        """)
+        missing = {}
+        for owner, table_name in cursor.fetchall():
+            missing.setdefault(owner, set()).add(table_name)
+        if not missing:
+            return None
+        
+        cursor.execute("""
+        INSERT INTO oracle_catalog_runs (run_id, load_mode, finished_at, tables_added)
+        VALUES (%s, 'baseline', NOW(), %s);
+        """, (run_id, sum(len(names) for names in missing.values())))
+        self.version = cursor.lastrowid
+        for owner, table_names in missing.items():
+            states = self._load_table_states(cursor, '', owner)
+            self._insert_deltas(cursor, [key + table_delta(None, state) for key, state in states.items()
+                                         if key[1] in table_names])
+        print(f"已为 {sum(len(names) for names in missing.values())} 个已有表登记历史基线版本 {self.version}")
+        return self.version
+    
+    def finish_run(self):
+        """结束本次运行：统计各变化类型的表数；没有任何变化的运行删除版本记录，历史只随变化量增长
+        
+        返回本次运行的版本，没有变化时返回None
+        """
+        if self.version is None:
+            return None
+        with self.lock:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                SELECT change_type, COUNT(*) FROM oracle_table_deltas
+                WHERE version = %s GROUP BY change_type;
+                """, (self.version,))
+                changes = dict(cursor.fetchall())
+                if changes:
+                    cursor.execute("""
+                    UPDATE oracle_catalog_runs
+                    SET finished_at = NOW(), tables_added = %s, tables_changed = %s, tables_removed = %s
+                    WHERE version = %s;
+                    """, (changes.get('added', 0), changes.get('changed', 0), changes.get('removed', 0), self.version))
+                else:
+                    cursor.execute("DELETE FROM oracle_catalog_runs WHERE version = %s;", (self.version,))
+            self.connection.commit()
+        return self.version if changes else None
+    
+    def _insert_deltas(self, cursor, deltas):
+        """在当前事务内写入表结构增量 [(所有者, 表名, 变化类型, 增量)]"""
+        if self.version is None or not deltas:
+            return
+        cursor.executemany("""
+        INSERT INTO oracle_table_deltas (version, owner, table_name, change_type, delta)
+        VALUES (%s, %s, %s, %s, %s)
+        """, [(self.version, owner, table_name, change_type, json.dumps(delta, ensure_ascii=False, default=str))
+              for owner, table_name, change_type, delta in deltas])
+    
+    def bump_generation(self):
+        """递增目录版本号，通知API丢弃已缓存的表结构"""
+        try:
+            with self.lock:
+                if not self.connection:
+                    print("MySQL连接已关闭，无法更新目录版本号")
+                    return None
+                
+                with self.connection.cursor() as cursor:
+                    cursor.execute("""
+                    INSERT INTO oracle_catalog_meta (id, generation)
+                    VALUES (1, 1)
+                    ON DUPLICATE KEY UPDATE generation = generation + 1;
+                    """)
+                    cursor.execute("SELECT generation FROM oracle_catalog_meta WHERE id = 1;")
+                    generation = cursor.fetchone()[0]
+                self.connection.commit()
+                return generation
+        except Exception as e:
+            print(f"更新目录版本号失败: {e}")
+            return None
+    
+    def _load_existing(self, cursor, table_infos):
+        """读取一批表在MySQL中已保存的表行和子表行
+        
+        返回 (已有表 {(所有者, 表名): 表行}, 已有子表行 {子表: {表ID: [行]}})
+        """
+        keys = [(t['owner'], t['name']) for t in table_infos]
+        cursor.execute(f"""
+        SELECT {', '.join(TABLE_ROW_COLUMNS)} FROM oracle_tables
+        WHERE (owner, table_name) IN ({', '.join(['(%s, %s)'] * len(keys))});
+        """, [value for key in keys for value in key])
+        existing_tables = {(row[1], row[2]): row for row in cursor.fetchall()}
+        
+        existing_children = {table: {} for table, _, _ in CHILD_TABLE_COLUMNS}
+        self._load_children(cursor, [row[0] for row in existing_tables.values()], existing_children)
+        return existing_tables, existing_children
+    
+    def _load_children(self, cursor, table_ids, existing_children):
+        """读取指定表ID的子表行，按表ID分组加入existing_children"""
+        if not table_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(table_ids))
+        for table, key_columns, value_columns in CHILD_TABLE_COLUMNS:
+            cursor.execute(f"""
+            SELECT id, table_id, {', '.join(key_columns + value_columns)} FROM {table}
+            WHERE table_id IN ({placeholders});
+            """, table_ids)
+            rows = existing_children[table]
+            for row in cursor.fetchall():
+                rows.setdefault(row[1], []).append(row)
+    
+    def _apply_table_changes(self, cursor, table_info, existing_table, existing_children, counts):
+        """比较单个表的表行和子表行，只写入有差异的行
+        
+        返回 (是否有写入, 表结构增量)，表结构没有变化时增量为None
+        """
+        changed = False
+        new_state = table_state_from_info(table_info)
+        old_state = None
+        table_row = table_row_values(table_info)
+        if existing_table is None:
+            # 新表：插入表行，通过LAST_INSERT_ID(id)取回表ID（并发写入同名表时更新已有行）
+            cursor.execute(f"""
+            INSERT INTO oracle_tables 
+                ({', '.join(TABLE_ROW_COLUMNS[1:])})
+            VALUES 
+                ({', '.join(['%s'] * (len(TABLE_ROW_COLUMNS) - 1))})
+            ON DUPLICATE KEY UPDATE
+                id = LAST_INSERT_ID(id),
+                {', '.join(f'{column} = VALUES({column})' for column in TABLE_ROW_COLUMNS[3:])};
+            """, table_row)
+            table_id = cursor.lastrowid
+            if cursor.rowcount == 1:
+                counts['oracle_tables']['inserted'] += 1
+            else:
+                # 已有仅大小写不同的同名表（MySQL排序规则不区分大小写），按已有子表行比较
+                counts['oracle_tables']['updated'] += 1
+                self._load_children(cursor, [table_id], existing_children)
+                old_state = {'comment': table_row[2]}
+            changed = True
+        else:
+            table_id = existing_table[0]
+            old_state = {'comment': existing_table[3]}
+            if _normalize_row(existing_table[3:]) != _normalize_row(table_row[2:]):
+                cursor.execute(f"""
+                UPDATE oracle_tables SET {', '.join(f'{column} = %s' for column in TABLE_ROW_COLUMNS[3:])}
+                WHERE id = %s;
+                """, table_row[2:] + (table_id,))
+                counts['oracle_tables']['updated'] += 1
+                changed = True
+        
+        for table, key_columns, value_columns in CHILD_TABLE_COLUMNS:
+            key_length = len(key_columns)
+            wanted = child_rows(table, table_info)
+            
+            # 按业务键比较：多余的行删除，值不同的行按ID更新，缺少的行插入
+            deletes, updates = [], []
+            existing_rows = existing_children[table].get(table_id, ())
+            if old_state is not None:
+                old_state[table] = {row[2:2 + key_length]: tuple(row[2 + key_length:]) for row in existing_rows}
+            for row in existing_rows:
+                key, values = row[2:2 + key_length], row[2 + key_length:]
+                if key not in wanted:
+                    deletes.append(row[0])  # 已不存在的行，或旧版本写入的重复行
+                    continue
+                target = wanted.pop(key)
+                if _normalize_row(values) != _normalize_row(target):
+                    updates.append(target + (row[0],))
+            
+            if deletes:
+                cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(deletes))});", deletes)
+            if updates:
+                cursor.executemany(f"""
+                UPDATE {table} SET {', '.join(f'{column} = %s' for column in value_columns)}
+                WHERE id = %s
+                """, updates)
+            if wanted:
+                # executemany会将多行合并为一条多VALUES的INSERT语句
+                cursor.executemany(f"""
+                INSERT INTO {table} 
+                    (table_id, {', '.join(key_columns + value_columns)})
+                VALUES 
+                    ({', '.join(['%s'] * (1 + key_length + len(value_columns)))})
+                """, [(table_id,) + key + values for key, values in wanted.items()])
+            
+            counts[table]['deleted'] += len(deletes)
+            counts[table]['updated'] += len(updates)
+            counts[table]['inserted'] += len(wanted)
+            changed = changed or bool(deletes or updates or wanted)
+        return changed, table_delta(old_state, new_state)
+    
+    def _save_changes(self, cursor, table_infos):
+        """计算一批表与MySQL中已有数据的差异并只写入变化的行
+        
+        没有任何差异时只执行读取，不产生写事务和binlog；返回本批的行数统计
+        """
+        counts = new_row_counts()
+        changed = 0
+        deltas = []
+        try:
+            existing_tables, existing_children = self._load_existing(cursor, table_infos)
+            for table_info in table_infos:
+                existing_table = existing_tables.get((table_info['owner'], table_info['name']))
+                written, delta = self._apply_table_changes(cursor, table_info, existing_table, existing_children, counts)
+                if written:
+                    changed += 1
+                if delta:
+                    deltas.append((table_info['owner'], table_info['name']) + delta)
+            # 表结构增量与数据变化在同一事务中提交
+            self._insert_deltas(cursor, deltas)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        
+        counts['tables']['changed'] = changed
+        counts['tables']['unchanged'] = len(table_infos) - changed
+        return counts
+    
+    def prepare_staging(self, resume=False):
+        """创建空的影子表（oracle_tables_next等），只保留加载必需的键
+        
+        续跑时保留已有的影子表，继续加载未完成的表
+        """
+        with self.lock:
+            with self.connection.cursor() as cursor:
+                if resume:
+                    # 续跑跳过已完成的表，影子表不存在时替换会丢失这些表
+                    if not self._staging_exists(cursor):
+                        raise RuntimeError(f"影子表 oracle_tables{STAGING_SUFFIX} 等不存在（上次运行可能已完成替换），"
+                                           f"无法续跑影子表加载，请重新执行全量运行")
+                    cursor.execute(f"SELECT COUNT(*) FROM oracle_tables{STAGING_SUFFIX};")
+                    print(f"续跑影子表加载：oracle_tables{STAGING_SUFFIX} 中已有 {cursor.fetchone()[0]} 个表")
+                    return
+                
+                self._drop_tables(cursor, STAGING_SUFFIX)
+                for table, columns, _, load_keys in CATALOG_TABLES:
+                    definition = ",\n                ".join((columns,) + load_keys)
+                    cursor.execute(f"""
+                    CREATE TABLE {table}{STAGING_SUFFIX} (
+                        {definition}
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                    """)
+            self.connection.commit()
+    
+    def _staging_exists(self, cursor):
+        """影子表是否全部存在"""
+        cursor.execute(f"""
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name IN ({', '.join(['%s'] * len(CATALOG_TABLES))});
+        """, [table + STAGING_SUFFIX for table, _, _, _ in CATALOG_TABLES])
+        return cursor.fetchone()[0] == len(CATALOG_TABLES)
+    
+    def _drop_tables(self, cursor, suffix):
+        """删除指定后缀的一组目录表，先删除子表再删除表信息表"""
+        for table, _, _, _ in reversed(CATALOG_TABLES):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}{suffix};")
+    
+    def publish_staging(self):
+        """为影子表创建索引和外键，并用一条RENAME TABLE原子替换正式表
+        
+        API的读取只会看到替换前或替换后的完整目录；创建索引期间不影响正式表
+        """
+        with self.lock:
+            with self.connection.cursor() as cursor:
+                start_time = time.time()
+                # 数据由本工具一次性加载，外键关系已知正确，创建外键时跳过逐行校验
+                cursor.execute("SET SESSION foreign_key_checks = 0;")
+                try:
+                    for table, _, keys, load_keys in CATALOG_TABLES:
+                        deferred = [key.format(suffix=STAGING_SUFFIX) for key in keys if key not in load_keys]
+                        if deferred:
+                            cursor.execute(f"ALTER TABLE {table}{STAGING_SUFFIX} "
+                                           f"{', '.join('ADD ' + key for key in deferred)};")
+                finally:
+                    cursor.execute("SET SESSION foreign_key_checks = 1;")
+                print(f"影子表索引创建完成，耗时 {time.time() - start_time:.2f} 秒")
+                
+                # 替换前比较正式表和影子表，记录本次运行的表结构增量（RENAME会隐式提交）
+                if self.version is not None:
+                    self._record_staging_deltas(cursor)
+                
+                # 清理上次交换后未删除的旧表，再在一条语句中完成全部交换
+                self._drop_tables(cursor, RETIRED_SUFFIX)
+                renames = []
+                for table, _, _, _ in CATALOG_TABLES:
+                    renames.append(f"{table} TO {table}{RETIRED_SUFFIX}")
+                for table, _, _, _ in CATALOG_TABLES:
+                    renames.append(f"{table}{STAGING_SUFFIX} TO {table}")
+                try:
+                    self._rename_with_retry(cursor, f"RENAME TABLE {', '.join(renames)};")
+                except Exception:
+                    # 替换失败时撤销已记录的增量
+                    if self.version is not None:
+                        cursor.execute("DELETE FROM oracle_table_deltas WHERE version = %s;", (self.version,))
+                        self.connection.commit()
+                    raise
+                self._drop_tables(cursor, RETIRED_SUFFIX)
+            self.connection.commit()
+    
+    def _rename_with_retry(self, cursor, statement):
+        """以较短的lock_wait_timeout执行RENAME TABLE，等待元数据锁超时后退避重试
+        
+        RENAME需要等待正在读取正式表的API查询（如流式导出）释放元数据锁，排队期间后续的API查询也会被阻塞；
+        限制等待时间后最多阻塞API查询几秒，超时即放弃本次尝试，让排队的查询先执行
+        """
+        cursor.execute(f"SET SESSION lock_wait_timeout = {RENAME_LOCK_WAIT_TIMEOUT};")
+        try:
+            attempt = 0
+            while True:
+                try:
+                    cursor.execute(statement)
+                    return
+                except Exception as e:
+                    if not is_retryable_mysql_error(e) or attempt >= RENAME_RETRY_LIMIT:
+                        raise
+                    delay = min(RENAME_RETRY_BACKOFF * (2 ** attempt), 60)
+                    attempt += 1
+                    print(f"替换正式表时等待元数据锁超时，{delay:.1f} 秒后第 {attempt} 次重试: {e}")
+                    time.sleep(delay)
+        finally:
+            cursor.execute("SET SESSION lock_wait_timeout = DEFAULT;")
+    
+    def _load_table_states(self, cursor, suffix, owner):
+        """读取指定所有者全部表的历史跟踪状态 {(所有者, 表名): 状态}，suffix为空时读取正式表"""
+        cursor.execute(f"SELECT id, table_name, comment FROM oracle_tables{suffix} WHERE owner = %s;", (owner,))
+        states = {}
+        for table_id, table_name, comment in cursor.fetchall():
+            states[table_id] = (table_name, {'comment': comment})
+            for table, _, _ in CHILD_TABLE_COLUMNS:
+                states[table_id][1][table] = {}
+        for table, key_columns, value_columns in CHILD_TABLE_COLUMNS:
+            cursor.execute(f"""
+            SELECT c.table_id, {', '.join(f'c.{column}' for column in key_columns + value_columns)}
+            FROM {table}{suffix} c JOIN oracle_tables{suffix} t ON t.id = c.table_id
+            WHERE t.owner = %s;
+            """, (owner,))
+            for row in cursor.fetchall():
+                state = states[row[0]][1]
+                state[table][tuple(row[1:1 + len(key_columns)])] = tuple(row[1 + len(key_columns):])
+        return {(owner, table_name): state for table_name, state in states.values()}
+    
+    def _record_staging_deltas(self, cursor):
+        """逐个所有者比较正式表和影子表，写入表结构增量，返回增量数"""
+        cursor.execute(f"SELECT owner FROM oracle_tables UNION SELECT owner FROM oracle_tables{STAGING_SUFFIX};")
+        owners = [row[0] for row in cursor.fetchall()]
+        recorded = 0
+        for owner in owners:
+            old_states = self._load_table_states(cursor, '', owner)
+            new_states = self._load_table_states(cursor, STAGING_SUFFIX, owner)
+            deltas = []
+            for key in sorted(old_states.keys() | new_states.keys()):
+                delta = table_delta(old_states.get(key), new_states.get(key))
+                if delta:
+                    deltas.append(key + delta)
+            self._insert_deltas(cursor, deltas)
+            recorded += len(deltas)
+        self.connection.commit()
+        print(f"已记录版本 {self.version} 的 {recorded} 个表结构增量")
+        return recorded
+    
+    def load_spool(self, spool):
+        """创建空的影子表，通过LOAD DATA LOCAL INFILE加载暂存文件
+        
+        子表的table_id在加载时按 (所有者, 表名) 从oracle_tables_next中解析；加载行数与暂存行数不一致时抛出异常
+        """
+        self.prepare_staging()
+        with self.lock:
+            with self.connection.cursor() as cursor:
+                try:
+                    for table, key_columns, value_columns in (('oracle_tables', (), TABLE_ROW_COLUMNS[1:]),) + CHILD_TABLE_COLUMNS:
+                        start_time = time.time()
+                        if table == 'oracle_tables':
+                            columns, resolve = ', '.join(value_columns), ""
+                        else:
+                            columns = ', '.join(('@owner', '@table_name') + key_columns + value_columns)
+                            resolve = (f"SET table_id = (SELECT id FROM oracle_tables{STAGING_SUFFIX} "
+                                       f"WHERE owner = @owner AND table_name = @table_name)")
+                        loaded = cursor.execute(f"""
+                        LOAD DATA LOCAL INFILE %s INTO TABLE {table}{STAGING_SUFFIX}
+                        CHARACTER SET utf8mb4
+                        FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                        LINES TERMINATED BY '\\n'
+                        ({columns})
+                        {resolve};
+                        """, (spool.path(table),))
+                        expected = spool.rows[table]
+                        print(f"LOAD DATA {table}{STAGING_SUFFIX}: {loaded} 行，耗时 {time.time() - start_time:.2f} 秒")
+                        if loaded != expected:
+                            raise RuntimeError(f"{table}{STAGING_SUFFIX} 加载了 {loaded} 行，暂存文件中有 {expected} 行")
+                    self.connection.commit()
+                except Exception:
+                    self.connection.rollback()
+                    raise
+    
+    def _save_staged(self, cursor, table_infos):
+        """将一批表插入影子表，返回本批的行数统计
+        
+        影子表为空表，直接插入全部行；续跑时已加载过的表先删除旧的子表行
+        """
+        counts = new_row_counts()
+        try:
+            for table_info in table_infos:
+                cursor.execute(f"""
+                INSERT INTO oracle_tables{STAGING_SUFFIX} 
+                    ({', '.join(TABLE_ROW_COLUMNS[1:])})
+                VALUES 
+                    ({', '.join(['%s'] * (len(TABLE_ROW_COLUMNS) - 1))})
+                ON DUPLICATE KEY UPDATE
+                    id = LAST_INSERT_ID(id),
+                    {', '.join(f'{column} = VALUES({column})' for column in TABLE_ROW_COLUMNS[3:])};
+                """, table_row_values(table_info))
+                table_id = cursor.lastrowid
+                reloaded = cursor.rowcount != 1
+                counts['oracle_tables']['updated' if reloaded else 'inserted'] += 1
+                
+                for table, key_columns, value_columns in CHILD_TABLE_COLUMNS:
+                    if reloaded:
+                        counts[table]['deleted'] += cursor.execute(
+                            f"DELETE FROM {table}{STAGING_SUFFIX} WHERE table_id = %s;", (table_id,))
+                    rows = child_rows(table, table_info)
+                    if rows:
+                        cursor.executemany(f"""
+                        INSERT INTO {table}{STAGING_SUFFIX} 
+                            (table_id, {', '.join(key_columns + value_columns)})
+                        VALUES 
+                            ({', '.join(['%s'] * (1 + len(key_columns) + len(value_columns)))})
+                        """, [(table_id,) + key + values for key, values in rows.items()])
+                        counts[table]['inserted'] += len(rows)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        
+        counts['tables']['changed'] = len(table_infos)
+        return counts
+    
+    def save_tables(self, table_infos):
+        """在一个事务中保存多个表，返回保存失败的表列表
+        
+        整批写入失败时回滚，再逐表单独提交，避免一个表的问题导致整批丢失；
+        死锁和锁等待超时会先按退避间隔重试整个事务
+        """
+        try:
+            with self.lock:  # 使用线程锁
+                if not self.connection:
+                    print("MySQL连接已关闭，无法保存数据")
+                    return list(table_infos)
+                
+                try:
+                    self._save_locked(table_infos)
+                    return []
+                except Exception as e:
+                    # 发生错误，事务已回滚
+                    if len(table_infos) == 1:
+                        table_info = table_infos[0]
+                        print(f"保存表 {table_info['owner']}.{table_info['name']} 到MySQL时出错，事务已回滚: {e}")
+                        return list(table_infos)
+                    print(f"批量保存 {len(table_infos)} 个表到MySQL时出错，事务已回滚，改为逐表保存: {e}")
+                
+                # 仍在锁内逐表保存，直接调用不加锁的_save_locked（self.lock不可重入）
+                failed = []
+                for table_info in table_infos:
+                    try:
+                        self._save_locked([table_info])
+                    except Exception as e:
+                        print(f"保存表 {table_info['owner']}.{table_info['name']} 到MySQL时出错，事务已回滚: {e}")
+                        failed.append(table_info)
+                return failed
+                    
+        except Exception as e:
+            print(f"保存 {len(table_infos)} 个表到MySQL时出错: {e}")
+            return list(table_infos)
+    
+    def _save_locked(self, table_infos):
+        """在调用方已持有self.lock时写入一批表，失败时抛出异常（事务已回滚）
+        
+        只写入差异行，一批表的变化在同一事务中提交，确保原子性
+        """
+        attempt = 0
+        while True:
+            try:
+                with self.connection.cursor() as cursor:
+                    if self.load_mode == 'bulk':
+                        counts = self.spool.append(table_infos)
+                    elif self.load_mode == 'staging':
+                        counts = self._save_staged(cursor, table_infos)
+                    else:
+                        counts = self._save_changes(cursor, table_infos)
+                merge_row_counts(self.row_counts, counts)
+                return
+            except Exception as e:
+                if not is_retryable_mysql_error(e) or attempt >= MYSQL_RETRY_LIMIT:
+                    raise
+                delay = MYSQL_RETRY_BACKOFF * (2 ** attempt)
+                attempt += 1
+                print(f"写入MySQL遇到死锁或锁等待超时，{delay:.1f} 秒后第 {attempt} 次重试: {e}")
+                time.sleep(delay)
+    
+    def save_table_info(self, table_info):
+        """保存表信息到MySQL数据库"""
+        return not self.save_tables([table_info])
+
+
+def _tsv_field(value):
+    """按LOAD DATA默认格式转义单个字段：NULL写为\\N，反斜杠、制表符、换行符使用反斜杠转义"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+            .replace('\r', '\\r').replace('\0', '\\0'))
+
+
+class BulkLoadSpool:
+    """LOAD DATA批量加载使用的暂存文件
+    
+    每个目录表对应 <目录>/<表名>.tsv，格式与LOAD DATA默认格式一致（制表符分隔、反斜杠转义）；
+    子表行用 (所有者, 表名) 代替table_id，加载时再解析为表ID。
+    每写完一个表向 <目录>/spool.idx 追加一行 {owner, table, sizes, rows}，续跑时截断到最后一个完整写入的表。
+    """
+    
+    TABLES = tuple(table for table, _, _, _ in CATALOG_TABLES)
+    
+    def __init__(self, directory, resume=False):
+        self.directory = directory
+        self.resume = resume
+        self.index_file = os.path.join(directory, 'spool.idx')
+        self.files = {}
+        self.index = None
+        self.keys = set()  # 已写入的 (所有者, 表名)
+        self.rows = dict.fromkeys(self.TABLES, 0)  # 各文件已写入的行数
+        self.sizes = dict.fromkeys(self.TABLES, 0)  # 各文件最后一个完整写入的表之后的大小
+        self.lock = threading.Lock()
+    
+    def path(self, table):
+        """返回目录表对应的暂存文件路径"""
+        return os.path.join(self.directory, f"{table}.tsv")
+    
+    def open(self):
+        """打开暂存文件；续跑时读取索引并截断未写完的尾部，否则清空旧文件"""
+        valid_lines = []
+        if self.resume and os.path.exists(self.index_file):
+            with open(self.index_file, 'r', encoding='utf-8') as index_file:
+                for line in index_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # 中断时写了一半的行
+                    valid_lines.append(line)
+                    self.keys.add((record['owner'], record['table']))
+                    self.sizes.update(record['sizes'])
+                    self.rows.update(record['rows'])
+            print(f"续跑批量加载：暂存文件中已有 {len(self.keys)} 个表")
+        elif os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+        
+        # 截断最后一个完整写入的表之后的内容，并重写索引丢弃写了一半的行
+        for table in self.TABLES:
+            self.files[table] = open(self.path(table), 'ab')
+            self.files[table].truncate(self.sizes[table])
+        with open(self.index_file + '.tmp', 'w', encoding='utf-8') as index_file:
+            index_file.writelines(valid_lines)
+        os.replace(self.index_file + '.tmp', self.index_file)
+        self.index = open(self.index_file, 'a', encoding='utf-8')
+        return self
+    
+    def close(self):
+        """关闭暂存文件"""
+        for spool_file in self.files.values():
+            spool_file.close()
+        self.files = {}
+        if self.index:
+            self.index.close()
+            self.index = None
+    
+    def remove(self):
+        """加载完成后删除暂存目录"""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def _table_lines(self, table_info):
+        """返回一个表在各暂存文件中的行 {目录表: [行]}"""
+        owner, table_name = table_info['owner'], table_info['name']
+        lines = {'oracle_tables': ['\t'.join(map(_tsv_field, table_row_values(table_info))) + '\n']}
+        for table, _, _ in CHILD_TABLE_COLUMNS:
+            lines[table] = ['\t'.join(map(_tsv_field, (owner, table_name) + key + values)) + '\n'
+                            for key, values in child_rows(table, table_info).items()]
+        return lines
+    
+    def append(self, table_infos):
+        """追加一批表，返回本批的行数统计；已写入过的表（上次运行写入后中断）直接跳过"""
+        counts = new_row_counts()
+        with self.lock:
+            for table_info in table_infos:
+                key = (table_info['owner'], table_info['name'])
+                if key in self.keys:
+                    counts['tables']['unchanged'] += 1
+                    continue
+                table_lines = self._table_lines(table_info)
+                try:
+                    for table, lines in table_lines.items():
+                        spool_file = self.files[table]
+                        spool_file.write(''.join(lines).encode('utf-8'))
+                        spool_file.flush()
+                except Exception:
+                    # 丢弃写了一半的表，保持暂存文件与索引一致
+                    for table, spool_file in self.files.items():
+                        spool_file.truncate(self.sizes[table])
+                    raise
+                for table, lines in table_lines.items():
+                    self.sizes[table] = self.files[table].tell()
+                    self.rows[table] += len(lines)
+                    counts[table]['inserted'] += len(lines)
+                self.keys.add(key)
+                self.index.write(json.dumps({'owner': key[0], 'table': key[1], 'sizes': self.sizes, 'rows': self.rows},
+                                            ensure_ascii=False) + '\n')
+                self.index.flush()
+                counts['tables']['changed'] += 1
+        return counts
+
+
+class ConcurrentMySQLWriter:
+    """并发MySQL写入器
+    
+    分析线程将表信息放入有界队列，多个写入线程各自持有一个MySQL连接，
+    每次从队列取出若干个表在同一事务中提交。队列满时save_table_info阻塞，对分析端形成背压。
+    """
+    
+    _STOP = object()  # 写入线程退出标记
+    
+    def __init__(self, mysql_params, writers=4, batch_size=20, queue_size=200, on_saved=None, resume=False):
+        self.mysql_params = mysql_params
+        self.load_mode = mysql_params.get('load', 'diff')
+        self.resume = resume  # 续跑时继续使用上次未完成的影子表或暂存文件
+        self.spool = None
+        self.on_saved = on_saved  # 表提交成功后在写入线程中调用，参数为table_info
+        self.writers_count = max(1, writers)
+        self.batch_size = max(1, batch_size)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.writers = []
+        self.threads = []
+        self.saved_count = 0
+        self.failed_tables = []
+        self.stats_lock = threading.Lock()
+    
+    def _create_writer(self):
+        """创建单个写入连接"""
+        return MySQLWriter(
+            host=self.mysql_params.get('host', 'localhost'),
+            port=self.mysql_params.get('port', 3306),
+            user=self.mysql_params.get('user', 'root'),
+            password=self.mysql_params.get('password', ''),
+            database=self.mysql_params.get('database', 'oracle_metadata'),
+            load_mode=self.load_mode
+        )
+    
+    def open(self):
+        """打开所有写入连接并启动写入线程"""
+        try:
+            for i in range(self.writers_count):
+                self.writers.append(self._create_writer().open())
+            # 登记运行版本，各写入连接在同一版本下记录表结构增量
+            version = self.writers[0].begin_run(self.mysql_params.get('run_id') or datetime.now().strftime('%Y%m%d-%H%M%S'),
+                                                self.load_mode)
+            for writer in self.writers:
+                writer.version = version
+            if self.load_mode == 'staging':
+                self.writers[0].prepare_staging(self.resume)
+            elif self.load_mode == 'bulk':
+                # 写入线程共享暂存文件，运行结束后一次性加载
+                self.spool = BulkLoadSpool(self.mysql_params.get('spool_dir', '.bulk_spool'), self.resume).open()
+                for writer in self.writers:
+                    writer.spool = self.spool
+        except Exception:
+            for writer in self.writers:
+                writer.close()
+            self.writers = []
+            raise
+        
+        for i, writer in enumerate(self.writers):
+            thread = threading.Thread(target=self._writer_loop, args=(writer,), name=f"mysql-writer-{i+1}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+    
+    def __enter__(self):
+        """支持上下文管理器协议的进入方法"""
+        return self.open()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """支持上下文管理器协议的退出方法"""
+        self.close()
+        return False  # 不抑制异常
+    
+    def _writer_loop(self, writer):
+        """写入线程：从队列取出一批表并在一个事务中提交"""
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is self._STOP:
+                self.queue.task_done()
+                break
+            
+            batch = [item]
+            # 尽量凑满一批，队列暂时为空时立即提交已取出的表
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    self.queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            try:
+                failed = writer.save_tables(batch)
+                with self.stats_lock:
+                    self.saved_count += len(batch) - len(failed)
+                    self.failed_tables.extend(f"{t['owner']}.{t['name']}" for t in failed)
+                if self.on_saved:
+                    failed_ids = {id(t) for t in failed}
+                    for table_info in batch:
+                        if id(table_info) not in failed_ids:
+                            self.on_saved(table_info)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    
+    def save_table_info(self, table_info):
+        """将表信息放入写入队列，队列满时阻塞等待"""
+        if not self.threads:
+            print("MySQL写入线程未启动，无法保存数据")
+            return False
+        self.queue.put(table_info)
+        return True
+    
+    def flush(self):
+        """等待队列中已提交的表全部写入完成"""
+        self.queue.join()
+    
+    def publish(self, complete=True):
+        """等待写入完成；影子表加载模式下在全部表加载成功后交换影子表
+        
+        返回正式表是否已更新（差异写入模式下总是已更新）
+        """
+        self.flush()
+        if not self.writers:
+            return True
+        if self.load_mode == 'diff':
+            self._finish_run()
+            return True
+        if not complete or self.failed_tables:
+            kept = f"暂存文件 {self.spool.directory}" if self.spool else f"oracle_tables{STAGING_SUFFIX} 等影子表"
+            print(f"存在失败的表，影子表未替换正式表，API继续使用原有目录；续跑成功后再替换（{kept}已保留）")
+            return False
+        try:
+            if self.spool:
+                self.spool.close()
+                self.writers[0].load_spool(self.spool)
+            self.writers[0].publish_staging()
+            print("影子表已原子替换正式目录表")
+            if self.spool:
+                self.spool.remove()
+            self._finish_run()
+            return True
+        except Exception as e:
+            print(f"替换正式目录表失败，API继续使用原有目录: {e}")
+            return False
+    
+    def _finish_run(self):
+        """结束运行版本并输出版本号"""
+        try:
+            version = self.writers[0].finish_run()
+            print(f"目录历史版本: {version}" if version is not None else "本次运行没有表结构变化，未生成历史版本")
+        except Exception as e:
+            print(f"记录目录历史版本失败: {e}")
+    
+    def bump_generation(self):
+        """等待写入完成后递增目录版本号"""
+        self.flush()
+        return self.writers[0].bump_generation() if self.writers else None
+    
+    def close(self):
+        """等待队列写完，停止写入线程并关闭连接"""
+        for _ in self.threads:
+            self.queue.put(self._STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        
+        row_counts = new_row_counts()
+        for writer in self.writers:
+            merge_row_counts(row_counts, writer.row_counts)
+            writer.close()
+        self.writers = []
+        if self.spool:
+            self.spool.close()
+        if self.saved_count:
+            print(format_row_counts(row_counts))
+        
+        if self.failed_tables:
+            print(f"错误：{len(self.failed_tables)} 个表保存到MySQL失败: {', '.join(self.failed_tables[:20])}"
+                  f"{' ...' if len(self.failed_tables) > 20 else ''}")
+
+
+class CheckpointJournal:
+    """断点续跑日志
+    
+    每次运行对应 <目录>/<运行ID>.jsonl，每行一条JSON记录表的完成或失败状态。
+    表在写入MySQL（未启用MySQL时为写入Markdown）后才记为完成，续跑时跳过已完成的表。
+    """
+    
+    def __init__(self, directory, run_id):
+        self.directory = directory
+        self.run_id = run_id
+        self.path = os.path.join(directory, f"{run_id}.jsonl")
+        self.file = None
+        self.completed = set()
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def latest_run_id(directory):
+        """返回目录中最近修改的日志对应的运行ID，没有日志时返回None"""
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith('.jsonl')]
+        except FileNotFoundError:
+            return None
+        if not names:
+            return None
+        latest = max(names, key=lambda name: os.path.getmtime(os.path.join(directory, name)))
+        return latest[:-len('.jsonl')]
+    
+    def open(self, resume=False):
+        """打开日志，续跑时先读取已完成的表"""
+        os.makedirs(self.directory, exist_ok=True)
+        if resume and os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as journal_file:
+                for line in journal_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 中断时写了一半的行
+                    key = (record.get('owner'), record.get('table'))
+                    if record.get('status') == 'done':
+                        self.completed.add(key)
+                    else:
+                        self.completed.discard(key)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        return self
+    
+    def close(self):
+        """关闭日志文件"""
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+    
+    def __enter__(self):
+        """支持上下文管理器协议的进入方法"""
+        return self.open()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """支持上下文管理器协议的退出方法"""
+        self.close()
+        return False  # 不抑制异常
+    
+    def is_done(self, owner, table_name):
+        """表是否已在之前的运行中完成"""
+        return (owner, table_name) in self.completed
+    
+    def _record(self, owner, table_name, status, error=None):
+        record = {'owner': owner, 'table': table_name, 'status': status,
+                  'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        if error:
+            record['error'] = error
+        with self.lock:
+            if status == 'done':
+                self.completed.add((owner, table_name))
+            if self.file:
+                self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.file.flush()
+    
+    def mark_done(self, owner, table_name):
+        """记录表已完成"""
+        self._record(owner, table_name, 'done')
+    
+    def mark_failed(self, owner, table_name, error=None):
+        """记录表分析失败，续跑时会重新分析"""
+        self._record(owner, table_name, 'failed', error)
+
+
+# 可重试的Oracle临时错误：连接断开、网络超时、调用超时
+TRANSIENT_ORACLE_ERRORS = ('ORA-03113', 'ORA-03114', 'ORA-03135', 'ORA-12170', 'ORA-12571', 'DPI-1067', 'DPI-1080',
+                           'DPY-4011', 'DPY-4024')  # DPY-为python-oracledb Thin模式的错误码
+
+
+def is_transient_oracle_error(error):
+    """判断Oracle错误是否为可重试的临时错误"""
+    message = str(error)
+    return any(code in message for code in TRANSIENT_ORACLE_ERRORS)
+
+
+def release_oracle_connection(pool, connection, broken=False):
+    """归还连接到连接池，连接已损坏时从池中丢弃"""
+    try:
+        if broken:
+            pool.drop(connection)
+        else:
+            pool.release(connection)
+    except Exception:
+        pass
+
+
+class LatencyHistogram:
+    """延迟直方图，桶边界按毫秒约2~2.5倍递增，用于运行结束时报告延迟分布"""
     
-    def close(self):
-        """关闭数据库连接"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
+    BOUNDS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
     
-    def __enter__(self):
-        """支持上下文管理器协议的进入方法"""
-        return self.open()
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
     
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """支持上下文管理器协议的退出方法"""
-        self.close()
-        return False  # 不抑制异常
+    def add(self, seconds):
+        """记录一次耗时（秒）"""
+        bucket = bisect.bisect_left(self.BOUNDS_MS, seconds * 1000)
+        with self.lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
     
-    def _create_tables(self):
-        """创建必要的数据库表"""
-        with self.connection.cursor() as cursor:
-            # 创建表信息表
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS oracle_tables (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                owner VARCHAR(128) NOT NULL,
-                table_name VARCHAR(128) NOT NULL,
-                comment TEXT,
-                rows_count BIGINT,
-                last_analyzed DATETIME,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE KEY(owner, table_name)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
-            
-            # 创建列信息表
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS oracle_columns (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                table_id INT NOT NULL,
-                column_name VARCHAR(128) NOT NULL,
-                data_type VARCHAR(128),
-                nullable VARCHAR(3),
-                default_value TEXT,
-                comment TEXT,
-                column_id INT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE KEY(table_id, column_name),
-                FOREIGN KEY(table_id) REFERENCES oracle_tables(id) ON DELETE CASCADE
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
-            
-            # 创建主键表
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS oracle_primary_keys (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                table_id INT NOT NULL,
-                column_name VARCHAR(128) NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE KEY(table_id, column_name),
-                FOREIGN KEY(table_id) REFERENCES oracle_tables(id) ON DELETE CASCADE
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
+    def percentile(self, p):
+        """返回第p百分位所在桶的上界（毫秒），最后一个桶返回最大值"""
+        if not self.count:
+            return 0
+        rank = p / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.BOUNDS_MS[bucket] if bucket < len(self.BOUNDS_MS) else round(self.max * 1000)
+        return round(self.max * 1000)
+    
+    def report(self, title):
+        """输出直方图"""
+        if not self.count:
+            return
+        print(f"{title}: 共 {self.count} 次，平均 {self.total / self.count * 1000:.0f}ms，"
+              f"P50≤{self.percentile(50)}ms，P90≤{self.percentile(90)}ms，P99≤{self.percentile(99)}ms，"
+              f"最大 {self.max * 1000:.0f}ms")
+        lower = 0
+        for bucket, count in enumerate(self.counts):
+            upper = self.BOUNDS_MS[bucket] if bucket < len(self.BOUNDS_MS) else None
+            if count:
+                label = f"{lower}-{upper}ms" if upper is not None else f">{lower}ms"
+                bar = '#' * max(1, round(count / self.count * 40))
+                print(f"  {label:>14} {count:>8} {bar}")
+            lower = upper
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD并发控制器
+    
+    每收集到与当前并发数相同数量的耗时样本评估一次：窗口内耗时中位数不超过基线的tolerance倍且
+    没有超时/断连时并发数加1（首次拥塞前为慢启动，直接翻倍）；否则乘以backoff降低并发数。
+    基线取历次窗口中位数的最小值；只有并发数不高于确定基线时的并发数、且未过载的窗口才让基线缓慢上浮，
+    以适应表结构大小的变化，并发升高导致的耗时上升不计入基线；并发数已在下限时耗时仍超过基线才重设基线。
+    超时/断连的窗口不更新基线。
+    """
+    
+    def __init__(self, maximum, initial=4, minimum=1, tolerance=1.5, backoff=0.7):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = max(self.minimum, min(initial, self.maximum))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.baseline = None  # 无拥塞时的耗时基线（秒）
+        self._baseline_limit = self.limit  # 确定基线的窗口的并发数
+        self.slow_start = True
+        self.peak = self.limit
+        self.increases = 0
+        self.decreases = 0
+        self._samples = []
+        self._congested = False
+        self._limit_sum = 0  # 按样本加权的并发数累计，用于计算平均并发数
+        self._sample_count = 0
+        self.lock = threading.Lock()
+    
+    def on_congestion(self):
+        """记录一次超时或断连，下次评估时降低并发数"""
+        with self.lock:
+            self._congested = True
+    
+    def on_sample(self, seconds):
+        """记录一个任务的耗时，窗口满时调整并发数"""
+        with self.lock:
+            self._samples.append(seconds)
+            self._limit_sum += self.limit
+            self._sample_count += 1
+            if len(self._samples) < self.limit:
+                return
             
-            # 创建外键表
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS oracle_foreign_keys (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                table_id INT NOT NULL,
-                constraint_name VARCHAR(128) NOT NULL,
-                column_name VARCHAR(128) NOT NULL,
-                referenced_table VARCHAR(128) NOT NULL,
-                referenced_column VARCHAR(128) NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE KEY(table_id, constraint_name, column_name),
-                FOREIGN KEY(table_id) REFERENCES oracle_tables(id) ON DELETE CASCADE
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
+            samples = sorted(self._samples)
+            median = samples[len(samples) // 2]
+            self._samples = []
             
-            # 创建索引表
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS oracle_indices (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                table_id INT NOT NULL,
-                index_name VARCHAR(128) NOT NULL,
-                index_type VARCHAR(128),
-                uniqueness VARCHAR(128),
-                column_name VARCHAR(128) NOT NULL,
-                status VARCHAR(128),
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(table_id) REFERENCES oracle_tables(id) ON DELETE CASCADE
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
+            if self.baseline is None:
+                self.baseline = median
+            congested = self._congested
+            overloaded = congested or median > self.baseline * self.tolerance
+            self._congested = False
+            window_limit = self.limit
             
-            self.connection.commit()
+            if overloaded:
+                self.slow_start = False
+                self.limit = max(self.minimum, int(self.limit * self.backoff))
+                self.decreases += 1
+            elif self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit * 2 if self.slow_start else self.limit + 1)
+                self.increases += 1
+            self.peak = max(self.peak, self.limit)
+            if congested:
+                # 超时/断连窗口的中位数不可信，不更新基线
+                return
+            if median <= self.baseline:
+                self.baseline = median
+                self._baseline_limit = window_limit
+            elif not overloaded and window_limit <= self._baseline_limit:
+                # 并发数不高于确定基线时的并发数而耗时变长，说明是表结构变大，基线缓慢上浮；
+                # 并发更高时耗时变长归因于并发，基线保持不变，持续过载时不会追上退化后的耗时
+                self.baseline = min(median, self.baseline * 1.02)
+            elif overloaded and window_limit == self.minimum:
+                # 并发已在下限时耗时仍偏高，说明是表本身变大而不是并发过高，以此作为新基线
+                self.baseline = median
+                self._baseline_limit = window_limit
     
-    def save_table_info(self, table_info):
-        """保存表信息到MySQL数据库"""
-        try:
-            with self.lock:  # 使用线程锁
-                if not self.connection:
-                    print("MySQL连接已关闭，无法保存数据")
-                    return False
-                
-                owner = table_info['owner']
-                table_name = table_info['name']
-                
-                # 使用事务包装所有操作，确保原子性
-                with self.connection.cursor() as cursor:
-                    try:
-                        # 开始事务
-                        self.connection.begin()
-                        
-                        # 插入或更新表信息
-                        cursor.execute("""
-                        INSERT INTO oracle_tables 
-                            (owner, table_name, comment, rows_count, last_analyzed)
-                        VALUES 
-                            (%s, %s, %s, %s, %s)
-                        ON DUPLICATE KEY UPDATE
-                            comment = VALUES(comment),
-                            rows_count = VALUES(rows_count),
-                            last_analyzed = VALUES(last_analyzed);
-                        """, (
-                            owner,
-                            table_name,
-                            table_info['comment'] if table_info['comment'] != "-" else None,
-                            table_info['rows'],
-                            table_info['last_analyzed']
-                        ))
-                        
-                        # 获取表ID
-                        cursor.execute("""
-                        SELECT id FROM oracle_tables WHERE owner = %s AND table_name = %s;
-                        """, (owner, table_name))
-                        table_id = cursor.fetchone()[0]
-                        
-                        # 清除旧数据
-                        cursor.execute("DELETE FROM oracle_columns WHERE table_id = %s;", (table_id,))
-                        cursor.execute("DELETE FROM oracle_primary_keys WHERE table_id = %s;", (table_id,))
-                        cursor.execute("DELETE FROM oracle_foreign_keys WHERE table_id = %s;", (table_id,))
-                        cursor.execute("DELETE FROM oracle_indices WHERE table_id = %s;", (table_id,))
-                        
-                        # 插入列信息
-                        for column in table_info['columns']:
-                            cursor.execute("""
-                            INSERT INTO oracle_columns 
-                                (table_id, column_name, data_type, nullable, default_value, comment)
-                            VALUES 
-                                (%s, %s, %s, %s, %s, %s);
-                            """, (
-                                table_id,
-                                column['name'],
-                                column['data_type'],
-                                column['nullable'],
-                                column['default'] if column['default'] != "-" else None,
-                                column['comment'] if column['comment'] != "-" else None
-                            ))
-                        
-                        # 插入主键信息
-                        for pk in table_info['primary_keys']:
-                            cursor.execute("""
-                            INSERT INTO oracle_primary_keys 
-                                (table_id, column_name)
-                            VALUES 
-                                (%s, %s);
-                            """, (table_id, pk))
-                        
-                        # 插入外键信息
-                        for fk in table_info['foreign_keys']:
-                            cursor.execute("""
-                            INSERT INTO oracle_foreign_keys 
-                                (table_id, constraint_name, column_name, referenced_table, referenced_column)
-                            VALUES 
-                                (%s, %s, %s, %s, %s);
-                            """, (table_id, fk[0], fk[1], fk[2], fk[3]))
-                        
-                        # 插入索引信息
-                        for idx in table_info['indices']:
-                            cursor.execute("""
-                            INSERT INTO oracle_indices 
-                                (table_id, index_name, index_type, uniqueness, column_name, status)
-                            VALUES 
-                                (%s, %s, %s, %s, %s, %s);
-                            """, (table_id, idx[0], idx[1], idx[2], idx[3], idx[4]))
-                        
-                        # 提交事务
-                        self.connection.commit()
-                        return True
-                    except Exception as e:
-                        # 发生错误，回滚事务
-                        self.connection.rollback()
-                        print(f"保存表 {owner}.{table_name} 到MySQL时出错，事务已回滚: {e}")
-                        return False
-                    
-        except Exception as e:
-            print(f"保存表 {table_info['owner']}.{table_info['name']} 到MySQL时出错: {e}")
-            return False
+    def report(self):
+        """输出并发控制汇总"""
+        average = self._limit_sum / self._sample_count if self._sample_count else self.limit
+        print(f"自适应并发：最终 {self.limit}，最高 {self.peak}，平均 {average:.1f}，上限 {self.maximum}，"
+              f"增加 {self.increases} 次，降低 {self.decreases} 次，"
+              f"耗时基线 {self.baseline * 1000 if self.baseline else 0:.0f}ms")
+
+
+def _timed_call(func, *args, **kwargs):
+    """调用func并返回 (耗时秒数, 返回值)"""
+    start_time = time.monotonic()
+    result = func(*args, **kwargs)
+    return time.monotonic() - start_time, result
 
 
 # 创建Oracle连接池并预先获取所需连接
@@ -703,68 +2504,114 @@ def create_oracle_connection_pool(username, password, dsn, concurrency=10, table
         return None
 
 
-def analyze_table_worker_with_pool(pool, table, table_timeout=60):
-    """使用连接池的表分析工作函数"""
+def analyze_table_worker_with_pool(pool, table, table_timeout=60, retries=0, retry_backoff=2.0, limiter=None):
+    """使用连接池的表分析工作函数
+    
+    遇到连接断开、超时等临时错误时丢弃当前连接，按指数退避最多重试retries次，并通知并发控制器limiter降低并发。
+    """
     owner, table_name = table[0], table[1]
     
-    # 从连接池获取连接
+    for attempt in range(retries + 1):
+        # 从连接池获取连接
+        connection = None
+        cursor = None
+        broken = False
+        
+        try:
+            # 获取连接
+            connection = pool.acquire()
+            connection.callTimeout = table_timeout * 1000  # 毫秒
+            cursor = connection.cursor()
+            
+            # 获取主键信息
+            primary_keys = get_primary_keys(cursor, owner, table_name)
+            
+            # 获取外键信息
+            foreign_keys = get_foreign_keys(cursor, owner, table_name)
+            
+            # 获取索引信息
+            indices = get_indices(cursor, owner, table_name)
+            
+            # 获取列信息
+            columns = get_table_columns(cursor, owner, table_name)
+            
+            # 构建表信息
+            table_info = build_table_info(table, primary_keys, foreign_keys, indices, columns)
+            
+            return True, table_info
+        
+        except cx_Oracle.Error as error:
+            error_msg = str(error)
+            broken = is_transient_oracle_error(error_msg)
+            if broken and limiter:
+                limiter.on_congestion()
+            if not broken or attempt >= retries:
+                # 只打印具体错误，不需要堆栈
+                print(f"分析表 {owner}.{table_name} 时出错: {error_msg}")
+                return False, None
+            delay = retry_backoff * (2 ** attempt)
+            print(f"分析表 {owner}.{table_name} 时出现临时错误: {error_msg}，{delay:.1f}秒后进行第 {attempt + 1} 次重试")
+        
+        except Exception as e:
+            print(f"分析表 {owner}.{table_name} 时出现未预期的错误: {e}")
+            return False, None
+        
+        finally:
+            # 确保资源正确释放
+            try:
+                if cursor:
+                    cursor.close()
+            except Exception:
+                pass
+            
+            if connection:
+                # 将连接归还到连接池而不是关闭，已断开的连接直接丢弃
+                release_oracle_connection(pool, connection, broken)
+        
+        time.sleep(delay)
+    
+    return False, None
+
+
+def analyze_tables_bulk_worker_with_pool(pool, tables, table_timeout=60, bulk_timeout=300, retries=0, retry_backoff=2.0,
+                                         limiter=None):
+    """批量提取工作函数：对同一所有者的一批表，每类字典信息只查询一次
+    
+    返回 [(表行, 是否成功, table_info)] 列表。批量查询失败时退回逐表分析。
+    """
+    owner = tables[0][0]
+    table_names = [table[1] for table in tables]
+    
     connection = None
     cursor = None
-
+    broken = False
+    
     try:
-        # 获取连接
         connection = pool.acquire()
-        connection.callTimeout = table_timeout * 1000  # 毫秒
+        connection.callTimeout = bulk_timeout * 1000  # 毫秒
         cursor = connection.cursor()
         
-        # 获取主键信息
-        primary_keys = get_primary_keys(cursor, owner, table_name)
-        
-        # 获取外键信息
-        foreign_keys = get_foreign_keys(cursor, owner, table_name)
-        
-        # 获取索引信息
-        indices = get_indices(cursor, owner, table_name)
-        
-        # 构建表信息
-        comment = table[6] if table[6] and table[6] != '无描述' else "-"
-        table_info = {
-            'owner': owner,
-            'name': table_name,
-            'comment': comment,
-            'rows': table[4],
-            'last_analyzed': table[5],
-            'columns': [],
-            'primary_keys': primary_keys,
-            'foreign_keys': foreign_keys,
-            'indices': indices
-        }
-        
-        # 获取列信息
-        columns = get_table_columns(cursor, owner, table_name)
+        primary_keys = get_tables_primary_keys_bulk(cursor, owner, table_names)
+        foreign_keys = get_tables_foreign_keys_bulk(cursor, owner, table_names)
+        indices = get_tables_indices_bulk(cursor, owner, table_names)
+        columns = get_tables_columns_bulk(cursor, owner, table_names)
         
-        for column in columns:
-            column_comment = column[5] if column[5] and column[5] != '无描述' else "-"
-            column_info = {
-                'name': column[0],
-                'data_type': f"{column[1]}({column[7] or column[2] or ''}{',' + str(column[8]) if column[8] is not None else ''})",
-                'nullable': column[3],
-                'default': column[4],
-                'comment': column_comment
-            }
-            table_info['columns'].append(column_info)
-        
-        return True, table_info
-    
-    except cx_Oracle.Error as error:
-        error_msg = str(error)
-        # 只打印具体错误，不需要堆栈
-        print(f"分析表 {owner}.{table_name} 时出错: {error_msg}")
-        return False, None
+        return [
+            (table, True, build_table_info(
+                table,
+                primary_keys.get(table[1], []),
+                foreign_keys.get(table[1], []),
+                indices.get(table[1], []),
+                columns.get(table[1], [])
+            ))
+            for table in tables
+        ]
     
     except Exception as e:
-        print(f"分析表 {owner}.{table_name} 时出现未预期的错误: {e}")
-        return False, None
+        broken = is_transient_oracle_error(e)
+        if broken and limiter:
+            limiter.on_congestion()
+        print(f"批量分析 {owner} 的 {len(tables)} 个表时出错，改为逐表分析: {e}")
     
     finally:
         # 确保资源正确释放
@@ -773,111 +2620,452 @@ def analyze_table_worker_with_pool(pool, table, table_timeout=60):
                 cursor.close()
         except Exception:
             pass
-            
+        
+        if connection:
+            # 将连接归还到连接池而不是关闭，已断开的连接直接丢弃
+            release_oracle_connection(pool, connection, broken)
+    
+    results = []
+    for table in tables:
+        success, table_info = analyze_table_worker_with_pool(pool, table, table_timeout, retries, retry_backoff, limiter)
+        results.append((table, success, table_info))
+    return results
+
+
+def chunk_tables_by_owner(tables, chunk_size):
+    """将按所有者排序的表迭代器切分为同一所有者、不超过chunk_size的批次（生成器）"""
+    current = []
+    for table in tables:
+        if current and (current[0][0] != table[0] or len(current) >= chunk_size):
+            yield current
+            current = []
+        current.append(table)
+    if current:
+        yield current
+
+
+def open_mysql_writer(mysql_params, journal=None, resume=False):
+    """创建并打开并发MySQL写入器，未配置或连接失败时返回None"""
+    if not mysql_params:
+        return None
+    try:
+        mysql_writer = ConcurrentMySQLWriter(
+            mysql_params,
+            writers=mysql_params.get('writers', 4),
+            batch_size=mysql_params.get('batch_size', 20),
+            queue_size=mysql_params.get('queue_size', 200),
+            # 表提交到MySQL后才记为完成
+            on_saved=(lambda t: journal.mark_done(t['owner'], t['name'])) if journal else None,
+            resume=resume
+        ).open()
+        print(f"成功连接到MySQL数据库: {mysql_params.get('database')}@{mysql_params.get('host')}，"
+              f"写入线程 {mysql_writer.writers_count} 个，每事务最多 {mysql_writer.batch_size} 个表，"
+              f"加载方式 {mysql_writer.load_mode}")
+        return mysql_writer
+    except Exception as e:
+        print(f"打开MySQL写入器失败，将只保存到Markdown文件: {e}")
+        return None
+
+
+class AnalysisRecorder:
+    """处理分析结果：写入Markdown、放入MySQL写入队列、记录断点日志并统计，线程引擎和异步引擎共用"""
+    
+    def __init__(self, md_writer, mysql_writer, journal=None, total=None, write_markdown=True):
+        self.md_writer = md_writer
+        self.write_markdown = write_markdown  # 为False时章节已由工作线程写入
+        self.mysql_writer = mysql_writer
+        self.journal = journal
+        self.total = total
+        self.success_count = 0
+        self.processed_count = 0
+        self.failed_tables = []
+        self.lock = threading.Lock()
+    
+    def mark_failed(self, table, error=None):
+        """记录分析失败的表"""
+        with self.lock:
+            self.failed_tables.append(f"{table[0]}.{table[1]}")
+        if self.journal:
+            self.journal.mark_failed(table[0], table[1], error)
+    
+    def record(self, table, success, table_info):
+        """处理单个表的分析结果，失败的表记录下来继续处理其余表"""
+        table_name = f"{table[0]}.{table[1]}"
+        
         try:
-            if connection:
-                # 将连接归还到连接池而不是关闭
-                pool.release(connection)
-        except Exception:
-            pass
+            # 更新处理计数
+            with self.lock:
+                self.processed_count += 1
+                print(f"[{self.processed_count}{f'/{self.total}' if self.total is not None else ''}] 完成分析表 {table_name}")
+            
+            # 检查分析是否成功
+            if not success or table_info is None:
+                print(f"错误：表 {table_name} 分析失败")
+                self.mark_failed(table, "analyze failed")
+                return
+            
+            # 写入表结构到Markdown文件
+            if self.md_writer and self.write_markdown:
+                self.md_writer.write_table_structure(table_info)
+            
+            # 写入表结构到MySQL数据库（放入写入队列，队列满时阻塞形成背压）
+            if self.mysql_writer:
+                mysql_save_success = self.mysql_writer.save_table_info(table_info)
+                if not mysql_save_success:
+                    # 未能放入写入队列的表没有保存，计为失败，续跑时重新分析
+                    print(f"错误：表 {table_info['owner']}.{table_info['name']} 保存到MySQL失败")
+                    self.mark_failed(table, "mysql enqueue rejected")
+                    return
+            elif self.journal:
+                self.journal.mark_done(table[0], table[1])
+            
+            # 原子地增加成功计数
+            with self.lock:
+                self.success_count += 1
+        
+        except Exception as e:
+            print(f"错误：处理表 {table_name} 时发生异常: {e}")
+            self.mark_failed(table, str(e))
+    
+    def finish(self):
+        """全部表处理完成后更新Markdown目录并递增目录版本号"""
+        if self.md_writer:
+            self.md_writer.finalize_toc()
+        
+        # 通知API目录已更新（影子表加载模式下只在替换正式表后通知）
+        if self.mysql_writer and self.mysql_writer.publish(complete=not self.failed_tables):
+            generation = self.mysql_writer.bump_generation()
+            if generation is not None:
+                print(f"目录版本号已更新为 {generation}")
+    
+    def report(self):
+        """输出运行汇总，返回成功分析的表数"""
+        print(f"表结构分析完成，成功分析 {self.success_count}/{self.processed_count} 个表")
+        if self.failed_tables:
+            print(f"错误：{len(self.failed_tables)} 个表分析或保存失败: {', '.join(self.failed_tables[:20])}"
+                  f"{' ...' if len(self.failed_tables) > 20 else ''}")
+            if self.journal:
+                print(f"可使用 --resume {self.journal.run_id} 续跑，只重新分析未完成的表")
+        return self.success_count
+
+
+def analyze_unit_with_pool(pool, unit, extract_mode='table', table_timeout=60, bulk_timeout=300, retries=0,
+                           retry_backoff=2.0, limiter=None, section_writer=None):
+    """分析一个任务单元（单表或同一所有者的一批表），返回 (提取耗时秒数, [(表行, 是否成功, table_info)])
+    
+    指定section_writer（分片文档写入器）时在当前工作线程中写入各表章节，耗时不计入提取耗时。
+    """
+    if extract_mode == 'bulk':
+        elapsed, results = _timed_call(analyze_tables_bulk_worker_with_pool, pool, unit, table_timeout, bulk_timeout,
+                                       retries, retry_backoff, limiter)
+    else:
+        elapsed, (success, table_info) = _timed_call(analyze_table_worker_with_pool, pool, unit[0], table_timeout,
+                                                     retries, retry_backoff, limiter)
+        results = [(unit[0], success, table_info)]
+    
+    if section_writer:
+        for table, success, table_info in results:
+            if success and table_info is not None:
+                try:
+                    section_writer.write_table_structure(table_info)
+                except Exception as e:
+                    print(f"写入表 {table[0]}.{table[1]} 的文档章节失败: {e}")
+    return elapsed, results
+
+
+def _peek_tables(tables):
+    """返回 (表总数或None, 表迭代器)，没有表时迭代器为None"""
+    total = len(tables) if hasattr(tables, '__len__') else None
+    tables = iter(tables)
+    first_table = next(tables, None)
+    if first_table is None:
+        return total, None
+    return total, itertools.chain([first_table], tables)
 
 
 @timer
-def analyze_tables_with_pool(tables, pool, output_file, mysql_params=None, concurrency=10, table_timeout=60):
-    """使用连接池并发分析表结构并写入文件"""
-    if not tables:
-        print("没有找到符合条件的表")
-        return 0
+def analyze_tables_with_pool(tables, pool, output_file, mysql_params=None, concurrency=10, table_timeout=60,
+                             extract_mode='table', bulk_chunk_size=500, bulk_timeout=300,
+                             journal=None, resume=False, retries=3, retry_backoff=2.0, adaptive=True,
+                             layout='single', shard_by='owner'):
+    """使用连接池并发分析表结构并写入文件
     
-    # 最大并发数不超过表的数量、系统限制和连接池最大大小
-    concurrency = min(concurrency, len(tables), os.cpu_count() * 2, pool.max)
-    print(f"共找到 {len(tables)} 个表，使用 {concurrency} 个并发线程进行分析...")
+    extract_mode为table时每个表单独查询字典视图；为bulk时按所有者将表切分为不超过bulk_chunk_size的批次，
+    每批只执行四次字典查询，再在Python中按表名分组。
+    output_file为None时不生成Markdown文档（增量运行）。
+    单个表失败不会中止运行：失败的表记录到断点日志journal中，续跑（resume）时重新分析。
+    
+    tables可以是列表或iter_all_tables返回的迭代器。任务按需从迭代器中取出，
+    同时在途的任务数有上限，结果处理（写Markdown、放入MySQL写入队列）跟不上时暂停提交，
+    内存占用与表总数无关。
+    
+    adaptive为True时在途任务数由AIMD并发控制器在1到concurrency之间动态调整；
+    为False时固定使用concurrency个线程。
+    layout为sharded时按shard_by生成分片文档，各表章节由工作线程并行写入。
+    """
+    total, tables = _peek_tables(tables)
+    if tables is None:
+        print("没有找到需要分析的表")
+        return 0
     
-    success_count = 0
+    # 构建分析任务：逐表任务或批量任务（Oracle的IN列表最多1000项）
+    bulk_chunk_size = min(max(1, bulk_chunk_size), 1000)
+    if extract_mode == 'bulk':
+        units = chunk_tables_by_owner(tables, bulk_chunk_size)
+        print(f"使用批量提取模式，每批最多 {bulk_chunk_size} 个表")
+    else:
+        units = ([table] for table in tables)
     
-    # 创建线程安全的计数器
-    processed_count = 0
-    lock = threading.Lock()
+    # 字典查询是I/O等待，线程数不受CPU核数限制，只受连接池最大连接数限制
+    if concurrency > pool.max:
+        print(f"并发数 {concurrency} 超过连接池最大连接数 {pool.max}，调整为 {pool.max}")
+        concurrency = pool.max
+    limiter = AdaptiveConcurrencyLimiter(concurrency) if adaptive else None
+    latencies = LatencyHistogram()
+    if limiter:
+        print(f"{f'共找到 {total} 个表，' if total is not None else ''}使用自适应并发进行分析，"
+              f"初始 {limiter.limit}，上限 {concurrency}...")
+    else:
+        print(f"{f'共找到 {total} 个表，' if total is not None else ''}使用 {concurrency} 个并发线程进行分析...")
     
-    # 创建Markdown写入器
-    with MarkdownWriter(output_file) as md_writer:
+    # 创建Markdown写入器（单文档的增量运行只更新MySQL目录）
+    with open_markdown_writer(output_file, layout, shard_by, resume) as md_writer:
+        # 支持并行写入的分片写入器直接在工作线程中写入章节
+        section_writer = md_writer if getattr(md_writer, 'parallel', False) else None
+        
         # 创建MySQL写入器(如果配置了)
-        mysql_writer = None
-        if mysql_params:
-            try:
-                mysql_writer = MySQLWriter(
-                    host=mysql_params.get('host', 'localhost'),
-                    port=mysql_params.get('port', 3306),
-                    user=mysql_params.get('user', 'root'),
-                    password=mysql_params.get('password', ''),
-                    database=mysql_params.get('database', 'oracle_metadata')
-                ).open()
-                print(f"成功连接到MySQL数据库: {mysql_params.get('database')}@{mysql_params.get('host')}")
-            except Exception as e:
-                print(f"MySQL连接失败，将只保存到Markdown文件: {e}")
-                mysql_writer = None
+        mysql_writer = open_mysql_writer(mysql_params, journal, resume)
+        recorder = AnalysisRecorder(md_writer, mysql_writer, journal, total, write_markdown=section_writer is None)
         
         try:
             # 创建线程池
             with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-                # 提交所有表分析任务
-                futures = {}
-                for i, table in enumerate(tables):
-                    # 不再输出开始分析的信息
-                    future = executor.submit(analyze_table_worker_with_pool, pool, table, table_timeout)
-                    futures[future] = (i+1, table)
+                pending = {}  # 在途任务 -> 任务包含的表
+                exhausted = False
                 
-                # 处理结果
-                for future in concurrent.futures.as_completed(futures):
-                    i, table = futures[future]
-                    table_name = f"{table[0]}.{table[1]}"
+                while pending or not exhausted:
+                    # 补充任务直到在途任务数达到上限：自适应模式为控制器当前的并发数，固定模式每个线程再排队一个任务
+                    max_in_flight = limiter.limit if limiter else concurrency * 2
+                    while not exhausted and len(pending) < max_in_flight:
+                        unit = next(units, None)
+                        if unit is None:
+                            exhausted = True
+                            break
+                        future = executor.submit(analyze_unit_with_pool, pool, unit, extract_mode, table_timeout,
+                                                 bulk_timeout, retries, retry_backoff, limiter, section_writer)
+                        pending[future] = unit
                     
-                    try:
-                        success, table_info = future.result()
-                        
-                        # 更新处理计数
-                        with lock:
-                            processed_count += 1
-                            print(f"[{processed_count}/{len(tables)}] 完成分析表 {table_name}")
-                        
-                        # 检查分析是否成功
-                        if not success:
-                            print(f"错误：表 {table_name} 分析失败，程序退出")
-                            # 将结果标记为错误并退出程序
-                            sys.exit(1)
-                        
-                        if table_info is None:
-                            print(f"错误：表 {table_name} 分析结果为空，程序退出")
-                            sys.exit(1)
-                            
-                        # 写入表结构到Markdown文件
-                        md_writer.write_table_structure(table_info)
+                    if not pending:
+                        break
+                    
+                    # 等待任意任务完成后处理结果，再回到循环开头补充任务
+                    done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        unit = pending.pop(future)
                         
-                        # 写入表结构到MySQL数据库
-                        if mysql_writer:
-                            mysql_save_success = mysql_writer.save_table_info(table_info)
-                            if not mysql_save_success:
-                                print(f"错误：表 {table_info['owner']}.{table_info['name']} 保存到MySQL失败")
-                                # sys.exit(1)
+                        try:
+                            elapsed, results = future.result()
+                            latencies.add(elapsed)
+                            if limiter:
+                                limiter.on_sample(elapsed)
+                        except Exception as e:
+                            print(f"错误：处理表 {unit[0][0]}.{unit[0][1]} 等 {len(unit)} 个表时发生异常: {e}")
+                            results = [(table, False, None) for table in unit]
                         
-                        # 原子地增加成功计数
-                        with lock:
-                            success_count += 1
-                            
-                    except Exception as e:
-                        print(f"错误：处理表 {table_name} 时发生异常: {e}，程序退出")
-                        sys.exit(1)
+                        for table, success, table_info in results:
+                            recorder.record(table, success, table_info)
             
-            # 完成后更新目录
-            md_writer.finalize_toc()
+            # 完成后更新目录并通知API
+            recorder.finish()
         
         finally:
             # 关闭MySQL连接
             if mysql_writer:
                 mysql_writer.close()
     
-    print(f"表结构分析完成，成功分析 {success_count}/{len(tables)} 个表")
-    return success_count
+    latencies.report("每批分析耗时" if extract_mode == 'bulk' else "单表分析耗时")
+    if limiter:
+        limiter.report()
+    return recorder.report()
+
+
+def create_oracle_async_pool(username, password, dsn, concurrency=100):
+    """创建python-oracledb异步连接池（Thin模式，需要Oracle 12.1及以上版本）"""
+    if oracledb is None:
+        raise RuntimeError("异步引擎需要安装python-oracledb 2.0及以上版本: pip install oracledb")
+    print(f"正在创建Oracle异步连接池 (max={concurrency})...")
+    return oracledb.create_pool_async(
+        user=username,
+        password=password,
+        dsn=dsn,
+        min=1,
+        max=concurrency,
+        increment=max(1, concurrency // 10)
+    )
+
+
+async def _timed_async(coroutine):
+    """等待协程并返回 (耗时秒数, 返回值)"""
+    start_time = time.monotonic()
+    result = await coroutine
+    return time.monotonic() - start_time, result
+
+
+async def _fetch_all_async(connection, query, params):
+    """在异步连接上执行查询并返回全部结果"""
+    cursor = connection.cursor()
+    try:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+async def analyze_table_async(pool, table, table_timeout=60, retries=0, retry_backoff=2.0, limiter=None):
+    """异步引擎的单表分析函数，返回 (是否成功, table_info)，临时错误处理与线程引擎一致"""
+    owner, table_name = table[0], table[1]
+    params = {'owner': owner, 'table_name': table_name}
+    
+    for attempt in range(retries + 1):
+        try:
+            async with pool.acquire() as connection:
+                connection.call_timeout = table_timeout * 1000  # 毫秒
+                primary_keys = [row[0] for row in await _fetch_all_async(connection, PRIMARY_KEYS_QUERY, params)]
+                foreign_keys = await _fetch_all_async(connection, FOREIGN_KEYS_QUERY, params)
+                indices = await _fetch_all_async(connection, INDICES_QUERY, params)
+                columns = await _fetch_all_async(connection, TABLE_COLUMNS_QUERY, params)
+            return True, build_table_info(table, primary_keys, foreign_keys, indices, columns)
+        
+        except Exception as error:
+            error_msg = str(error)
+            transient = is_transient_oracle_error(error_msg)
+            if transient and limiter:
+                limiter.on_congestion()
+            if not transient or attempt >= retries:
+                print(f"分析表 {owner}.{table_name} 时出错: {error_msg}")
+                return False, None
+            delay = retry_backoff * (2 ** attempt)
+            print(f"分析表 {owner}.{table_name} 时出现临时错误: {error_msg}，{delay:.1f}秒后进行第 {attempt + 1} 次重试")
+        
+        await asyncio.sleep(delay)
+    
+    return False, None
+
+
+async def analyze_tables_async(tables, pool, output_file, mysql_params=None, concurrency=100, table_timeout=60,
+                               journal=None, resume=False, retries=3, retry_backoff=2.0, adaptive=True,
+                               layout='single', shard_by='owner'):
+    """异步引擎：在一个事件循环中并发执行字典查询
+    
+    每个在途的表只占用一个协程和一个数据库会话，不受线程数限制，适合数百个并发查询。
+    tables可以是列表或同步迭代器，迭代器在默认线程池中逐个取出，不阻塞事件循环。
+    Markdown写入和MySQL入队（队列满时阻塞）同样在线程池中执行，MySQL写入仍由ConcurrentMySQLWriter完成。
+    adaptive为True时在途查询数由AIMD并发控制器在1到concurrency之间动态调整。
+    """
+    loop = asyncio.get_running_loop()
+    total, tables = await loop.run_in_executor(None, _peek_tables, tables)
+    if tables is None:
+        print("没有找到需要分析的表")
+        return 0
+    
+    limiter = AdaptiveConcurrencyLimiter(concurrency) if adaptive else None
+    latencies = LatencyHistogram()
+    print(f"{f'共找到 {total} 个表，' if total is not None else ''}使用异步引擎，同时在途查询不超过 {concurrency} 个"
+          f"{f'（自适应，初始 {limiter.limit}）' if limiter else ''}...")
+    
+    with open_markdown_writer(output_file, layout, shard_by, resume) as md_writer:
+        mysql_writer = await loop.run_in_executor(None, open_mysql_writer, mysql_params, journal, resume)
+        recorder = AnalysisRecorder(md_writer, mysql_writer, journal, total)
+        
+        try:
+            pending = {}  # 在途任务 -> 表
+            exhausted = False
+            
+            while pending or not exhausted:
+                # 补充任务直到在途任务数达到上限
+                max_in_flight = limiter.limit if limiter else concurrency
+                while not exhausted and len(pending) < max_in_flight:
+                    table = await loop.run_in_executor(None, next, tables, None)
+                    if table is None:
+                        exhausted = True
+                        break
+                    task = asyncio.ensure_future(_timed_async(
+                        analyze_table_async(pool, table, table_timeout, retries, retry_backoff, limiter)))
+                    pending[task] = table
+                
+                if not pending:
+                    break
+                
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    table = pending.pop(task)
+                    try:
+                        elapsed, (success, table_info) = task.result()
+                        latencies.add(elapsed)
+                        if limiter:
+                            limiter.on_sample(elapsed)
+                    except Exception as e:
+                        print(f"错误：处理表 {table[0]}.{table[1]} 时发生异常: {e}")
+                        success, table_info = False, None
+                    # 结果按完成顺序逐个处理，入队阻塞时暂停补充任务，对分析端形成背压
+                    await loop.run_in_executor(None, recorder.record, table, success, table_info)
+            
+            await loop.run_in_executor(None, recorder.finish)
+        
+        finally:
+            if mysql_writer:
+                await loop.run_in_executor(None, mysql_writer.close)
+    
+    latencies.report("单表分析耗时")
+    if limiter:
+        limiter.report()
+    return recorder.report()
+
+
+async def run_async_engine(tables, username, password, dsn, output_file, mysql_params=None, concurrency=100,
+                           table_timeout=60, **kwargs):
+    """创建异步连接池并运行异步引擎，结束后关闭连接池"""
+    pool = create_oracle_async_pool(username, password, dsn, concurrency)
+    try:
+        return await analyze_tables_async(tables, pool, output_file, mysql_params, concurrency, table_timeout, **kwargs)
+    finally:
+        await pool.close()
+
+
+def prepare_incremental_run(cursor, tables, mysql_params, owner_filter=None, table_filter=None):
+    """增量运行准备：找出新增、DDL变化或注释变化的表，并从MySQL删除Oracle中已不存在的表
+    
+    返回 (需要重新分析的表列表, 已删除表的 (owner, table_name) 列表)
+    """
+    writer = MySQLWriter(
+        host=mysql_params.get('host', 'localhost'),
+        port=mysql_params.get('port', 3306),
+        user=mysql_params.get('user', 'root'),
+        password=mysql_params.get('password', ''),
+        database=mysql_params.get('database', 'oracle_metadata')
+    )
+    with writer:
+        table_states = writer.load_table_states(owner_filter, table_filter)
+        changed, removed = plan_incremental_run(cursor, tables, table_states)
+        print(f"增量运行：Oracle中 {len(tables)} 个表，MySQL中已记录 {len(table_states)} 个表，"
+              f"需要分析 {len(changed)} 个，需要删除 {len(removed)} 个")
+        
+        if removed:
+            # 删除记录在本次运行的历史版本中，之后分析的表沿用同一版本
+            writer.begin_run(mysql_params.get('run_id') or datetime.now().strftime('%Y%m%d-%H%M%S'))
+            deleted = writer.delete_tables(removed)
+            print(f"已从MySQL删除 {deleted} 个Oracle中不存在的表: "
+                  f"{', '.join(f'{o}.{t}' for o, t in removed[:20])}{' ...' if len(removed) > 20 else ''}")
+            # 没有需要分析的表时不会再写入，直接结束历史版本并通知API目录已更新
+            if not changed:
+                version = writer.finish_run()
+                if version is not None:
+                    print(f"目录历史版本: {version}")
+                generation = writer.bump_generation()
+                if generation is not None:
+                    print(f"目录版本号已更新为 {generation}")
+    
+    return changed, removed
 
 
 def main(args=None):
@@ -891,8 +3079,9 @@ def main(args=None):
     query_timeout = args.timeout if args and hasattr(args, 'timeout') else 300  # 单个查询超时时间
     table_timeout = args.table_timeout if args and hasattr(args, 'table_timeout') else 60  # 单表分析超时时间
     
-    # 并发数
+    # 并发数：自适应模式下为并发上限
     concurrency = args.concurrency if args and hasattr(args, 'concurrency') else 10
+    adaptive = not (args.fixed_concurrency if args and hasattr(args, 'fixed_concurrency') else False)
     
     # 过滤条件
     owner_filter = args.owner if args and hasattr(args, 'owner') else None
@@ -901,10 +3090,48 @@ def main(args=None):
     if owner_filter or table_filter:
         print(f"应用过滤条件: 所有者={owner_filter or '任意'}, 表名={table_filter or '任意'}")
     
-    print(f"全局超时: {query_timeout}秒, 单表超时: {table_timeout}秒, 并发线程: {concurrency}")
+    # 分析引擎：thread为cx_Oracle连接池加线程池，async为python-oracledb异步接口
+    engine = args.engine if args and hasattr(args, 'engine') else 'thread'
+    
+    # 字典提取方式：auto时按表名过滤的小规模运行逐表提取，其余情况批量提取
+    extract_mode = args.extract if args and hasattr(args, 'extract') else 'auto'
+    if engine == 'async':
+        # 异步引擎依靠大量并发的单表查询提高吞吐，不使用批量提取
+        if extract_mode == 'bulk':
+            print("异步引擎只支持逐表提取，忽略 --extract bulk")
+        extract_mode = 'table'
+    elif extract_mode == 'auto':
+        extract_mode = 'table' if table_filter else 'bulk'
+    bulk_chunk_size = args.bulk_chunk_size if args and hasattr(args, 'bulk_chunk_size') else 500
+    
+    # 增量运行：只分析新增、DDL变化或注释变化的表
+    incremental = args.incremental if args and hasattr(args, 'incremental') else False
+    
+    # 文档布局：single为单个Markdown文件，sharded为按所有者或按表拆分的分片文档
+    layout = args.layout if args and hasattr(args, 'layout') else 'single'
+    shard_by = args.shard_by if args and hasattr(args, 'shard_by') else 'owner'
+    
+    # 断点续跑：每次运行的完成情况记录在 <checkpoint_dir>/<run_id>.jsonl
+    checkpoint_dir = args.checkpoint_dir if args and hasattr(args, 'checkpoint_dir') else '.checkpoints'
+    resume = args.resume if args and hasattr(args, 'resume') else None
+    if resume == 'latest':
+        resume = CheckpointJournal.latest_run_id(checkpoint_dir)
+        if not resume:
+            print(f"续跑失败：{checkpoint_dir} 中没有运行日志")
+            return
+    run_id = resume or (args.run_id if args and getattr(args, 'run_id', None) else datetime.now().strftime('%Y%m%d-%H%M%S'))
+    
+    # 临时错误（连接断开、超时）的重试次数和首次重试等待秒数
+    retries = args.retries if args and hasattr(args, 'retries') else 3
+    retry_backoff = args.retry_backoff if args and hasattr(args, 'retry_backoff') else 2.0
+    
+    print(f"全局超时: {query_timeout}秒, 单表超时: {table_timeout}秒, 并发{'查询' if engine == 'async' else '线程'}: {concurrency}, 引擎: {engine}")
     
     # 输出文件
     output_file = args.output if args and hasattr(args, 'output') else 'database_readme.md'
+    if layout == 'sharded' and not os.path.splitext(output_file)[1]:
+        print(f"分片文档的 --output 需要带扩展名（如 database_readme.md），当前为: {output_file}")
+        return
     
     # MySQL连接参数 - 直接在代码中配置
     mysql_params = {
@@ -915,6 +3142,17 @@ def main(args=None):
         'database': 'his-metadata'  # MySQL数据库名
     }
     
+    # MySQL并发写入配置
+    mysql_params['writers'] = args.mysql_writers if args and hasattr(args, 'mysql_writers') else 4
+    mysql_params['batch_size'] = args.mysql_batch_size if args and hasattr(args, 'mysql_batch_size') else 20
+    mysql_params['queue_size'] = args.mysql_queue_size if args and hasattr(args, 'mysql_queue_size') else 200
+    # MySQL加载方式：diff只写入差异行；staging写入影子表，全部完成后原子替换正式表
+    mysql_params['load'] = args.mysql_load if args and hasattr(args, 'mysql_load') else 'diff'
+    # 运行ID同时用于登记目录历史版本，续跑时沿用同一版本
+    mysql_params['run_id'] = run_id
+    # bulk加载的暂存文件与断点日志放在一起，续跑时继续追加
+    mysql_params['spool_dir'] = os.path.join(checkpoint_dir, f"{run_id}.bulk")
+    
     # 是否启用MySQL保存 - 启用MySQL保存功能
     enable_mysql = True  # 设置为True启用MySQL保存功能
     
@@ -924,21 +3162,31 @@ def main(args=None):
         mysql_params = None
         print("MySQL保存功能已禁用，仅保存到Markdown文件")
     
+    if incremental and not mysql_params:
+        print("增量运行依赖MySQL中保存的表状态，请先启用MySQL保存")
+        return
+    
+    if mysql_params and mysql_params['load'] != 'diff' and (incremental or owner_filter or table_filter):
+        # 影子表替换会丢弃本次没有加载的表，只能用于不带过滤条件的全量运行
+        print(f"--mysql-load {mysql_params['load']} 只支持不带 --incremental、--owner、--table 的全量运行")
+        return
+    
     # 各种连接对象
     connection = None
     cursor = None
     pool = None
+    journal = None
     
     try:
         # 建立连接
         print("正在连接到Oracle数据库...")
         
-        # 创建Oracle连接池并预先测试连接
+        # 创建Oracle连接池并预先测试连接（异步引擎只用它读取表列表）
         pool = create_oracle_connection_pool(
             username, 
             password, 
             dsn,
-            concurrency=concurrency,
+            concurrency=1 if engine == 'async' else concurrency,
             table_timeout=table_timeout
         )
         
@@ -955,25 +3203,63 @@ def main(args=None):
         
         # 获取表列表
         print("正在获取表信息...")
-        tables = get_all_tables(cursor, owner_filter, table_filter)
+        if incremental:
+            # 增量运行需要完整的表列表与MySQL比较；表全部被删除时也需要继续执行，以便清理MySQL中的记录
+            tables = get_all_tables(cursor, owner_filter, table_filter)
+            tables, removed = prepare_incremental_run(cursor, tables, mysql_params, owner_filter, table_filter)
+            if layout == 'sharded':
+                # 分片文档只重新生成有变化的所有者的分片
+                if removed:
+                    with ShardedMarkdownWriter(output_file, shard_by, resume=True) as md_writer:
+                        for owner, table_name in removed:
+                            md_writer.remove_table(owner, table_name)
+                        md_writer.finalize_toc()
+            else:
+                # 单文件文档需要包含全部表，增量运行只更新MySQL目录
+                print("增量运行不重新生成单文件Markdown文档，如需完整文档请执行全量运行或使用 --layout sharded")
+                output_file = None
+            if not tables:
+                print("增量运行：没有需要重新分析的表")
+                return
+        else:
+            # 全量运行按 (OWNER, TABLE_NAME) 分批读取表列表，每批短时借用连接池中的连接
+            tables = iter_all_tables(pool, owner_filter, table_filter, query_timeout, retries, retry_backoff)
         
-        if not tables:
-            print("未找到符合条件的表！请检查过滤条件是否正确。")
-            return
+        # 归还连接到连接池，分析期间不占用初始查询的连接
+        cursor.close()
+        cursor = None
+        pool.release(connection)
+        connection = None
         
-        # 归还连接到连接池
-        if cursor:
-            cursor.close()
-            cursor = None
+        # 打开断点日志，续跑时跳过已完成的表
+        journal = CheckpointJournal(checkpoint_dir, run_id).open(resume=bool(resume))
+        if resume:
+            print(f"续跑 {run_id}：跳过已完成的 {len(journal.completed)} 个表")
+            tables = (table for table in tables if not journal.is_done(table[0], table[1]))
+        else:
+            print(f"运行ID: {run_id}，断点日志: {journal.path}")
+        
+        # 续跑或分片文档的增量运行保留已写入的文档内容
+        keep_document = bool(resume) or (incremental and layout == 'sharded')
         
-        if connection:
-            pool.release(connection)
-            connection = None
-            
         # 使用连接池分析并写入文件
-        analyze_tables_with_pool(tables, pool, output_file, mysql_params, concurrency, table_timeout)
+        if engine == 'async':
+            asyncio.run(run_async_engine(tables, username, password, dsn, output_file, mysql_params,
+                                         concurrency, table_timeout, journal=journal, resume=keep_document,
+                                         retries=retries, retry_backoff=retry_backoff, adaptive=adaptive,
+                                         layout=layout, shard_by=shard_by))
+        else:
+            analyze_tables_with_pool(tables, pool, output_file, mysql_params, concurrency, table_timeout,
+                                     extract_mode=extract_mode, bulk_chunk_size=bulk_chunk_size,
+                                     bulk_timeout=query_timeout, journal=journal, resume=keep_document,
+                                     retries=retries, retry_backoff=retry_backoff, adaptive=adaptive,
+                                     layout=layout, shard_by=shard_by)
         
-        print(f"成功生成数据库文档: {output_file}")
+        if output_file:
+            if layout == 'sharded':
+                print(f"成功生成分片数据库文档: {output_file}（分片目录 {os.path.splitext(output_file)[0]}{SHARD_DIRECTORY_SUFFIX}）")
+            else:
+                print(f"成功生成数据库文档: {output_file}")
         
     except cx_Oracle.Error as error:
         error_msg = str(error)
@@ -1017,6 +3303,9 @@ def main(args=None):
                 pool.close()
         except:
             pass
+        
+        if journal:
+            journal.close()
             
         print("数据库连接已关闭")
 
@@ -1028,7 +3317,32 @@ if __name__ == "__main__":
     parser.add_argument("--timeout", type=int, default=300, help="全局查询超时时间（秒）")
     parser.add_argument("--table-timeout", type=int, default=60, help="单表分析超时时间（秒）")
     parser.add_argument("--output", default="database_readme.md", help="输出文件名")
-    parser.add_argument("--concurrency", type=int, default=10, help="并发线程数")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发数；自适应模式下为并发上限")
+    parser.add_argument("--fixed-concurrency", action="store_true",
+                        help="关闭自适应并发，始终使用--concurrency指定的并发数")
+    parser.add_argument("--engine", choices=["thread", "async"], default="thread",
+                        help="分析引擎：thread使用cx_Oracle连接池和线程池，async使用python-oracledb异步接口（需要Oracle 12.1+）")
+    parser.add_argument("--extract", choices=["auto", "bulk", "table"], default="auto",
+                        help="字典提取方式：bulk按所有者批量查询，table逐表查询，auto在指定--table时逐表、否则批量")
+    parser.add_argument("--bulk-chunk-size", type=int, default=500, help="批量提取时每批的表数（不超过1000）")
+    parser.add_argument("--mysql-writers", type=int, default=4, help="MySQL写入连接数")
+    parser.add_argument("--mysql-batch-size", type=int, default=20, help="每个MySQL事务最多写入的表数")
+    parser.add_argument("--mysql-queue-size", type=int, default=200, help="MySQL写入队列长度，队列满时分析线程等待")
+    parser.add_argument("--mysql-load", choices=["diff", "staging", "bulk"], default="diff",
+                        help="MySQL加载方式：diff只写入差异行，staging加载影子表后原子替换正式表，"
+                             "bulk写入暂存文件后用LOAD DATA加载影子表（后两者仅全量运行）")
+    parser.add_argument("--run-id", help="运行ID，用于命名断点日志（默认使用当前时间）")
+    parser.add_argument("--resume", nargs="?", const="latest",
+                        help="续跑指定运行ID（省略时为最近一次运行），跳过已完成的表")
+    parser.add_argument("--checkpoint-dir", default=".checkpoints", help="断点日志目录")
+    parser.add_argument("--retries", type=int, default=3, help="连接断开、超时等临时错误的单表重试次数")
+    parser.add_argument("--retry-backoff", type=float, default=2.0, help="首次重试前等待的秒数，之后每次翻倍")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量运行：只分析LAST_DDL_TIME或注释发生变化的表，并删除已不存在的表")
+    parser.add_argument("--layout", choices=["single", "sharded"], default="single",
+                        help="文档布局：single为单个Markdown文件，sharded为分片文档加索引文件")
+    parser.add_argument("--shard-by", choices=["owner", "table"], default="owner",
+                        help="分片方式：owner每个所有者一个文件，table每个表一个文件")
     
     args = parser.parse_args()
     main(args) 
\ No newline at end of file
@@ -6,12 +6,47 @@ Oracle表结构查询API
 提供查询Oracle表列信息的RESTful API接口
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
+import json
+import zlib
 import traceback
 
-from database import test_connection
-from models import get_table_columns_info, search_tables
+from database import test_connection, get_pool_stats
+from models import (get_table_columns_info, get_tables_batch, search_tables, search_columns, iter_catalog_export,
+                    get_table_history, diff_catalog, get_cache_stats, get_search_index_stats, start_search_indexes,
+                    AmbiguousTableError, MATCH_MODES, SEARCH_LIMIT, SEARCH_MAX_LIMIT)
+from snapshot import SNAPSHOT_CONFIG, catalog_snapshots
+
+
+# 批量查询单次请求允许的最大表数量
+BATCH_MAX_TABLES = 1000
+
+
+# 导出时每累积多少字节输出一次（未压缩时）
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+
+def generate_ndjson(records, compress=False):
+    """将记录序列化为NDJSON并分块输出，可选gzip压缩"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    buffer = []
+    buffered = 0
+    for record in records:
+        line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= EXPORT_FLUSH_BYTES:
+            chunk = b"".join(buffer)
+            buffer, buffered = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
 
 
 def create_app():
@@ -23,6 +58,13 @@ def create_app():
     app.config['JSON_AS_ASCII'] = False
     app.config['JSONIFY_MIMETYPE'] = 'application/json; charset=utf-8'
     
+    # 内存快照模式：启动时加载全部元数据，之后由后台线程按目录版本号刷新
+    if SNAPSHOT_CONFIG['enabled']:
+        catalog_snapshots.start()
+    else:
+        # 数据库模式：搜索索引在后台构建，不阻塞启动，也不由首个搜索请求承担构建耗时
+        start_search_indexes()
+    
     # 注册路由
     register_routes(app)
     register_error_handlers(app)
@@ -41,7 +83,8 @@ def register_routes(app):
                 response = jsonify({
                     'success': True,
                     'message': '服务正常',
-                    'database': '连接正常'
+                    'database': '连接正常',
+                    'pool': get_pool_stats()
                 })
                 response.headers['Content-Type'] = 'application/json; charset=utf-8'
                 return response
@@ -60,6 +103,32 @@ def register_routes(app):
             response.headers['Content-Type'] = 'application/json; charset=utf-8'
             return response, 500
 
+    @app.route('/api/stats', methods=['GET'])
+    def stats():
+        """运行状态统计接口，用于观察连接池、缓存、内存快照等资源的使用情况"""
+        try:
+            response = jsonify({
+                'success': True,
+                'data': {
+                    'pool': get_pool_stats(),
+                    'cache': get_cache_stats(),
+                    'snapshot': catalog_snapshots.stats(),
+                    'search_index': get_search_index_stats()
+                }
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response
+        except Exception as e:
+            print(f"统计接口错误: {e}")
+            traceback.print_exc()
+            response = jsonify({
+                'success': False,
+                'error': '服务器内部错误',
+                'message': str(e)
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response, 500
+
     @app.route('/api/tables/<table_name>/columns', methods=['GET'])
     def get_table_columns(table_name):
         """
@@ -68,6 +137,8 @@ def register_routes(app):
         Args:
             table_name: 表名（路径参数）
             owner: 表所有者（查询参数，可选）
+            match: 匹配方式（查询参数，可选）- exact（默认）/prefix/fuzzy，
+                   非精确匹配时先尝试精确匹配，匹配到多个表时返回候选列表
         
         Returns:
             JSON: 表和列的详细信息
@@ -75,6 +146,16 @@ def register_routes(app):
         try:
             # 获取查询参数
             owner = request.args.get('owner')
+            match = request.args.get('match', 'exact')
+            
+            if match not in MATCH_MODES:
+                response = jsonify({
+                    'success': False,
+                    'error': f'不支持的匹配方式: {match}',
+                    'message': f'match参数可选值: {", ".join(MATCH_MODES)}'
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 400
             
             # 验证表名
             if not table_name or not table_name.strip():
@@ -86,13 +167,23 @@ def register_routes(app):
                 return response, 400
             
             # 查询表列信息
-            result = get_table_columns_info(table_name.strip(), owner)
+            try:
+                result = get_table_columns_info(table_name.strip(), owner, match)
+            except AmbiguousTableError as e:
+                response = jsonify({
+                    'success': False,
+                    'error': f'表名 {table_name} 匹配到多个表',
+                    'message': '请使用更精确的表名，或指定owner参数',
+                    'candidates': e.candidates
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 409
             
             if result is None:
                 response = jsonify({
                     'success': False,
                     'error': f'未找到表 {table_name}',
-                    'message': '请检查表名是否正确，或指定正确的owner参数'
+                    'message': '请检查表名是否正确，或指定正确的owner参数，也可使用match=prefix或match=fuzzy模糊匹配'
                 })
                 response.headers['Content-Type'] = 'application/json; charset=utf-8'
                 return response, 404
@@ -115,14 +206,160 @@ def register_routes(app):
             response.headers['Content-Type'] = 'application/json; charset=utf-8'
             return response, 500
 
+    @app.route('/api/tables/<table_name>/history', methods=['GET'])
+    def get_table_history_api(table_name):
+        """
+        获取表的结构变化历史
+        
+        Args:
+            table_name: 表名（路径参数）
+            owner: 表所有者（查询参数，可选），多个所有者下有同名表时必填
+            version: 目录历史版本（查询参数，可选），返回表在该版本的结构，默认为最新版本
+        
+        Returns:
+            JSON: 各版本的变化记录（增量）及指定版本的表结构
+        """
+        try:
+            owner = request.args.get('owner')
+            version = request.args.get('version')
+            
+            if not table_name or not table_name.strip():
+                response = jsonify({
+                    'success': False,
+                    'error': '表名不能为空'
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 400
+            
+            if version is not None:
+                try:
+                    version = int(version)
+                except ValueError:
+                    response = jsonify({
+                        'success': False,
+                        'error': 'version必须为整数'
+                    })
+                    response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                    return response, 400
+            
+            try:
+                result = get_table_history(table_name.strip(), owner, version)
+            except AmbiguousTableError as e:
+                response = jsonify({
+                    'success': False,
+                    'error': f'表名 {table_name} 在多个所有者下有历史记录',
+                    'message': '请指定owner参数',
+                    'candidates': e.candidates
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 409
+            
+            if result is None:
+                response = jsonify({
+                    'success': False,
+                    'error': f'未找到表 {table_name} 的历史记录',
+                    'message': '历史记录从分析工具登记目录版本后开始保存，请检查表名和owner参数'
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 404
+            
+            response = jsonify({
+                'success': True,
+                'data': result
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response
+            
+        except Exception as e:
+            print(f"表历史API错误: {e}")
+            traceback.print_exc()
+            response = jsonify({
+                'success': False,
+                'error': '服务器内部错误',
+                'message': str(e)
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response, 500
+
+    @app.route('/api/tables/batch', methods=['POST'])
+    def get_tables_batch_api():
+        """
+        批量获取多个表的列信息
+        
+        Args:
+            tables: 请求体JSON中的表列表，每项为 {"owner": ..., "table_name": ...}
+        
+        Returns:
+            JSON: 按请求顺序排列的表详情，以及未找到的表
+        """
+        try:
+            payload = request.get_json(silent=True) or {}
+            items = payload.get('tables')
+            
+            if not isinstance(items, list) or not items:
+                response = jsonify({
+                    'success': False,
+                    'error': '请求体需包含非空的tables列表'
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 400
+            
+            if len(items) > BATCH_MAX_TABLES:
+                response = jsonify({
+                    'success': False,
+                    'error': f'单次最多查询 {BATCH_MAX_TABLES} 个表'
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 400
+            
+            # 校验每一项都包含owner和table_name
+            pairs = []
+            for item in items:
+                owner = item.get('owner') if isinstance(item, dict) else None
+                table_name = item.get('table_name') if isinstance(item, dict) else None
+                if not owner or not table_name or not str(owner).strip() or not str(table_name).strip():
+                    response = jsonify({
+                        'success': False,
+                        'error': 'tables中的每一项都需要owner和table_name',
+                        'message': f'无效的表: {item}'
+                    })
+                    response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                    return response, 400
+                pairs.append((str(owner).strip(), str(table_name).strip()))
+            
+            # 批量查询表列信息
+            result = get_tables_batch(pairs)
+            result['count'] = len(result['tables'])
+            
+            response = jsonify({
+                'success': True,
+                'data': result
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response
+            
+        except Exception as e:
+            print(f"批量查询API错误: {e}")
+            traceback.print_exc()
+            response = jsonify({
+                'success': False,
+                'error': '服务器内部错误',
+                'message': str(e)
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response, 500
+
     @app.route('/api/tables/search', methods=['GET'])
     def search_tables_api():
         """
-        搜索表名和注释
+        搜索表名和注释，结果按相关度排序（表名完全相等 > 前缀 > 包含 > 注释匹配）
         
         Args:
             keyword: 搜索关键词（查询参数，可选）- 匹配表名或注释
             owner: 表所有者（查询参数，可选）
+            limit: 每页条数（查询参数，可选），默认100，最大1000
+            after: 上一页返回的next_after游标（查询参数，可选）
+            include_total: 是否返回匹配总数（查询参数，可选）
         
         Returns:
             JSON: 匹配的表列表
@@ -131,16 +368,35 @@ def register_routes(app):
             # 获取查询参数
             keyword = request.args.get('keyword')
             owner = request.args.get('owner')
+            after = request.args.get('after')
+            include_total = request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+            
+            try:
+                limit = int(request.args.get('limit', SEARCH_LIMIT))
+            except ValueError:
+                response = jsonify({
+                    'success': False,
+                    'error': 'limit必须为整数'
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 400
+            limit = min(max(limit, 1), SEARCH_MAX_LIMIT)
             
             # 搜索表
-            tables = search_tables(keyword, owner)
+            try:
+                result = search_tables(keyword, owner, limit, after, include_total)
+            except ValueError as e:
+                response = jsonify({
+                    'success': False,
+                    'error': str(e)
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 400
             
+            result['count'] = len(result['tables'])
             response = jsonify({
                 'success': True,
-                'data': {
-                    'tables': tables,
-                    'count': len(tables)
-                }
+                'data': result
             })
             response.headers['Content-Type'] = 'application/json; charset=utf-8'
             return response
@@ -156,6 +412,133 @@ def register_routes(app):
             response.headers['Content-Type'] = 'application/json; charset=utf-8'
             return response, 500
 
+    @app.route('/api/columns/search', methods=['GET'])
+    def search_columns_api():
+        """
+        搜索列名和列注释，结果按相关度排序（列名完全相等 > 前缀 > 包含 > 注释匹配）
+        
+        Args:
+            keyword: 搜索关键词（查询参数，必填）- 匹配列名或列注释
+            owner: 表所有者（查询参数，可选）
+            data_type: 数据类型前缀（查询参数，可选），如 VARCHAR2
+            page: 页码（查询参数，可选），默认1
+            page_size: 每页条数（查询参数，可选），默认50，最大500
+        
+        Returns:
+            JSON: 匹配的列列表
+        """
+        try:
+            # 获取查询参数
+            keyword = (request.args.get('keyword') or '').strip()
+            owner = request.args.get('owner')
+            data_type = request.args.get('data_type')
+            
+            if not keyword:
+                response = jsonify({
+                    'success': False,
+                    'error': '搜索关键词不能为空'
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 400
+            
+            try:
+                page = int(request.args.get('page', 1))
+                page_size = int(request.args.get('page_size', 50))
+            except ValueError:
+                response = jsonify({
+                    'success': False,
+                    'error': 'page和page_size必须为整数'
+                })
+                response.headers['Content-Type'] = 'application/json; charset=utf-8'
+                return response, 400
+            
+            page = max(page, 1)
+            page_size = min(max(page_size, 1), 500)
+            
+            # 搜索列
+            result = search_columns(keyword, owner, data_type, page, page_size)
+            
+            response = jsonify({
+                'success': True,
+                'data': result
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response
+            
+        except Exception as e:
+            print(f"搜索列API错误: {e}")
+            traceback.print_exc()
+            response = jsonify({
+                'success': False,
+                'error': '服务器内部错误',
+                'message': str(e)
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response, 500
+
+    @app.route('/api/catalog/export', methods=['GET'])
+    def export_catalog():
+        """
+        以NDJSON流式导出整个目录，每行一个表（含列、主键、外键、索引）
+        
+        Args:
+            owner: 表所有者（查询参数，可选）
+            gzip: 是否gzip压缩（查询参数，可选），为1/true时返回gzip编码的内容
+        
+        Returns:
+            application/x-ndjson 流
+        """
+        owner = request.args.get('owner')
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        
+        response = Response(generate_ndjson(iter_catalog_export(owner), compress),
+                            mimetype='application/x-ndjson')
+        response.headers['Content-Type'] = 'application/x-ndjson; charset=utf-8'
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    @app.route('/api/diff', methods=['GET'])
+    def diff_catalog_api():
+        """
+        以NDJSON流式返回两个目录版本或两个所有者之间的表结构差异
+        
+        Args:
+            from: 起始目录版本号或所有者（查询参数）
+            to: 目标目录版本号或所有者（查询参数），比较版本时可选，默认为最新版本
+            gzip: 是否gzip压缩（查询参数，可选），为1/true时返回gzip编码的内容
+        
+        Returns:
+            application/x-ndjson 流：首行为diff头记录，之后每行一个有差异的表，最后一行为summary汇总
+        """
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        
+        try:
+            records = diff_catalog(request.args.get('from'), request.args.get('to'))
+        except ValueError as e:
+            response = jsonify({
+                'success': False,
+                'error': str(e)
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response, 400
+        except Exception as e:
+            print(f"目录差异API错误: {e}")
+            traceback.print_exc()
+            response = jsonify({
+                'success': False,
+                'error': '服务器内部错误',
+                'message': str(e)
+            })
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            return response, 500
+        
+        response = Response(generate_ndjson(records, compress), mimetype='application/x-ndjson')
+        response.headers['Content-Type'] = 'application/x-ndjson; charset=utf-8'
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+
 
 
 
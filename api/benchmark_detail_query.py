@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+表详情查询基准测试
+在API配置的MySQL上比较单次往返的多语句查询（TABLE_DETAIL_QUERY）和逐条执行查询（表、列、主键、外键、索引各一次）
+获取表详情的耗时；--latency 为每次往返额外增加的模拟网络延迟，用于估算应用与数据库跨机房部署时的效果
+
+用法:
+    python benchmark_detail_query.py --tables 200 --latency 0.002
+"""
+
+import time
+import argparse
+
+import pymysql
+from database import get_db_connection
+from models import TABLE_DETAIL_QUERY, _fetch_result_sets, _match_condition
+
+# 改为单次往返之前逐条执行的子表查询
+SEPARATE_CHILD_QUERIES = (
+    """
+    SELECT column_name, data_type, nullable, default_value, comment, column_id
+    FROM oracle_columns
+    WHERE table_id = %s
+    ORDER BY column_id
+    """,
+    "SELECT column_name FROM oracle_primary_keys WHERE table_id = %s",
+    """
+    SELECT constraint_name, column_name, referenced_table, referenced_column
+    FROM oracle_foreign_keys
+    WHERE table_id = %s
+    """,
+    """
+    SELECT index_name, index_type, uniqueness, column_name, status
+    FROM oracle_indices
+    WHERE table_id = %s
+    """,
+)
+
+
+class LatencyCursor:
+    """包装游标：每次execute（一次网络往返）前等待latency秒并计数，nextset读取的是同一响应中的结果集，不计为往返"""
+
+    def __init__(self, cursor, latency):
+        self.cursor = cursor
+        self.latency = latency
+        self.round_trips = 0
+
+    def execute(self, query, params=None):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+def fetch_single(cursor, owner, table_name):
+    """单次往返：一条多语句查询返回计数、表、列、主键、外键、索引六个结果集"""
+    table_where, params = _match_condition('exact', table_name, owner)
+    cursor.execute(TABLE_DETAIL_QUERY.format(table_where=table_where), params)
+    return _fetch_result_sets(cursor, 6)
+
+
+def fetch_separate(cursor, owner, table_name):
+    """逐条执行：先查询表，再按表ID依次查询四张子表"""
+    table_where, params = _match_condition('exact', table_name, owner)
+    cursor.execute(f"""
+    SELECT t.id, t.owner, t.table_name, t.comment, t.rows_count, t.last_analyzed
+    FROM oracle_tables t
+    WHERE {table_where}
+    ORDER BY t.owner, t.table_name
+    """, params)
+    tables = cursor.fetchall()
+    results = [tables]
+    for query in SEPARATE_CHILD_QUERIES:
+        cursor.execute(query, [tables[0]['id']])
+        results.append(cursor.fetchall())
+    return results
+
+
+def sample_tables(count):
+    """随机抽取count个表作为测试对象"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT owner, table_name FROM oracle_tables ORDER BY RAND() LIMIT %s", (count,))
+            return list(cursor.fetchall())
+
+
+def run_strategy(strategy, tables, latency, rounds):
+    """按指定方式依次获取全部表的详情，返回 (耗时秒数, 往返次数)"""
+    with get_db_connection(multi_statements=True) as conn:
+        with conn.cursor(pymysql.cursors.DictCursor) as raw_cursor:
+            cursor = LatencyCursor(raw_cursor, latency)
+            # 预热一轮，排除冷缓存对第一种方式的影响
+            for owner, table_name in tables:
+                strategy(cursor, owner, table_name)
+            cursor.round_trips = 0
+            start_time = time.time()
+            for _ in range(rounds):
+                for owner, table_name in tables:
+                    strategy(cursor, owner, table_name)
+            return time.time() - start_time, cursor.round_trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="表详情查询基准测试（单次往返 vs 逐条查询）")
+    parser.add_argument("--tables", type=int, default=200, help="随机抽取的表数")
+    parser.add_argument("--rounds", type=int, default=3, help="每种方式重复的轮数")
+    parser.add_argument("--latency", type=float, default=0.0, help="每次往返额外增加的模拟网络延迟（秒）")
+    args = parser.parse_args()
+
+    tables = sample_tables(args.tables)
+    if not tables:
+        print("oracle_tables中没有数据，请先运行分析工具")
+        return
+    requests = len(tables) * args.rounds
+    print(f"随机抽取 {len(tables)} 个表，每种方式 {args.rounds} 轮，模拟延迟 {args.latency * 1000:.1f}ms")
+
+    for name, strategy in (('single', fetch_single), ('separate', fetch_separate)):
+        elapsed, round_trips = run_strategy(strategy, tables, args.latency, args.rounds)
+        print(f"{name:>8}: 耗时 {elapsed:.2f} 秒，每次 {elapsed / requests * 1000:.2f}ms，"
+              f"每次 {round_trips / requests:.1f} 次往返")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+元数据缓存模块
+在进程内缓存表结构查询结果，并根据分析工具写入的目录版本号（generation）失效
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+# 缓存配置 - 支持环境变量覆盖默认值
+CACHE_CONFIG = {
+    'enabled': os.environ.get('CACHE_ENABLED', '1') not in ('0', 'false', 'False'),
+    'max_entries': int(os.environ.get('CACHE_MAX_ENTRIES', '10000')),  # 最大缓存条目数
+    'max_bytes': int(os.environ.get('CACHE_MAX_BYTES', str(64 * 1024 * 1024))),  # 缓存内存上限（估算值）
+    'ttl': float(os.environ.get('CACHE_TTL', '3600')),  # 条目最长存活秒数，作为版本号失效之外的兜底
+    'generation_check_interval': float(os.environ.get('CACHE_GENERATION_CHECK_INTERVAL', '5')),  # 检查目录版本号的间隔秒数
+}
+
+
+class GenerationWatcher:
+    """目录版本号观察器
+
+    分析工具每次运行结束都会递增MySQL中的目录版本号。
+    观察器最多每interval秒查询一次版本号，其余时间直接返回上次的结果。
+    """
+
+    def __init__(self, fetch, interval=5.0):
+        self.fetch = fetch
+        self.interval = interval
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """返回当前目录版本号，必要时从数据库刷新"""
+        now = time.monotonic()
+        if self._generation is not None and now - self._checked_at < self.interval:
+            return self._generation
+        with self._lock:
+            if self._generation is None or time.monotonic() - self._checked_at >= self.interval:
+                try:
+                    self._generation = self.fetch()
+                except Exception as e:
+                    # 查询失败时沿用旧版本号，避免数据库抖动导致缓存全部失效
+                    print(f"获取目录版本号失败: {e}")
+                self._checked_at = time.monotonic()
+            return self._generation
+
+
+def estimate_size(value):
+    """粗略估算对象占用的内存字节数"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class MetadataCache:
+    """带内存上限的LRU/TTL缓存，目录版本号变化时整体失效"""
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, ttl=3600, watcher=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.watcher = watcher
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._generation = None
+        self._lock = threading.Lock()
+        # 统计信息
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def _check_generation(self):
+        """目录版本号变化时清空缓存，返回当前版本号"""
+        generation = self.watcher.current() if self.watcher else None
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    if self._entries:
+                        self._invalidations += 1
+                    self._entries.clear()
+                    self._bytes = 0
+                    self._generation = generation
+        return generation
+
+    def get(self, key):
+        """查询缓存，返回 (是否命中, 值)"""
+        self._check_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+            value, size, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self._expirations += 1
+                self._misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, value
+
+    def set(self, key, value, generation=None):
+        """写入缓存；若写入期间目录版本号已变化则放弃写入"""
+        size = estimate_size(key) + estimate_size(value)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            # 超出条目数或内存上限时按LRU顺序淘汰
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+            return True
+
+    def get_or_load(self, key, loader):
+        """命中则返回缓存值，否则调用loader加载并写入缓存"""
+        generation = self._check_generation()
+        hit, value = self.get(key)
+        if hit:
+            return value
+        value = loader()
+        self.set(key, value, generation)
+        return value
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'generation': self._generation,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else None,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+            }
@@ -7,7 +7,11 @@
 """
 
 import os
+import time
+import threading
+from collections import deque
 import pymysql
+from pymysql.constants import CLIENT
 from contextlib import contextmanager
 
 # 数据库连接配置 - 支持环境变量覆盖默认值
@@ -20,20 +24,287 @@ DB_CONFIG = {
     'charset': os.environ.get('DB_CHARSET', 'utf8mb4')
 }
 
+# 连接池配置 - 支持环境变量覆盖默认值
+POOL_CONFIG = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),  # 启动时预建的连接数
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),  # 每个进程的最大连接数
+    'recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),  # 空闲超过该秒数的连接将被关闭重建
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),  # 获取连接的最长等待秒数
+}
+
+# 多语句连接池配置：只有单次往返的多结果集查询使用开启了MULTI_STATEMENTS的连接，
+# 普通查询的连接不允许堆叠语句，避免拼接SQL时出现堆叠注入
+MULTI_STATEMENT_POOL_CONFIG = {
+    'min_size': int(os.environ.get('DB_MULTI_POOL_MIN_SIZE', '0')),
+    'max_size': int(os.environ.get('DB_MULTI_POOL_MAX_SIZE', '4')),
+    'recycle': POOL_CONFIG['recycle'],
+    'timeout': POOL_CONFIG['timeout'],
+    'client_flag': CLIENT.MULTI_STATEMENTS,
+}
+
+
+class PoolTimeoutError(Exception):
+    """在超时时间内无法从连接池获取连接"""
+
+
+class ConnectionPool:
+    """线程安全的有界MySQL连接池
+
+    - 连接数不超过max_size，池满时调用方等待，超过timeout抛出PoolTimeoutError
+    - 取出连接时对空闲过久的连接执行ping检查，失效连接自动丢弃重建
+    - 空闲超过recycle秒的连接直接关闭重建，避免被MySQL wait_timeout断开
+    """
+
+    def __init__(self, db_config, min_size=1, max_size=10, recycle=1800, timeout=10.0, client_flag=0):
+        if max_size < 1:
+            raise ValueError("连接池max_size必须大于0")
+        self.db_config = dict(db_config)
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.recycle = recycle
+        self.timeout = timeout
+        self.client_flag = client_flag  # 连接的客户端标志，如CLIENT.MULTI_STATEMENTS
+        self._idle = deque()  # 元素为 (connection, 归还时间)
+        self._size = 0  # 已创建且未关闭的连接数（空闲+使用中）
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        # 统计信息
+        self._acquires = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+
+    def _connect(self):
+        """创建新的物理连接"""
+        connection = pymysql.connect(autocommit=True, client_flag=self.client_flag, **self.db_config)
+        with self._cond:
+            self._created += 1
+        return connection
+
+    def fill(self):
+        """预先创建min_size个连接"""
+        connections = []
+        try:
+            while True:
+                with self._cond:
+                    if self._closed or self._size >= self.min_size:
+                        break
+                    self._size += 1
+                try:
+                    connections.append(self._connect())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+        finally:
+            for connection in connections:
+                self.release(connection)
+
+    def _is_alive(self, connection, idle_since):
+        """检查空闲连接是否可用：超过recycle的直接淘汰，其余通过ping检查"""
+        if self.recycle and time.monotonic() - idle_since > self.recycle:
+            return False
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        """关闭连接并释放其占用的名额"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """从连接池获取连接，池满时最多等待timeout秒"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        wait_start = None
+
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("连接池已关闭")
+                    if self._idle:
+                        connection, idle_since = self._idle.pop()
+                        create = False
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        connection, idle_since = None, None
+                        create = True
+                        break
+
+                    # 池已满，等待其他线程归还连接
+                    if not waited:
+                        waited = True
+                        wait_start = time.monotonic()
+                        self._waits += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._record_wait(wait_start)
+                        raise PoolTimeoutError(
+                            f"{timeout}秒内无法获取数据库连接 (max_size={self.max_size})")
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_alive(connection, idle_since):
+                # 失效连接丢弃后重新获取
+                self._discard(connection)
+                continue
+
+            with self._cond:
+                self._acquires += 1
+                if waited:
+                    self._record_wait(wait_start)
+            return connection
+
+    def _record_wait(self, wait_start):
+        """记录等待耗时，调用方需持有锁"""
+        elapsed = time.monotonic() - wait_start
+        self._wait_time += elapsed
+        self._max_wait_time = max(self._max_wait_time, elapsed)
+
+    def release(self, connection, discard=False):
+        """归还连接，discard为True时直接关闭该连接"""
+        if discard:
+            self._discard(connection)
+            return
+        with self._cond:
+            if not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(connection)
+
+    def close(self):
+        """关闭连接池及所有空闲连接"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        """返回连接池统计信息"""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'max_size': self.max_size,
+                'min_size': self.min_size,
+                'size': self._size,
+                'in_use': self._size - idle,
+                'idle': idle,
+                'acquires': self._acquires,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time, 6),
+                'wait_time_max': round(self._max_wait_time, 6),
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'discarded': self._discarded,
+            }
+
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool(multi_statements=False):
+    """获取进程内共享的连接池（首次调用时创建），multi_statements为True时返回多语句连接池"""
+    pool = _pools.get(multi_statements)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(multi_statements)
+            if pool is None:
+                config = MULTI_STATEMENT_POOL_CONFIG if multi_statements else POOL_CONFIG
+                pool = _pools[multi_statements] = ConnectionPool(DB_CONFIG, **config)
+    return pool
+
+
+def get_pool_stats():
+    """获取连接池统计信息，多语句连接池的统计信息在multi_statement中"""
+    stats = get_pool().stats()
+    stats['multi_statement'] = get_pool(multi_statements=True).stats()
+    return stats
+
 
 @contextmanager
-def get_db_connection():
-    """获取数据库连接的上下文管理器"""
-    connection = None
+def get_db_connection(multi_statements=False):
+    """
+    从连接池获取数据库连接的上下文管理器，使用完毕自动归还
+    
+    multi_statements为True时从开启了MULTI_STATEMENTS的独立连接池获取，只用于固定的多结果集查询
+    """
+    pool = get_pool(multi_statements)
     try:
-        connection = pymysql.connect(**DB_CONFIG)
-        yield connection
+        connection = pool.acquire()
     except Exception as e:
         print(f"数据库连接错误: {e}")
         raise
+
+    broken = False
+    try:
+        yield connection
+    except pymysql.err.OperationalError:
+        # 连接级错误（断线等），该连接不再放回池中
+        broken = True
+        raise
     finally:
-        if connection:
-            connection.close()
+        pool.release(connection, discard=broken)
+
+
+def create_streaming_connection():
+    """
+    创建不经过连接池的独立连接，游标默认为服务端无缓冲游标（SSDictCursor）
+    
+    用于导出等长时间流式读取的场景，避免长期占用API连接池中的连接
+    """
+    return pymysql.connect(cursorclass=pymysql.cursors.SSDictCursor, **DB_CONFIG)
+
+
+# MySQL错误码：表不存在
+ER_NO_SUCH_TABLE = 1146
+
+
+def get_catalog_generation():
+    """
+    获取目录版本号
+    
+    分析工具每次运行结束后递增 oracle_catalog_meta.generation，
+    API据此判断缓存和内存快照是否过期。元数据表尚未创建时返回0。
+    """
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT generation FROM oracle_catalog_meta WHERE id = 1")
+                row = cursor.fetchone()
+                return row[0] if row else 0
+    except pymysql.err.ProgrammingError as e:
+        if e.args and e.args[0] == ER_NO_SUCH_TABLE:
+            return 0
+        raise
 
 
 def test_connection():
@@ -54,7 +325,11 @@ def init_database():
     print("正在初始化数据库连接...")
     print(f"数据库配置: {DB_CONFIG['user']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}")
     
+    print(f"连接池配置: min={POOL_CONFIG['min_size']}, max={POOL_CONFIG['max_size']}, "
+          f"recycle={POOL_CONFIG['recycle']}s, timeout={POOL_CONFIG['timeout']}s")
+    
     try:
+        get_pool().fill()
         with get_db_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT 1")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+目录历史模块
+分析工具每次有变化的运行登记一个版本（oracle_catalog_runs），并只为发生变化的表保存增量（oracle_table_deltas）。
+本模块按版本顺序依次应用增量，重建表在任意历史版本的结构，开销与该表的变化次数相关而与运行次数无关
+"""
+
+import json
+
+# 增量中各段的业务键列，与分析工具写入增量时使用的定义一致
+SECTION_KEYS = {
+    'columns': ('column_name',),
+    'primary_keys': ('column_name',),
+    'foreign_keys': ('constraint_name', 'column_name'),
+    'indices': ('index_name', 'column_name'),
+}
+
+# 比较不同所有者（如DEV和PROD）时外键和索引的业务键：约束名、索引名多为系统生成（SYS_C…），两边并不一致，
+# 因此同一外键或索引的多行合并为一行，按结构签名比较，名称只随增量输出、不参与比较
+SIGNATURE_SECTION_KEYS = {
+    'columns': ('column_name',),
+    'primary_keys': ('column_name',),
+    'foreign_keys': ('column_names', 'referenced_table', 'referenced_columns'),
+    'indices': ('column_names', 'uniqueness', 'index_type'),
+}
+SIGNATURE_NAME_COLUMNS = ('constraint_name', 'index_name')
+
+
+def empty_state():
+    """返回不含任何行的表状态"""
+    state = {'comment': None}
+    state.update((section, {}) for section in SECTION_KEYS)
+    return state
+
+
+def parse_delta(delta):
+    """解析数据库中保存的增量JSON"""
+    return json.loads(delta) if isinstance(delta, (str, bytes)) else (delta or {})
+
+
+def apply_delta(state, change_type, delta):
+    """
+    在表状态上应用一个版本的增量，返回新的表状态
+
+    Args:
+        state: 上一版本的表状态，表不存在时为None；结构为 {'comment': 注释, 段名: {业务键: 行}}
+        change_type: added / changed / removed
+        delta: 增量字典
+
+    Returns:
+        dict: 新的表状态，表被删除时返回None
+    """
+    if change_type == 'removed':
+        return None
+    if change_type == 'added' or state is None:
+        state = empty_state()
+    else:
+        # 只复制发生变化的段，未变化的段与上一版本共享
+        state = dict(state)
+
+    if 'comment' in delta:
+        state['comment'] = delta['comment'][1]
+
+    for section, key_columns in SECTION_KEYS.items():
+        section_delta = delta.get(section)
+        if not section_delta:
+            continue
+        rows = state[section] = dict(state[section])
+        for row in section_delta.get('removed', ()):
+            rows.pop(tuple(row[column] for column in key_columns), None)
+        for row in section_delta.get('changed', ()):
+            key = tuple(row[column] for column in key_columns)
+            if key in rows:
+                updated = dict(rows[key])
+                updated.update((column, value[1]) for column, value in row.items() if column not in key_columns)
+                rows[key] = updated
+        for row in section_delta.get('added', ()):
+            rows[tuple(row[column] for column in key_columns)] = dict(row)
+    return state
+
+
+def state_to_result(owner, table_name, state):
+    """将表状态转换为与单表查询接口一致的返回结构（历史版本不包含记录数和分析时间）"""
+    columns = sorted(state['columns'].values(),
+                     key=lambda c: (c.get('column_id') is None, c.get('column_id') or 0, c['column_name']))
+    primary_keys = sorted(row['column_name'] for row in state['primary_keys'].values())
+    primary_key_set = set(primary_keys)
+    return {
+        'table_info': {
+            'owner': owner,
+            'table_name': table_name,
+            'comment': state['comment'] or ''
+        },
+        'columns': [dict(column, is_primary_key=column['column_name'] in primary_key_set) for column in columns],
+        'primary_keys': primary_keys,
+        'foreign_keys': sorted(state['foreign_keys'].values(),
+                               key=lambda fk: (fk['constraint_name'], fk['column_name'])),
+        'indices': sorted(state['indices'].values(), key=lambda idx: (idx['index_name'], idx['column_name']))
+    }
+
+
+def reconstruct_table(changes, version=None):
+    """
+    按版本顺序应用增量，重建表在指定版本（默认最新版本）的状态
+
+    Args:
+        changes: 按版本升序排列的 (版本, 变化类型, 增量) 序列
+        version: 目标版本（可选）
+
+    Returns:
+        dict: 表状态，表在该版本不存在时返回None
+    """
+    state = None
+    for change_version, change_type, delta in changes:
+        if version is not None and change_version > version:
+            break
+        state = apply_delta(state, change_type, delta)
+    return state
+
+
+def _state_from_sections(comment, sections, section_keys):
+    """按各段的业务键将行列表组装为表状态"""
+    state = {'comment': comment or None}
+    for section, key_columns in section_keys.items():
+        state[section] = {tuple(row[column] for column in key_columns): dict(row) for row in sections[section]}
+    return state
+
+
+def _result_sections(result):
+    """取出单表查询结果中的四段行列表"""
+    return {
+        'columns': [{name: value for name, value in column.items() if name != 'is_primary_key'}
+                    for column in result['columns']],
+        'primary_keys': [{'column_name': column_name} for column_name in result['primary_keys']],
+        'foreign_keys': result['foreign_keys'],
+        'indices': result['indices'],
+    }
+
+
+def state_from_result(result):
+    """将单表查询接口的返回结构转换为表状态，用于与其他表比较"""
+    return _state_from_sections(result['table_info']['comment'], _result_sections(result), SECTION_KEYS)
+
+
+def signature_state_from_result(result):
+    """
+    将单表查询接口的返回结构转换为按结构签名比较的表状态，用于比较不同所有者的同名表
+
+    外键按 (列, 引用表, 引用列) 签名、索引按 (列组合, 唯一性, 类型) 签名各合并为一行；
+    目录中不保存索引列的位置，列组合按列名排序
+    """
+    sections = _result_sections(result)
+
+    foreign_keys = {}
+    for row in sections['foreign_keys']:
+        foreign_keys.setdefault(row['constraint_name'], []).append(row)
+    sections['foreign_keys'] = []
+    for constraint_name, rows in foreign_keys.items():
+        pairs = sorted((row['column_name'], row['referenced_column'] or '') for row in rows)
+        sections['foreign_keys'].append({
+            'constraint_name': constraint_name,
+            'column_names': ', '.join(column for column, _ in pairs),
+            'referenced_table': rows[0]['referenced_table'],
+            'referenced_columns': ', '.join(referenced for _, referenced in pairs),
+        })
+
+    indices = {}
+    for row in sections['indices']:
+        indices.setdefault(row['index_name'], []).append(row)
+    sections['indices'] = [{
+        'index_name': index_name,
+        'column_names': ', '.join(sorted(row['column_name'] for row in rows)),
+        'index_type': rows[0]['index_type'],
+        'uniqueness': rows[0]['uniqueness'],
+        'status': rows[0]['status'],
+    } for index_name, rows in indices.items()]
+
+    return _state_from_sections(result['table_info']['comment'], sections, SIGNATURE_SECTION_KEYS)
+
+
+def diff_states(old_state, new_state, section_keys=SECTION_KEYS, ignored_columns=()):
+    """
+    比较两个表状态，返回 (变化类型, 增量)，没有结构变化时返回None
+
+    变化类型和增量格式与分析工具写入oracle_table_deltas的格式一致；
+    section_keys为状态使用的业务键，ignored_columns中的列不参与比较
+    """
+    if new_state is None:
+        return ('removed', {}) if old_state is not None else None
+    change_type = 'added' if old_state is None else 'changed'
+    old_state = old_state or empty_state()
+
+    delta = {}
+    if change_type == 'added' or old_state['comment'] != new_state['comment']:
+        delta['comment'] = [old_state['comment'], new_state['comment']]
+    for section, key_columns in section_keys.items():
+        old_rows, new_rows = old_state[section], new_state[section]
+        section_delta = {'added': [], 'removed': [], 'changed': []}
+        for key, row in new_rows.items():
+            old_row = old_rows.get(key)
+            if old_row is None:
+                section_delta['added'].append(row)
+                continue
+            changes = {column: [old_row.get(column), value] for column, value in row.items()
+                       if column not in key_columns and column not in ignored_columns
+                       and old_row.get(column) != value}
+            if changes:
+                changes.update(zip(key_columns, key))
+                section_delta['changed'].append(changes)
+        for key in old_rows:
+            if key not in new_rows:
+                section_delta['removed'].append(dict(zip(key_columns, key)))
+        section_delta = {name: rows for name, rows in section_delta.items() if rows}
+        if section_delta:
+            delta[section] = section_delta
+
+    if change_type == 'changed' and not delta:
+        return None
+    return change_type, delta
@@ -6,162 +6,867 @@
 定义查询Oracle表结构信息的数据访问方法
 """
 
+from itertools import groupby
+
 import pymysql
-from database import get_db_connection
+from database import get_db_connection, get_catalog_generation, create_streaming_connection, ER_NO_SUCH_TABLE
+from cache import CACHE_CONFIG, GenerationWatcher, MetadataCache
+from snapshot import catalog_snapshots
+from search_index import (GenerationalIndex, TableEntry, TableSearchIndex, ColumnEntry, ColumnSearchIndex,
+                          table_hit_to_dict, column_hit_to_dict, encode_cursor, decode_cursor)
+from history import (parse_delta, reconstruct_table, state_to_result, signature_state_from_result, diff_states,
+                     SIGNATURE_SECTION_KEYS, SIGNATURE_NAME_COLUMNS)
+
+# 表搜索每页默认条数和最大条数
+SEARCH_LIMIT = 100
+SEARCH_MAX_LIMIT = 1000
+
+catalog_generation = GenerationWatcher(get_catalog_generation, CACHE_CONFIG['generation_check_interval'])
+
+metadata_cache = MetadataCache(
+    max_entries=CACHE_CONFIG['max_entries'],
+    max_bytes=CACHE_CONFIG['max_bytes'],
+    ttl=CACHE_CONFIG['ttl'],
+    watcher=catalog_generation
+)
+
+
+def _cached(key, loader):
+    """通过元数据缓存加载数据，缓存关闭时直接查询"""
+    if not CACHE_CONFIG['enabled']:
+        return loader()
+    return metadata_cache.get_or_load(key, loader)
+
+
+def get_cache_stats():
+    """获取元数据缓存统计信息"""
+    stats = metadata_cache.stats()
+    stats['enabled'] = CACHE_CONFIG['enabled']
+    return stats
+
+
+# 表名匹配方式：exact 精确匹配，prefix 前缀匹配，fuzzy 包含匹配；非精确匹配会依次尝试更严格的方式
+MATCH_MODES = ('exact', 'prefix', 'fuzzy')
+
+# 匹配到多个表时返回的最大候选数量
+CANDIDATE_LIMIT = 50
+
+# 单次往返获取表详情的多语句查询：先统计匹配数并在唯一匹配时将表ID存入会话变量，
+# 再依次返回匹配数、表、列、主键、外键、索引六个结果集
+TABLE_DETAIL_QUERY = """
+SELECT COUNT(*), IF(COUNT(*) = 1, MIN(t.id), NULL)
+FROM oracle_tables t
+WHERE {table_where}
+INTO @hops_match_count, @hops_table_id;
+SELECT @hops_match_count AS match_count;
+SELECT id, owner, table_name, comment, rows_count, last_analyzed
+FROM oracle_tables
+WHERE id = @hops_table_id;
+SELECT column_name, data_type, nullable, default_value, comment, column_id
+FROM oracle_columns
+WHERE table_id = @hops_table_id
+ORDER BY column_id;
+SELECT column_name
+FROM oracle_primary_keys
+WHERE table_id = @hops_table_id;
+SELECT constraint_name, column_name, referenced_table, referenced_column
+FROM oracle_foreign_keys
+WHERE table_id = @hops_table_id;
+SELECT index_name, index_type, uniqueness, column_name, status
+FROM oracle_indices
+WHERE table_id = @hops_table_id;
+"""
+
 
+class AmbiguousTableError(Exception):
+    """表名匹配到多个表"""
 
-def get_table_columns_info(table_name, owner=None):
+    def __init__(self, table_name, candidates):
+        super().__init__(f"表名 {table_name} 匹配到多个表")
+        self.table_name = table_name
+        self.candidates = candidates
+
+
+def _escape_like(value):
+    """转义LIKE模式中的通配符"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _match_condition(mode, table_name, owner=None):
+    """构建指定匹配方式的表查询条件"""
+    if mode == 'exact':
+        table_where = "t.table_name = %s"
+        params = [table_name]
+    elif mode == 'prefix':
+        table_where = "t.table_name LIKE %s"
+        params = [f"{_escape_like(table_name)}%"]
+    else:
+        table_where = "t.table_name LIKE %s"
+        params = [f"%{_escape_like(table_name)}%"]
+    
+    if owner:
+        table_where += " AND t.owner = %s"
+        params.append(owner)
+    return table_where, params
+
+
+def _fetch_result_sets(cursor, count):
+    """读取多语句查询的结果集，跳过不返回数据的语句（如SET）"""
+    result_sets = []
+    while True:
+        if cursor.description is not None:
+            result_sets.append(list(cursor.fetchall()))
+        if len(result_sets) >= count or not cursor.nextset():
+            break
+    # 消费剩余结果集，保证连接可以继续使用
+    while cursor.nextset():
+        pass
+    return result_sets
+
+
+def build_table_result(table_info, columns, primary_keys, foreign_keys, indices):
+    """将表、列、主键、外键、索引数据组装为接口返回结构"""
+    # 为每个列添加主键标记
+    primary_key_set = set(primary_keys)
+    for column in columns:
+        column['is_primary_key'] = column['column_name'] in primary_key_set
+
+    return {
+        'table_info': {
+            'owner': table_info['owner'],
+            'table_name': table_info['table_name'],
+            'comment': table_info['comment'] or '',
+            'rows_count': table_info['rows_count'],
+            'last_analyzed': table_info['last_analyzed'].isoformat() if table_info['last_analyzed'] else None
+        },
+        'columns': columns,
+        'primary_keys': primary_keys,
+        'foreign_keys': foreign_keys,
+        'indices': indices
+    }
+
+
+def get_table_columns_info(table_name, owner=None, match='exact'):
     """
-    获取指定表的列信息
+    获取指定表的列信息（启用内存快照时直接从快照返回，否则经过元数据缓存查询数据库）
+    
+    先按表名精确匹配（走索引）；match为prefix或fuzzy时，精确匹配不到再依次尝试前缀匹配、包含匹配。
+    任一阶段匹配到多个表时抛出AmbiguousTableError，由调用方返回候选列表。
     
     Args:
-        table_name: 表名（支持模糊匹配）
+        table_name: 表名
         owner: 表所有者（可选）
+        match: 匹配方式 exact/prefix/fuzzy，默认exact
     
     Returns:
-        dict: 包含表信息和列详情的字典
+        dict: 包含表信息和列详情的字典，未找到时返回None
+    """
+    if match not in MATCH_MODES:
+        raise ValueError(f"不支持的匹配方式: {match}")
+    
+    snapshot = catalog_snapshots.current()
+    if snapshot is not None:
+        return _find_snapshot_table(snapshot, table_name, owner, match)
+    return _cached(('columns', table_name, owner, match),
+                   lambda: _query_table_columns_info(table_name, owner, match))
+
+
+def _find_snapshot_table(snapshot, table_name, owner=None, match='exact'):
+    """在内存快照中按匹配方式逐级查找表"""
+    for mode in MATCH_MODES[:MATCH_MODES.index(match) + 1]:
+        tables = snapshot.find_tables(table_name, owner, mode)
+        if len(tables) == 1:
+            return tables[0].to_result()
+        if len(tables) > 1:
+            candidates = [{'owner': t.owner, 'table_name': t.table_name, 'comment': t.comment}
+                          for t in tables[:CANDIDATE_LIMIT]]
+            raise AmbiguousTableError(table_name, candidates)
+    return None
+
+
+def _query_table_columns_info(table_name, owner=None, match='exact'):
+    """
+    从数据库查询指定表的列信息
+    
+    每个匹配阶段的计数、表、列、主键、外键、索引通过一条多语句查询在一次网络往返内取回
     """
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(multi_statements=True) as conn:
             with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                # 构建查询条件
-                table_where = "t.table_name LIKE %s"
-                params = [f"%{table_name}%"]
-                
-                if owner:
-                    table_where += " AND t.owner = %s"
-                    params.append(owner)
-                
-                # 查询表基本信息
-                table_query = f"""
-                SELECT t.id, t.owner, t.table_name, t.comment, t.rows_count, t.last_analyzed
-                FROM oracle_tables t
-                WHERE {table_where}
-                ORDER BY t.owner, t.table_name
-                """
-                
-                cursor.execute(table_query, params)
-                tables = cursor.fetchall()
-                
-                if not tables:
-                    return None
-                
-                # 如果找到多个表，返回第一个匹配的表
-                table_info = tables[0]
-                table_id = table_info['id']
-                
-                # 查询列信息
-                columns_query = """
-                SELECT column_name, data_type, nullable, default_value, comment, column_id
-                FROM oracle_columns
-                WHERE table_id = %s
-                ORDER BY column_id
-                """
-                
-                cursor.execute(columns_query, [table_id])
-                columns = cursor.fetchall()
-                
-                # 查询主键信息
-                pk_query = """
-                SELECT column_name
-                FROM oracle_primary_keys
-                WHERE table_id = %s
-                """
-                
-                cursor.execute(pk_query, [table_id])
-                primary_keys = [row['column_name'] for row in cursor.fetchall()]
-                
-                # 查询外键信息
-                fk_query = """
-                SELECT constraint_name, column_name, referenced_table, referenced_column
-                FROM oracle_foreign_keys
-                WHERE table_id = %s
-                """
+                for mode in MATCH_MODES[:MATCH_MODES.index(match) + 1]:
+                    table_where, params = _match_condition(mode, table_name, owner)
+                    cursor.execute(TABLE_DETAIL_QUERY.format(table_where=table_where), params)
+                    counts, tables, columns, pk_rows, foreign_keys, indices = _fetch_result_sets(cursor, 6)
+                    match_count = counts[0]['match_count']
+                    
+                    if match_count == 1:
+                        primary_keys = [row['column_name'] for row in pk_rows]
+                        return build_table_result(tables[0], columns, primary_keys, foreign_keys, indices)
+                    
+                    if match_count > 1:
+                        # 匹配到多个表时不再猜测，返回候选列表
+                        cursor.execute(f"""
+                        SELECT t.owner, t.table_name, t.comment
+                        FROM oracle_tables t
+                        WHERE {table_where}
+                        ORDER BY t.owner, t.table_name
+                        LIMIT {CANDIDATE_LIMIT}
+                        """, params)
+                        raise AmbiguousTableError(table_name, list(cursor.fetchall()))
                 
-                cursor.execute(fk_query, [table_id])
-                foreign_keys = cursor.fetchall()
-                
-                # 查询索引信息
-                idx_query = """
-                SELECT index_name, index_type, uniqueness, column_name, status
-                FROM oracle_indices
-                WHERE table_id = %s
-                """
-                
-                cursor.execute(idx_query, [table_id])
-                indices = cursor.fetchall()
-                
-                # 为每个列添加主键标记
-                for column in columns:
-                    column['is_primary_key'] = column['column_name'] in primary_keys
-                
-                # 构建返回结果
-                result = {
-                    'table_info': {
-                        'owner': table_info['owner'],
-                        'table_name': table_info['table_name'],
-                        'comment': table_info['comment'] or '',
-                        'rows_count': table_info['rows_count'],
-                        'last_analyzed': table_info['last_analyzed'].isoformat() if table_info['last_analyzed'] else None
-                    },
-                    'columns': columns,
-                    'primary_keys': primary_keys,
-                    'foreign_keys': foreign_keys,
-                    'indices': indices
-                }
-                
-                return result
+                return None
                 
+    except AmbiguousTableError:
+        raise
     except Exception as e:
         print(f"查询表列信息错误: {e}")
         raise
 
 
-def search_tables(keyword=None, owner=None):
+# 批量查询时每批处理的表数量，控制单条SQL的参数个数
+BATCH_CHUNK_SIZE = 500
+
+# 按表ID批量查询四张子表的语句，{ids} 为表ID占位符列表
+TABLE_CHILD_QUERIES = (
+    """
+SELECT table_id, column_name, data_type, nullable, default_value, comment, column_id
+FROM oracle_columns
+WHERE table_id IN ({ids})
+ORDER BY table_id, column_id""",
+    """
+SELECT table_id, column_name
+FROM oracle_primary_keys
+WHERE table_id IN ({ids})""",
+    """
+SELECT table_id, constraint_name, column_name, referenced_table, referenced_column
+FROM oracle_foreign_keys
+WHERE table_id IN ({ids})""",
     """
-    搜索表名和注释
+SELECT table_id, index_name, index_type, uniqueness, column_name, status
+FROM oracle_indices
+WHERE table_id IN ({ids})""",
+)
+
+# 批量查询子表的多语句查询，一次往返返回四个结果集
+TABLE_CHILDREN_BATCH_QUERY = "".join(f"{query};" for query in TABLE_CHILD_QUERIES) + "\n"
+
+
+def _query_tables_batch(cursor, pairs):
+    """按 (owner, table_name) 批量查询表详情，返回 {(OWNER, TABLE_NAME): 结果}"""
+    if not pairs:
+        # 空的 IN () 是语法错误；按所有者比较时一批表可能全部只在一边存在
+        return {}
+    placeholders = ", ".join(["(%s, %s)"] * len(pairs))
+    params = [value for pair in pairs for value in pair]
+    cursor.execute(f"""
+    SELECT id, owner, table_name, comment, rows_count, last_analyzed
+    FROM oracle_tables
+    WHERE (owner, table_name) IN ({placeholders})
+    """, params)
+    tables = {row['id']: row for row in cursor.fetchall()}
+    if not tables:
+        return {}
+
+    table_ids = list(tables.keys())
+    id_placeholders = ", ".join(["%s"] * len(table_ids))
+    cursor.execute(TABLE_CHILDREN_BATCH_QUERY.format(ids=id_placeholders), table_ids * 4)
+    children = _group_child_rows(table_ids, _fetch_result_sets(cursor, 4))
+
+    results = {}
+    for table_id, table_info in tables.items():
+        key = (table_info['owner'].upper(), table_info['table_name'].upper())
+        results[key] = _build_from_children(table_info, children[table_id])
+    return results
+
+
+def _group_child_rows(table_ids, result_sets):
+    """将列、主键、外键、索引四个结果集按表ID分组，返回 {表ID: (列, 主键, 外键, 索引)}"""
+    children = {table_id: ([], [], [], []) for table_id in table_ids}
+    for position, rows in enumerate(result_sets):
+        for row in rows:
+            group = children.get(row.pop('table_id'))
+            if group is not None:
+                group[position].append(row)
+    return children
+
+
+def _build_from_children(table_info, children):
+    """由表行和按表分组的子表行组装接口返回结构"""
+    columns, pks, foreign_keys, indices = children
+    primary_keys = [row['column_name'] for row in pks]
+    return build_table_result(table_info, columns, primary_keys, foreign_keys, indices)
+
+
+def get_tables_batch(pairs):
+    """
+    批量获取多个表的列信息
+    
+    每批表只执行两次数据库往返：一次按 (owner, table_name) IN (...) 查询表，
+    一次多语句查询按 table_id IN (...) 取回列、主键、外键、索引。
     
     Args:
-        keyword: 搜索关键词（可选）- 匹配表名或注释
-        owner: 表所有者（可选）
+        pairs: (owner, table_name) 列表，均为精确匹配
     
     Returns:
-        list: 表列表
+        dict: tables为按请求顺序排列的表详情，not_found为未找到的表
     """
+    keys = [(owner.upper(), table_name.upper()) for owner, table_name in pairs]
+    found = {}
+    
+    snapshot = catalog_snapshots.current()
+    if snapshot is not None:
+        for key in keys:
+            table = snapshot.tables_by_key.get(key)
+            if table is not None:
+                found[key] = table.to_result()
+    else:
+        try:
+            unique_pairs = list(dict.fromkeys(keys))
+            with get_db_connection(multi_statements=True) as conn:
+                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    for start in range(0, len(unique_pairs), BATCH_CHUNK_SIZE):
+                        found.update(_query_tables_batch(cursor, unique_pairs[start:start + BATCH_CHUNK_SIZE]))
+        except Exception as e:
+            print(f"批量查询表列信息错误: {e}")
+            raise
+    
+    return {
+        'tables': [found[key] for key in keys if key in found],
+        'not_found': [{'owner': owner, 'table_name': table_name}
+                      for (owner, table_name), key in zip(pairs, keys) if key not in found]
+    }
+
+
+# 导出时每批读取的表数量，每批在一个短事务内读取，子表行在内存中分组，内存占用只与批大小相关
+EXPORT_CHUNK_SIZE = 500
+
+
+class CatalogChangedError(RuntimeError):
+    """流式导出期间分析工具发布了新的目录版本"""
+
+
+def iter_catalog_export(owner=None):
+    """
+    逐个生成目录中每个表的详情，结构与单表查询接口一致
+    
+    数据库模式下使用一个独立于连接池的连接，按 (owner, table_name) 分批（键集分页）读取表和四张子表。
+    每批在独立的 START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY 事务内读取，读完即提交，再输出该批结果：
+    元数据锁只在读取一批期间持有，客户端接收得慢也不会阻塞分析工具替换影子表；同一批内的表和子表行来自同一时间点。
+    每批在快照内读取目录版本号，导出期间分析工具发布了新版本时抛出CatalogChangedError中止导出，避免混合两个版本的目录。
+    内存占用只与批大小相关。内存快照模式下直接遍历快照。
+    
+    Args:
+        owner: 表所有者（可选）
+    
+    Yields:
+        dict: 表详情
+    """
+    snapshot = catalog_snapshots.current()
+    if snapshot is not None:
+        tables = snapshot.tables_by_owner.get(owner.upper(), []) if owner else snapshot.tables
+        for table in tables:
+            yield table.to_result()
+        return
+    
+    connection = None
+    try:
+        connection = create_streaming_connection()
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            generation = None
+            last_key = None
+            while True:
+                cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+                chunk_generation = _snapshot_generation(cursor)
+                if generation is None:
+                    generation = chunk_generation
+                elif chunk_generation != generation:
+                    raise CatalogChangedError(
+                        f"导出期间目录已更新（版本号 {generation} -> {chunk_generation}），请重新导出")
+                tables, children = _read_export_chunk(cursor, owner, last_key)
+                # 先结束事务释放元数据锁，再输出本批结果；出错时关闭连接即结束事务
+                connection.commit()
+                if not tables:
+                    break
+                last_key = (tables[-1]['owner'], tables[-1]['table_name'])
+                for table_info in tables:
+                    yield _build_from_children(table_info, children[table_info['id']])
+    except Exception as e:
+        print(f"导出目录错误: {e}")
+        raise
+    finally:
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+def _snapshot_generation(cursor):
+    """在当前事务的快照内读取目录版本号，元数据表尚未创建时返回0"""
+    try:
+        cursor.execute("SELECT generation FROM oracle_catalog_meta WHERE id = 1")
+    except pymysql.err.ProgrammingError as e:
+        if e.args and e.args[0] == ER_NO_SUCH_TABLE:
+            return 0
+        raise
+    row = cursor.fetchone()
+    return row['generation'] if row else 0
+
+
+def _read_export_chunk(cursor, owner, last_key):
+    """读取 (owner, table_name) 排在last_key之后的一批表及其子表，返回 (表列表, {表ID: 子表行})"""
+    conditions, params = [], []
+    if owner:
+        conditions.append("owner = %s")
+        params.append(owner)
+    if last_key:
+        # 展开为OR以便按 UNIQUE KEY(owner, table_name) 范围扫描
+        conditions.append("(owner > %s OR (owner = %s AND table_name > %s))")
+        params.extend([last_key[0], last_key[0], last_key[1]])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor.execute(f"""
+    SELECT id, owner, table_name, comment, rows_count, last_analyzed
+    FROM oracle_tables
+    {where}
+    ORDER BY owner, table_name
+    LIMIT {EXPORT_CHUNK_SIZE}
+    """, params)
+    tables = cursor.fetchall()
+    if not tables:
+        return tables, {}
+    
+    table_ids = [table['id'] for table in tables]
+    id_placeholders = ", ".join(["%s"] * len(table_ids))
+    result_sets = []
+    for query in TABLE_CHILD_QUERIES:
+        cursor.execute(query.format(ids=id_placeholders), table_ids)
+        result_sets.append(cursor.fetchall())
+    return tables, _group_child_rows(table_ids, result_sets)
+
+
+def _build_table_search_index():
+    """从数据库加载全部表名和注释，构建表搜索索引"""
     try:
         with get_db_connection() as conn:
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                # 构建查询条件
-                where_conditions = []
-                params = []
-                
-                if keyword:
-                    # 搜索表名或注释
-                    where_conditions.append("(table_name LIKE %s OR comment LIKE %s)")
-                    params.extend([f"%{keyword}%", f"%{keyword}%"])
-                
-                if owner:
-                    where_conditions.append("owner = %s")
-                    params.append(owner)
-                
-                where_clause = ""
-                if where_conditions:
-                    where_clause = "WHERE " + " AND ".join(where_conditions)
-                
-                query = f"""
+            with conn.cursor() as cursor:
+                cursor.execute("""
                 SELECT owner, table_name, comment, rows_count
                 FROM oracle_tables
-                {where_clause}
-                ORDER BY owner, table_name
-                LIMIT 100
-                """
-                
-                cursor.execute(query, params)
-                return cursor.fetchall()
-                
+                """)
+                return TableSearchIndex([TableEntry(*row) for row in cursor.fetchall()])
+    except Exception as e:
+        print(f"构建表搜索索引错误: {e}")
+        raise
+
+
+def _build_column_search_index():
+    """从数据库流式加载全部列名和列注释，构建列搜索索引"""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute("""
+                SELECT t.owner, t.table_name, c.column_name, c.data_type, c.comment
+                FROM oracle_columns c
+                JOIN oracle_tables t ON t.id = c.table_id
+                """)
+                return ColumnSearchIndex(ColumnEntry(*row) for row in cursor)
+    except Exception as e:
+        print(f"构建列搜索索引错误: {e}")
+        raise
+
+
+table_search_index = GenerationalIndex(_build_table_search_index, catalog_generation, 'table-search-index')
+column_search_index = GenerationalIndex(_build_column_search_index, catalog_generation, 'column-search-index')
+
+
+def start_search_indexes():
+    """数据库模式下在后台构建表和列搜索索引，并在目录版本号变化后提前重建，避免首个搜索请求等待构建"""
+    interval = CACHE_CONFIG['generation_check_interval']
+    table_search_index.start(interval)
+    column_search_index.start(interval)
+
+
+def get_search_index_stats():
+    """获取搜索索引统计信息"""
+    return {
+        'tables': table_search_index.stats(),
+        'columns': column_search_index.stats()
+    }
+
+
+def search_tables(keyword=None, owner=None, limit=SEARCH_LIMIT, after=None, include_total=False):
+    """
+    搜索表名和注释，支持键集分页
+    
+    通过n-gram倒排索引匹配，结果按相关度排序：表名完全相等 > 表名前缀 > 表名包含 > 注释包含。
+    启用内存快照时使用快照内的索引，否则使用按目录版本号重建的进程内索引。
+    分页游标记录上一页最后一条的 (匹配等级, owner, 表名)，翻页时二分定位，不使用OFFSET。
+    
+    Args:
+        keyword: 搜索关键词（可选）- 匹配表名或注释
+        owner: 表所有者（可选）
+        limit: 每页条数
+        after: 上一页返回的next_after游标（可选），格式错误时抛出ValueError
+        include_total: 是否返回匹配总数
+    
+    Returns:
+        dict: tables为当前页的表列表，next_after为下一页游标（没有下一页时为None）
+    """
+    after_key = decode_cursor(after) if after else None
+    
+    try:
+        snapshot = catalog_snapshots.current()
+        index = snapshot.table_search_index if snapshot is not None else table_search_index.get()
+        hits, total, has_more = index.search_page(keyword, owner, after_key, limit)
     except Exception as e:
         print(f"搜索表错误: {e}")
         raise
+    
+    next_after = None
+    if has_more and hits:
+        rank, table = hits[-1]
+        next_after = encode_cursor((rank, table.owner.upper(), table.table_name.upper()))
+    
+    result = {
+        'tables': [table_hit_to_dict(rank, table) for rank, table in hits],
+        'next_after': next_after
+    }
+    if include_total:
+        result['total'] = total
+    return result
+
+
+def search_columns(keyword, owner=None, data_type=None, page=1, page_size=50):
+    """
+    搜索列名和列注释
+    
+    通过n-gram倒排索引匹配，结果按相关度排序：列名完全相等 > 列名前缀 > 列名包含 > 注释包含
+    
+    Args:
+        keyword: 搜索关键词 - 匹配列名或列注释
+        owner: 表所有者（可选）
+        data_type: 数据类型前缀（可选）
+        page: 页码，从1开始
+        page_size: 每页条数
+    
+    Returns:
+        dict: 当前页的列列表及总数
+    """
+    try:
+        snapshot = catalog_snapshots.current()
+        index = snapshot.column_search_index if snapshot is not None else column_search_index.get()
+        hits = index.search(keyword, owner, data_type)
+        start = (page - 1) * page_size
+        return {
+            'columns': [column_hit_to_dict(rank, column) for rank, column in hits[start:start + page_size]],
+            'total': len(hits),
+            'page': page,
+            'page_size': page_size
+        }
+    except Exception as e:
+        print(f"搜索列错误: {e}")
+        raise
 
 
- 
\ No newline at end of file
+def get_table_history(table_name, owner=None, version=None):
+    """
+    获取表的结构变化历史，并由增量重建表在指定版本的结构
+    
+    通过 (table_name, owner, version) 索引一次读取该表的全部增量，重建开销只与该表的变化次数相关。
+    未指定owner且多个所有者下有同名表的历史时抛出AmbiguousTableError。
+    
+    Args:
+        table_name: 表名
+        owner: 表所有者（可选）
+        version: 目录历史版本（可选），默认为最新版本
+    
+    Returns:
+        dict: changes为按版本升序排列的变化记录，table为该版本的表结构（表在该版本不存在时为None）；
+              没有任何历史记录时返回None
+    """
+    return _cached(('history', table_name, owner, version),
+                   lambda: _query_table_history(table_name, owner, version))
+
+
+def _query_table_history(table_name, owner=None, version=None):
+    """从数据库读取表的增量并重建指定版本"""
+    where = "d.table_name = %s"
+    params = [table_name]
+    if owner:
+        where += " AND d.owner = %s"
+        params.append(owner)
+    
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute(f"""
+                SELECT d.version, d.owner, d.table_name, d.change_type, d.delta, r.run_id, r.finished_at
+                FROM oracle_table_deltas d
+                LEFT JOIN oracle_catalog_runs r ON r.version = d.version
+                WHERE {where}
+                ORDER BY d.owner, d.version, d.id
+                """, params)
+                rows = cursor.fetchall()
+    except Exception as e:
+        print(f"查询表历史错误: {e}")
+        raise
+    
+    if not rows:
+        return None
+    owners = sorted({row['owner'] for row in rows})
+    if len(owners) > 1:
+        raise AmbiguousTableError(table_name, [{'owner': o, 'table_name': rows[0]['table_name'], 'comment': None}
+                                               for o in owners[:CANDIDATE_LIMIT]])
+    
+    changes = [(row['version'], row['change_type'], parse_delta(row['delta'])) for row in rows]
+    state = reconstruct_table(changes, version)
+    owner, table_name = rows[-1]['owner'], rows[-1]['table_name']
+    return {
+        'owner': owner,
+        'table_name': table_name,
+        'version': version if version is not None else rows[-1]['version'],
+        'table': state_to_result(owner, table_name, state) if state is not None else None,
+        'changes': [
+            {
+                'version': row['version'],
+                'run_id': row['run_id'],
+                'finished_at': row['finished_at'].isoformat() if row['finished_at'] else None,
+                'change_type': row['change_type'],
+                'delta': delta
+            }
+            for row, (_, _, delta) in zip(rows, changes)
+        ]
+    }
+
+
+# 比较两个所有者时按表计算内容哈希的多语句查询，依次返回表注释和四张子表的哈希。
+# 各字段以0x1f分隔、各行以0x1e分隔并按业务键排序，NULL以0x00表示，哈希只与表结构内容相关而与行ID无关；
+# 外键和索引名在不同环境中多为系统生成，先按约束/索引合并为结构签名（列以0x1c分隔），再对排序后的签名计算哈希
+OWNER_HASH_QUERY = """
+SELECT t.table_name, t.comment
+FROM oracle_tables t
+WHERE t.owner = %s;
+SELECT t.table_name, MD5(GROUP_CONCAT(CONCAT_WS(0x1f, c.column_name, IFNULL(c.data_type, 0x00),
+       IFNULL(c.nullable, 0x00), IFNULL(c.default_value, 0x00), IFNULL(c.comment, 0x00), IFNULL(c.column_id, 0x00))
+       ORDER BY c.column_name SEPARATOR 0x1e)) AS content_hash
+FROM oracle_columns c JOIN oracle_tables t ON t.id = c.table_id
+WHERE t.owner = %s
+GROUP BY t.table_name;
+SELECT t.table_name, MD5(GROUP_CONCAT(p.column_name ORDER BY p.column_name SEPARATOR 0x1e)) AS content_hash
+FROM oracle_primary_keys p JOIN oracle_tables t ON t.id = p.table_id
+WHERE t.owner = %s
+GROUP BY t.table_name;
+SELECT s.table_name, MD5(GROUP_CONCAT(s.signature ORDER BY s.signature SEPARATOR 0x1e)) AS content_hash
+FROM (
+    SELECT t.table_name, CONCAT_WS(0x1f,
+           GROUP_CONCAT(f.column_name ORDER BY f.column_name, f.referenced_column SEPARATOR 0x1c),
+           f.referenced_table,
+           GROUP_CONCAT(IFNULL(f.referenced_column, 0x00) ORDER BY f.column_name, f.referenced_column SEPARATOR 0x1c)
+           ) AS signature
+    FROM oracle_foreign_keys f JOIN oracle_tables t ON t.id = f.table_id
+    WHERE t.owner = %s
+    GROUP BY t.table_name, f.constraint_name, f.referenced_table
+) s
+GROUP BY s.table_name;
+SELECT s.table_name, MD5(GROUP_CONCAT(s.signature ORDER BY s.signature SEPARATOR 0x1e)) AS content_hash
+FROM (
+    SELECT t.table_name, CONCAT_WS(0x1f,
+           GROUP_CONCAT(i.column_name ORDER BY i.column_name SEPARATOR 0x1c),
+           IFNULL(MAX(i.index_type), 0x00), IFNULL(MAX(i.uniqueness), 0x00), IFNULL(MAX(i.status), 0x00)
+           ) AS signature
+    FROM oracle_indices i JOIN oracle_tables t ON t.id = i.table_id
+    WHERE t.owner = %s
+    GROUP BY t.table_name, i.index_name
+) s
+GROUP BY s.table_name;
+"""
+
+# 计算所有者哈希时GROUP_CONCAT的长度上限，只在比较期间设置，结束后恢复默认值，不影响连接池中的其他请求
+OWNER_HASH_GROUP_CONCAT_MAX_LEN = 67108864
+
+
+def diff_catalog(from_ref, to_ref=None):
+    """
+    比较两个目录版本或两个所有者的表结构，返回逐条生成差异记录的迭代器
+    
+    from和to均为数字时按目录历史版本比较（to默认为最新版本），否则按所有者比较同名表。
+    参数在返回迭代器之前校验，无效时抛出ValueError。
+    
+    Args:
+        from_ref: 起始版本号或所有者
+        to_ref: 目标版本号或所有者
+    
+    Returns:
+        iterator: 依次生成diff头记录、每个有差异的表的记录、summary汇总记录
+    """
+    from_ref = (from_ref or '').strip()
+    to_ref = (to_ref or '').strip()
+    if not from_ref:
+        raise ValueError("缺少from参数")
+    
+    if from_ref.isdigit() and (not to_ref or to_ref.isdigit()):
+        from_version = int(from_ref)
+        latest_version = _latest_catalog_version()
+        to_version = int(to_ref) if to_ref else latest_version
+        for version in (from_version, to_version):
+            if version > latest_version:
+                raise ValueError(f"版本 {version} 不存在，最新版本为 {latest_version}")
+        return _tag_diff_records('versions', from_version, to_version,
+                                 _iter_version_diff(from_version, to_version))
+    
+    if not to_ref:
+        raise ValueError("按所有者比较时缺少to参数")
+    if from_ref.isdigit() or to_ref.isdigit():
+        raise ValueError("from和to必须同为版本号或同为所有者")
+    missing = [owner for owner in (from_ref, to_ref) if not _owner_exists(owner)]
+    if missing:
+        raise ValueError(f"所有者不存在: {', '.join(missing)}")
+    return _tag_diff_records('owners', from_ref, to_ref, _iter_owner_diff(from_ref, to_ref))
+
+
+def _tag_diff_records(mode, from_ref, to_ref, records):
+    """在差异记录前后加上diff头记录和summary汇总记录"""
+    yield {'type': 'diff', 'mode': mode, 'from': from_ref, 'to': to_ref}
+    counts = {'added': 0, 'changed': 0, 'removed': 0}
+    for record in records:
+        counts[record['change_type']] += 1
+        yield record
+    yield dict(type='summary', **counts)
+
+
+def _latest_catalog_version():
+    """返回最新的目录历史版本号，没有历史时返回0"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT MAX(version) FROM oracle_catalog_runs")
+            row = cursor.fetchone()
+    return (row[0] if row else None) or 0
+
+
+def _owner_exists(owner):
+    """判断所有者在当前目录中是否有表"""
+    snapshot = catalog_snapshots.current()
+    if snapshot is not None:
+        return owner.upper() in snapshot.tables_by_owner
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM oracle_tables WHERE owner = %s LIMIT 1", (owner,))
+            return cursor.fetchone() is not None
+
+
+def _iter_version_diff(from_version, to_version):
+    """
+    比较两个目录版本：只读取在两个版本之间有变化的表的增量，分别重建两个版本后比较
+    
+    一次查询用服务端无缓冲游标按 (owner, table_name, version) 顺序读取，内存占用只与单个表的增量相关
+    """
+    low, high = sorted((from_version, to_version))
+    if low == high:
+        return
+    connection = None
+    try:
+        connection = create_streaming_connection()
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT d.owner, d.table_name, d.version, d.change_type, d.delta
+        FROM oracle_table_deltas d
+        JOIN (
+            SELECT DISTINCT owner, table_name
+            FROM oracle_table_deltas
+            WHERE version > %s AND version <= %s
+        ) c ON c.owner = d.owner AND c.table_name = d.table_name
+        WHERE d.version <= %s
+        ORDER BY d.owner, d.table_name, d.version, d.id
+        """, (low, high, high))
+        
+        for (owner, table_name), rows in groupby(cursor, key=lambda row: (row['owner'], row['table_name'])):
+            changes = [(row['version'], row['change_type'], parse_delta(row['delta'])) for row in rows]
+            diff = diff_states(reconstruct_table(changes, from_version), reconstruct_table(changes, to_version))
+            if diff is not None:
+                yield {'type': 'table', 'owner': owner, 'table_name': table_name,
+                       'change_type': diff[0], 'delta': diff[1]}
+    except Exception as e:
+        print(f"比较目录版本错误: {e}")
+        raise
+    finally:
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+def _owner_table_hashes(cursor, owner):
+    """返回所有者下每个表的 {TABLE_NAME: (表名, 注释, 列哈希, 主键哈希, 外键哈希, 索引哈希)}"""
+    cursor.execute(OWNER_HASH_QUERY, [owner] * 5)
+    tables, *child_hashes = _fetch_result_sets(cursor, 5)
+    hashes = {row['table_name'].upper(): [row['table_name'], row['comment'] or None, None, None, None, None]
+              for row in tables}
+    for position, rows in enumerate(child_hashes, start=2):
+        for row in rows:
+            entry = hashes.get(row['table_name'].upper())
+            if entry is not None:
+                entry[position] = row['content_hash']
+    return {key: tuple(entry) for key, entry in hashes.items()}
+
+
+def _diff_owner_tables(old_result, new_result):
+    """按结构签名比较两个所有者下的同名表，外键名和索引名不参与比较"""
+    return diff_states(signature_state_from_result(old_result) if old_result else None,
+                       signature_state_from_result(new_result) if new_result else None,
+                       SIGNATURE_SECTION_KEYS, SIGNATURE_NAME_COLUMNS)
+
+
+def _iter_owner_diff(from_owner, to_owner):
+    """
+    按表名比较两个所有者下的表
+    
+    数据库模式下先用一次多语句查询计算两边每个表的内容哈希，只为哈希不同的表按批取回完整结构逐表比较；
+    每批查询结束后即归还连接，再输出该批结果。内存快照模式下直接比较快照中的表。
+    """
+    snapshot = catalog_snapshots.current()
+    if snapshot is not None:
+        old_tables = {t.table_name.upper(): t for t in snapshot.tables_by_owner.get(from_owner.upper(), [])}
+        new_tables = {t.table_name.upper(): t for t in snapshot.tables_by_owner.get(to_owner.upper(), [])}
+        for key in sorted(old_tables.keys() | new_tables.keys()):
+            old_table, new_table = old_tables.get(key), new_tables.get(key)
+            diff = _diff_owner_tables(old_table.to_result() if old_table else None,
+                                      new_table.to_result() if new_table else None)
+            if diff is not None:
+                table_name = (new_table or old_table).table_name
+                yield {'type': 'table', 'table_name': table_name, 'change_type': diff[0], 'delta': diff[1]}
+        return
+    
+    try:
+        with get_db_connection(multi_statements=True) as conn:
+            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute("SET SESSION group_concat_max_len = %s", (OWNER_HASH_GROUP_CONCAT_MAX_LEN,))
+                try:
+                    old_hashes = _owner_table_hashes(cursor, from_owner)
+                    new_hashes = _owner_table_hashes(cursor, to_owner)
+                finally:
+                    cursor.execute("SET SESSION group_concat_max_len = DEFAULT")
+        
+        # 比较除表名外的注释和哈希，只在一边存在的表也视为有差异
+        differing = [key for key in sorted(old_hashes.keys() | new_hashes.keys())
+                     if old_hashes.get(key, (None,))[1:] != new_hashes.get(key, (None,))[1:]]
+        
+        for start in range(0, len(differing), BATCH_CHUNK_SIZE):
+            chunk = differing[start:start + BATCH_CHUNK_SIZE]
+            with get_db_connection(multi_statements=True) as conn:
+                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    old_results = _query_tables_batch(
+                        cursor, [(from_owner, old_hashes[key][0]) for key in chunk if key in old_hashes])
+                    new_results = _query_tables_batch(
+                        cursor, [(to_owner, new_hashes[key][0]) for key in chunk if key in new_hashes])
+            
+            for key in chunk:
+                old_result = old_results.get((from_owner.upper(), key))
+                new_result = new_results.get((to_owner.upper(), key))
+                diff = _diff_owner_tables(old_result, new_result)
+                if diff is not None:
+                    table_name = (new_hashes.get(key) or old_hashes[key])[0]
+                    yield {'type': 'table', 'table_name': table_name, 'change_type': diff[0], 'delta': diff[1]}
+    except Exception as e:
+        print(f"比较所有者错误: {e}")
+        raise
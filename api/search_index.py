@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+搜索索引模块
+基于n-gram倒排索引实现表名、列名及其注释的子串搜索：名称使用三元组（trigram），
+注释使用二元组（bigram，适配中文），查询时只校验最稀有n-gram对应的候选文档，
+搜索耗时与候选数量相关而不是与条目总数相关
+"""
+
+import os
+import abc
+import json
+import base64
+import bisect
+import threading
+from array import array
+from collections import namedtuple, OrderedDict
+
+# 匹配等级：数值越小相关度越高
+RANK_EXACT = 0  # 名称完全相等
+RANK_PREFIX = 1  # 名称前缀匹配
+RANK_SUBSTRING = 2  # 名称包含关键词
+RANK_COMMENT = 3  # 仅注释包含关键词
+
+MATCH_TYPES = {
+    RANK_EXACT: 'exact',
+    RANK_PREFIX: 'prefix',
+    RANK_SUBSTRING: 'substring',
+    RANK_COMMENT: 'comment',
+}
+
+# 每个表搜索索引缓存的关键词排序结果数，翻页时直接在缓存的结果上二分定位
+SEARCH_PAGE_CACHE_SIZE = int(os.environ.get('SEARCH_PAGE_CACHE_SIZE', '128'))
+
+# 数据库模式下构建索引使用的表条目和列条目
+TableEntry = namedtuple('TableEntry', ['owner', 'table_name', 'comment', 'rows_count'])
+ColumnEntry = namedtuple('ColumnEntry', ['owner', 'table_name', 'column_name', 'data_type', 'comment'])
+
+
+def table_hit_to_dict(rank, table):
+    """将表搜索命中转换为接口返回结构"""
+    return {
+        'owner': table.owner,
+        'table_name': table.table_name,
+        'comment': table.comment,
+        'rows_count': table.rows_count,
+        'match': MATCH_TYPES[rank]
+    }
+
+
+def column_hit_to_dict(rank, column):
+    """将列搜索命中转换为接口返回结构"""
+    return {
+        'owner': column.owner,
+        'table_name': column.table_name,
+        'column_name': column.column_name,
+        'data_type': column.data_type,
+        'comment': column.comment,
+        'match': MATCH_TYPES[rank]
+    }
+
+
+def encode_cursor(key):
+    """将分页位置 (匹配等级, OWNER, TABLE_NAME) 编码为不透明的游标字符串"""
+    raw = json.dumps(list(key), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """解析游标字符串，格式错误时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        rank, owner, table_name = json.loads(raw.decode('utf-8'))
+        if not isinstance(rank, int) or not isinstance(owner, str) or not isinstance(table_name, str):
+            raise ValueError
+        return (rank, owner, table_name)
+    except Exception:
+        raise ValueError(f"无效的分页游标: {token}")
+
+
+def ngrams(text, n):
+    """返回文本中所有长度为n的子串集合"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex:
+    """n-gram倒排索引，文档ID需按递增顺序添加
+
+    同时索引长度1到n-1的子串，短于n的关键词（如列名关键词ID）直接取对应的倒排表，不需要扫描全部文档
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.texts = []  # 文档ID -> 规范化（大写）后的文本
+        self.postings = {}  # n-gram -> 文档ID数组
+
+    def add(self, text):
+        """添加文档，返回文档ID"""
+        doc_id = len(self.texts)
+        text = (text or '').upper()
+        self.texts.append(text)
+        for size in range(1, self.n + 1):
+            for gram in ngrams(text, size):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array('I')
+                posting.append(doc_id)
+        return doc_id
+
+    def search(self, keyword):
+        """返回文本包含keyword（不区分大小写）的文档ID"""
+        keyword = keyword.upper()
+        texts = self.texts
+        if not keyword:
+            return list(range(len(texts)))
+        if len(keyword) <= self.n:
+            # 不长于n的关键词本身就是索引中的子串，倒排表即为全部匹配的文档，无需逐个校验
+            return list(self.postings.get(keyword, ()))
+
+        # 取最稀有的n-gram作为候选集合，逐个校验子串
+        rarest = None
+        for gram in ngrams(keyword, self.n):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return []
+            if rarest is None or len(posting) < len(rarest):
+                rarest = posting
+        return [doc_id for doc_id in rarest if keyword in texts[doc_id]]
+
+
+class RankedSearchIndex(abc.ABC):
+    """名称/注释搜索索引基类，按相关度排序：名称完全相等 > 前缀 > 包含 > 注释匹配"""
+
+    name_attr = None  # 条目中作为名称参与索引的属性
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=self.sort_key)
+        self.names = NgramIndex(3)
+        self.comments = NgramIndex(2)
+        # 条目按owner排序，每个owner的条目占连续的文档ID区间 [起始, 结束)
+        self.owner_ranges = {}
+        for doc_id, entry in enumerate(self.entries):
+            self.names.add(getattr(entry, self.name_attr))
+            self.comments.add(entry.comment)
+            owner = entry.owner.upper()
+            start, _ = self.owner_ranges.get(owner, (doc_id, doc_id))
+            self.owner_ranges[owner] = (start, doc_id + 1)
+
+    @staticmethod
+    @abc.abstractmethod
+    def sort_key(entry):
+        """同一匹配等级内的排序键，子类必须实现"""
+
+    def _ranked(self, keyword, owner=None, accept=None):
+        """
+        返回 (匹配等级, 文档ID) 列表，按相关度和文档ID排序
+
+        owner和accept（条目过滤函数）在排序之前应用，只对满足条件的命中排序
+        """
+        keyword_upper = keyword.upper()
+        low, high = 0, len(self.entries)
+        if owner:
+            low, high = self.owner_ranges.get(owner.upper(), (0, 0))
+        entries = self.entries
+
+        def wanted(doc_id):
+            return low <= doc_id < high and (accept is None or accept(entries[doc_id]))
+
+        ranks = {}
+        for doc_id in self.names.search(keyword_upper):
+            if not wanted(doc_id):
+                continue
+            name = self.names.texts[doc_id]
+            if name == keyword_upper:
+                ranks[doc_id] = RANK_EXACT
+            elif name.startswith(keyword_upper):
+                ranks[doc_id] = RANK_PREFIX
+            else:
+                ranks[doc_id] = RANK_SUBSTRING
+        for doc_id in self.comments.search(keyword_upper):
+            if doc_id not in ranks and wanted(doc_id):
+                ranks[doc_id] = RANK_COMMENT
+
+        # 文档ID与sort_key的顺序一致，因此按 (等级, 文档ID) 排序即可
+        return sorted((rank, doc_id) for doc_id, rank in ranks.items())
+
+
+class TableSearchIndex(RankedSearchIndex):
+    """表搜索索引"""
+
+    name_attr = 'table_name'
+
+    def __init__(self, entries):
+        super().__init__(entries)
+        # 与entries一一对应的排序键，用于二分定位分页起点
+        self.keys = [self.sort_key(t) for t in self.entries]
+        # (关键词, owner) -> 排序后的命中编码，索引按目录版本重建，缓存随之失效
+        self._page_cache = OrderedDict()
+        self._page_cache_lock = threading.Lock()
+
+    @staticmethod
+    def sort_key(table):
+        return (table.owner.upper(), table.table_name.upper())
+
+    def search_page(self, keyword=None, owner=None, after=None, limit=100):
+        """
+        按键集（keyset）分页搜索，排序键为 (匹配等级, OWNER, TABLE_NAME)
+
+        Args:
+            keyword: 搜索关键词（可选）
+            owner: 表所有者（可选）
+            after: 上一页最后一条的排序键（可选）
+            limit: 每页条数
+
+        Returns:
+            tuple: (当前页的 (匹配等级, 表条目) 列表, 匹配总数, 是否还有下一页)
+        """
+        if keyword:
+            # 命中编码为 等级*条目数+文档ID，顺序与 (匹配等级, OWNER, TABLE_NAME) 一致；
+            # 上一页最后一条的表名先在keys上二分得到文档ID位置，再在编码上二分，单页开销与匹配总数无关
+            codes = self._ranked_codes(keyword, owner)
+            size = len(self.entries)
+            start = 0
+            if after:
+                rank, after_owner, after_table = after
+                position = bisect.bisect_right(self.keys, (after_owner, after_table))
+                start = bisect.bisect_left(codes, rank * size + position)
+            page = [divmod(code, size) for code in codes[start:start + limit]]
+            return [(rank, self.entries[doc_id]) for rank, doc_id in page], len(codes), start + limit < len(codes)
+
+        # 无关键词时全部条目等级相同，直接在有序的排序键上二分定位，单页开销与总数无关
+        keys = self.keys
+        if owner:
+            owner = owner.upper()
+            low = bisect.bisect_left(keys, (owner,))
+            high = bisect.bisect_left(keys, (owner + '\x00',))
+        else:
+            low, high = 0, len(keys)
+        start = low
+        if after:
+            start = max(low, bisect.bisect_right(keys, tuple(after[1:])))
+        end = min(start + limit, high)
+        page = [(RANK_EXACT, t) for t in self.entries[start:end]]
+        return page, high - low, end < high
+
+    def _ranked_codes(self, keyword, owner=None):
+        """返回按相关度排序的命中编码数组，最近使用的SEARCH_PAGE_CACHE_SIZE个 (关键词, owner) 结果缓存在索引上"""
+        cache_key = (keyword.upper(), owner.upper() if owner else None)
+        with self._page_cache_lock:
+            codes = self._page_cache.get(cache_key)
+            if codes is not None:
+                self._page_cache.move_to_end(cache_key)
+                return codes
+
+        size = len(self.entries)
+        codes = array('Q', (rank * size + doc_id for rank, doc_id in self._ranked(keyword, owner)))
+        with self._page_cache_lock:
+            self._page_cache[cache_key] = codes
+            while len(self._page_cache) > SEARCH_PAGE_CACHE_SIZE:
+                self._page_cache.popitem(last=False)
+        return codes
+
+    def search(self, keyword=None, owner=None):
+        """
+        搜索表名和注释
+
+        Returns:
+            list: (匹配等级, 表条目) 列表，已按相关度、owner、表名排序
+        """
+        tables = self.entries
+
+        if not keyword:
+            if owner:
+                low, high = self.owner_ranges.get(owner.upper(), (0, 0))
+                return [(RANK_EXACT, t) for t in tables[low:high]]
+            return [(RANK_EXACT, t) for t in tables]
+
+        return [(rank, tables[doc_id]) for rank, doc_id in self._ranked(keyword, owner)]
+
+
+class ColumnSearchIndex(RankedSearchIndex):
+    """列搜索索引，索引列名和列注释"""
+
+    name_attr = 'column_name'
+
+    @staticmethod
+    def sort_key(column):
+        return (column.owner.upper(), column.table_name.upper(), column.column_name.upper())
+
+    def search(self, keyword, owner=None, data_type=None):
+        """
+        搜索列名和列注释
+
+        Args:
+            keyword: 搜索关键词 - 匹配列名或列注释
+            owner: 表所有者（可选）
+            data_type: 数据类型前缀（可选），如 VARCHAR2 可匹配 VARCHAR2(50)
+
+        Returns:
+            list: (匹配等级, 列条目) 列表，已按相关度、owner、表名、列名排序
+        """
+        accept = None
+        if data_type:
+            data_type = data_type.upper()
+            accept = lambda column: (column.data_type or '').upper().startswith(data_type)
+        columns = self.entries
+        return [(rank, columns[doc_id]) for rank, doc_id in self._ranked(keyword, owner, accept)]
+
+
+class GenerationalIndex:
+    """
+    按目录版本号失效的索引容器，版本号变化后的首次访问重新构建索引
+
+    调用start后由后台线程在启动时构建首个索引，并在版本号变化后提前重建，请求线程通常不需要等待构建
+    """
+
+    def __init__(self, builder, watcher, name='search-index'):
+        self.builder = builder
+        self.watcher = watcher
+        self.name = name
+        self._index = None
+        self._generation = None
+        self._lock = threading.Lock()
+        self._builds = 0
+        self._build_errors = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def get(self):
+        """返回与当前目录版本号一致的索引"""
+        generation = self.watcher.current()
+        if self._index is None or generation != self._generation:
+            with self._lock:
+                if self._index is None or generation != self._generation:
+                    self._index = self.builder()
+                    self._generation = generation
+                    self._builds += 1
+        return self._index
+
+    def start(self, interval):
+        """启动后台线程：立即构建索引，之后每interval秒检查一次目录版本号，变化时重建"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, args=(interval,),
+                                            name=f"{self.name}-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止后台线程"""
+        self._stop.set()
+
+    def _refresh_loop(self, interval):
+        """后台构建循环"""
+        while True:
+            try:
+                self.get()
+            except Exception as e:
+                self._build_errors += 1
+                print(f"后台构建{self.name}失败: {e}")
+            if self._stop.wait(interval):
+                break
+
+    def stats(self):
+        """返回索引统计信息"""
+        return {
+            'built': self._index is not None,
+            'generation': self._generation,
+            'builds': self._builds,
+            'build_errors': self._build_errors,
+            'background': self._thread is not None,
+        }
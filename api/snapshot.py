@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+目录内存快照模块
+将MySQL中的全部表结构元数据一次性加载到内存，查询接口直接从内存返回结果；
+后台线程检测到目录版本号变化后重新加载并原子替换快照
+"""
+
+import os
+import time
+import bisect
+import threading
+import traceback
+from datetime import datetime
+
+import pymysql
+from database import get_db_connection, get_catalog_generation
+from search_index import ColumnEntry, ColumnSearchIndex, TableSearchIndex
+
+# 快照配置 - 支持环境变量覆盖默认值
+SNAPSHOT_CONFIG = {
+    'enabled': os.environ.get('CATALOG_MODE', 'database') == 'snapshot',  # database: 查询MySQL；snapshot: 内存快照
+    'refresh_interval': float(os.environ.get('SNAPSHOT_REFRESH_INTERVAL', '30')),  # 检查目录版本号的间隔秒数
+}
+
+class ColumnRecord:
+    """列信息"""
+    __slots__ = ('column_name', 'data_type', 'nullable', 'default_value', 'comment', 'column_id')
+
+    def __init__(self, column_name, data_type, nullable, default_value, comment, column_id):
+        self.column_name = column_name
+        self.data_type = data_type
+        self.nullable = nullable
+        self.default_value = default_value
+        self.comment = comment
+        self.column_id = column_id
+
+
+class TableRecord:
+    """表信息，外键和索引以元组形式保存以节省内存"""
+    __slots__ = ('id', 'owner', 'table_name', 'comment', 'rows_count', 'last_analyzed',
+                 'columns', 'primary_keys', 'foreign_keys', 'indices')
+
+    def __init__(self, id, owner, table_name, comment, rows_count, last_analyzed):
+        self.id = id
+        self.owner = owner
+        self.table_name = table_name
+        self.comment = comment
+        self.rows_count = rows_count
+        self.last_analyzed = last_analyzed
+        self.columns = []
+        self.primary_keys = []
+        self.foreign_keys = []  # (constraint_name, column_name, referenced_table, referenced_column)
+        self.indices = []  # (index_name, index_type, uniqueness, column_name, status)
+
+    def to_result(self):
+        """转换为与数据库查询一致的接口返回结构"""
+        primary_keys = set(self.primary_keys)
+        return {
+            'table_info': {
+                'owner': self.owner,
+                'table_name': self.table_name,
+                'comment': self.comment or '',
+                'rows_count': self.rows_count,
+                'last_analyzed': self.last_analyzed.isoformat() if self.last_analyzed else None
+            },
+            'columns': [
+                {
+                    'column_name': c.column_name,
+                    'data_type': c.data_type,
+                    'nullable': c.nullable,
+                    'default_value': c.default_value,
+                    'comment': c.comment,
+                    'column_id': c.column_id,
+                    'is_primary_key': c.column_name in primary_keys
+                }
+                for c in self.columns
+            ],
+            'primary_keys': list(self.primary_keys),
+            'foreign_keys': [
+                {
+                    'constraint_name': fk[0],
+                    'column_name': fk[1],
+                    'referenced_table': fk[2],
+                    'referenced_column': fk[3]
+                }
+                for fk in self.foreign_keys
+            ],
+            'indices': [
+                {
+                    'index_name': idx[0],
+                    'index_type': idx[1],
+                    'uniqueness': idx[2],
+                    'column_name': idx[3],
+                    'status': idx[4]
+                }
+                for idx in self.indices
+            ]
+        }
+
+
+class CatalogSnapshot:
+    """不可变的目录快照，按 (owner, table_name) 建立索引"""
+
+    def __init__(self, tables, generation, load_seconds):
+        self.generation = generation
+        self.loaded_at = datetime.now()
+        self.load_seconds = load_seconds
+        # 与MySQL查询保持一致：按owner、表名排序，匹配时不区分大小写
+        self.tables = sorted(tables, key=lambda t: (t.owner.upper(), t.table_name.upper()))
+        self.tables_by_key = {(t.owner.upper(), t.table_name.upper()): t for t in self.tables}
+        self.tables_by_owner = {}
+        self.tables_by_name = {}
+        for table in self.tables:
+            self.tables_by_owner.setdefault(table.owner.upper(), []).append(table)
+            self.tables_by_name.setdefault(table.table_name.upper(), []).append(table)
+        # 按表名排序的索引，用于前缀匹配时二分查找
+        by_name = sorted(self.tables, key=lambda t: (t.table_name.upper(), t.owner.upper()))
+        self._sorted_names = [t.table_name.upper() for t in by_name]
+        self._sorted_by_name = by_name
+        self.column_count = sum(len(t.columns) for t in self.tables)
+        self.table_search_index = TableSearchIndex(self.tables)
+        self.column_search_index = ColumnSearchIndex(
+            ColumnEntry(t.owner, t.table_name, c.column_name, c.data_type, c.comment)
+            for t in self.tables for c in t.columns
+        )
+
+    def find_tables(self, table_name, owner=None, mode='exact'):
+        """
+        按匹配方式查找表
+
+        Args:
+            table_name: 表名
+            owner: 表所有者（可选）
+            mode: exact 精确匹配，prefix 前缀匹配，fuzzy 包含匹配
+
+        Returns:
+            list: 匹配的表，按owner、表名排序
+        """
+        name = table_name.upper()
+        owner = owner.upper() if owner else None
+
+        if mode == 'exact':
+            if owner:
+                table = self.tables_by_key.get((owner, name))
+                return [table] if table else []
+            return list(self.tables_by_name.get(name, []))
+
+        if mode == 'prefix':
+            tables = []
+            position = bisect.bisect_left(self._sorted_names, name)
+            while position < len(self._sorted_names) and self._sorted_names[position].startswith(name):
+                tables.append(self._sorted_by_name[position])
+                position += 1
+            tables.sort(key=lambda t: (t.owner.upper(), t.table_name.upper()))
+        else:
+            index = self.table_search_index
+            tables = [index.entries[doc_id] for doc_id in sorted(index.names.search(name))]
+
+        if owner:
+            tables = [t for t in tables if t.owner.upper() == owner]
+        return tables
+
+    def stats(self):
+        """返回快照统计信息"""
+        return {
+            'generation': self.generation,
+            'tables': len(self.tables),
+            'columns': self.column_count,
+            'loaded_at': self.loaded_at.isoformat(),
+            'load_seconds': round(self.load_seconds, 3)
+        }
+
+
+def load_catalog_snapshot():
+    """从MySQL加载全部元数据表，构建目录快照"""
+    start_time = time.time()
+    generation = get_catalog_generation()
+    tables = {}
+
+    with get_db_connection() as conn:
+        # 在同一个一致性读事务内读取五张表，避免读到分析工具写入一半的数据
+        conn.begin()
+        try:
+            with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute("""
+                SELECT id, owner, table_name, comment, rows_count, last_analyzed
+                FROM oracle_tables
+                """)
+                for row in cursor:
+                    tables[row[0]] = TableRecord(*row)
+
+                cursor.execute("""
+                SELECT table_id, column_name, data_type, nullable, default_value, comment, column_id
+                FROM oracle_columns
+                ORDER BY table_id, column_id
+                """)
+                for row in cursor:
+                    table = tables.get(row[0])
+                    if table is not None:
+                        table.columns.append(ColumnRecord(*row[1:]))
+
+                cursor.execute("SELECT table_id, column_name FROM oracle_primary_keys")
+                for row in cursor:
+                    table = tables.get(row[0])
+                    if table is not None:
+                        table.primary_keys.append(row[1])
+
+                cursor.execute("""
+                SELECT table_id, constraint_name, column_name, referenced_table, referenced_column
+                FROM oracle_foreign_keys
+                """)
+                for row in cursor:
+                    table = tables.get(row[0])
+                    if table is not None:
+                        table.foreign_keys.append(tuple(row[1:]))
+
+                cursor.execute("""
+                SELECT table_id, index_name, index_type, uniqueness, column_name, status
+                FROM oracle_indices
+                """)
+                for row in cursor:
+                    table = tables.get(row[0])
+                    if table is not None:
+                        table.indices.append(tuple(row[1:]))
+        finally:
+            conn.commit()
+
+    return CatalogSnapshot(tables.values(), generation, time.time() - start_time)
+
+
+class SnapshotManager:
+    """持有当前快照，并在后台检测目录版本号变化后刷新"""
+
+    def __init__(self, refresh_interval=30.0):
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._refreshes = 0
+        self._refresh_errors = 0
+
+    def current(self):
+        """返回当前快照，未启用时返回None"""
+        return self._snapshot
+
+    def load(self):
+        """加载新快照并原子替换"""
+        snapshot = load_catalog_snapshot()
+        # 引用赋值是原子操作，正在处理的请求继续使用旧快照
+        self._snapshot = snapshot
+        self._refreshes += 1
+        print(f"目录快照已加载: {snapshot.stats()}")
+        return snapshot
+
+    def start(self):
+        """同步加载首个快照并启动后台刷新线程"""
+        self.load()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name='catalog-snapshot-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止后台刷新线程"""
+        self._stop.set()
+
+    def _refresh_loop(self):
+        """后台刷新循环：目录版本号变化时重新加载"""
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                generation = get_catalog_generation()
+                if self._snapshot is None or generation != self._snapshot.generation:
+                    self.load()
+            except Exception as e:
+                self._refresh_errors += 1
+                print(f"刷新目录快照失败: {e}")
+                traceback.print_exc()
+
+    def stats(self):
+        """返回快照统计信息"""
+        snapshot = self._snapshot
+        stats = snapshot.stats() if snapshot else {}
+        stats['enabled'] = snapshot is not None
+        stats['refreshes'] = self._refreshes
+        stats['refresh_errors'] = self._refresh_errors
+        return stats
+
+
+catalog_snapshots = SnapshotManager(SNAPSHOT_CONFIG['refresh_interval'])
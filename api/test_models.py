@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+数据模型模块测试
+使用模拟的pymysql连接和游标，不需要连接真实数据库
+
+用法:
+    cd api && python -m unittest test_models
+"""
+
+import contextlib
+import unittest
+from unittest import mock
+
+import pymysql
+
+# database模块导入时会连接数据库并预热连接池，测试中替换为模拟连接
+with mock.patch('pymysql.connect'):
+    import models
+
+
+class FakeCursor:
+    """模拟多语句DictCursor：按SQL内容返回预设的结果集，空的 IN () 与MySQL一样报语法错误"""
+
+    def __init__(self, tables):
+        self.tables = tables  # {(OWNER, TABLE_NAME): 表注释}
+        self.result_sets = []
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def execute(self, query, params=None):
+        if 'IN ()' in query:
+            raise pymysql.err.ProgrammingError(1064, "You have an error in your SQL syntax")
+        if query.lstrip().startswith('SET'):
+            self.result_sets = [None]
+        elif query is models.OWNER_HASH_QUERY:
+            owner = params[0].upper()
+            rows = [{'table_name': table_name, 'comment': comment}
+                    for (table_owner, table_name), comment in self.tables.items() if table_owner == owner]
+            self.result_sets = [rows, [], [], [], []]
+        elif 'LIMIT 1' in query:
+            owner = params[0].upper()
+            self.result_sets = [[(1,)] if any(key[0] == owner for key in self.tables) else []]
+        elif 'FROM oracle_tables' in query:
+            pairs = {(params[i].upper(), params[i + 1].upper()) for i in range(0, len(params), 2)}
+            self.result_sets = [[
+                {'id': position, 'owner': owner, 'table_name': table_name, 'comment': comment,
+                 'rows_count': 0, 'last_analyzed': None}
+                for position, ((owner, table_name), comment) in enumerate(self.tables.items(), start=1)
+                if (owner, table_name) in pairs
+            ]]
+        else:
+            # TABLE_CHILDREN_BATCH_QUERY：四张子表均无数据
+            self.result_sets = [[], [], [], []]
+        self._advance()
+
+    def _advance(self):
+        rows = self.result_sets.pop(0)
+        self.description = None if rows is None else ('table_name',)
+        self._rows = rows or []
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def nextset(self):
+        if not self.result_sets:
+            return None
+        self._advance()
+        return True
+
+
+class OwnerDiffTest(unittest.TestCase):
+    """按所有者比较目录"""
+
+    def diff(self, tables, from_owner='DEV', to_owner='PROD'):
+        cursor = FakeCursor(tables)
+        connection = mock.Mock()
+        connection.cursor.return_value = cursor
+
+        @contextlib.contextmanager
+        def fake_connection(multi_statements=False):
+            yield connection
+
+        with mock.patch.object(models, 'get_db_connection', fake_connection), \
+                mock.patch.object(models.catalog_snapshots, 'current', return_value=None):
+            return list(models.diff_catalog(from_owner, to_owner))
+
+    def test_table_only_in_target_owner(self):
+        """一批差异表全部只在一边存在时，另一边不执行空的 IN () 查询"""
+        records = self.diff({('DEV', 'ORDERS'): '订单', ('PROD', 'ORDERS'): '订单', ('PROD', 'AUDIT_LOG'): '审计'})
+        tables = [record for record in records if record['type'] == 'table']
+        self.assertEqual([(t['table_name'], t['change_type']) for t in tables], [('AUDIT_LOG', 'added')])
+        self.assertEqual(records[-1], {'type': 'summary', 'added': 1, 'changed': 0, 'removed': 0})
+
+    def test_table_only_in_source_owner(self):
+        records = self.diff({('DEV', 'ORDERS'): '订单', ('DEV', 'TMP_ORDERS'): None, ('PROD', 'ORDERS'): '订单'})
+        tables = [record for record in records if record['type'] == 'table']
+        self.assertEqual([(t['table_name'], t['change_type']) for t in tables], [('TMP_ORDERS', 'removed')])
+
+    def test_query_tables_batch_without_pairs(self):
+        self.assertEqual(models._query_tables_batch(FakeCursor({}), []), {})
+
+
+
+class ExportCursor:
+    """模拟导出使用的DictCursor：记录事务状态，按 (owner, table_name) 键集返回表"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def execute(self, query, params=None):
+        connection = self.connection
+        if query.startswith('START TRANSACTION'):
+            connection.in_transaction = True
+            connection.snapshots += 1
+            self._rows = []
+        elif 'oracle_catalog_meta' in query:
+            self._rows = [{'generation': connection.generations[min(connection.snapshots, len(connection.generations)) - 1]}]
+        elif 'FROM oracle_tables' in query:
+            last_key = (params[0], params[2]) if params else None
+            self._rows = [dict(table) for table in connection.tables
+                          if last_key is None or (table['owner'], table['table_name']) > last_key][:models.EXPORT_CHUNK_SIZE]
+        else:
+            self._rows = [{'table_id': table_id, 'column_name': 'ID'} for table_id in params] if 'primary_keys' in query else []
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+
+class ExportConnection:
+    """模拟独立于连接池的导出连接，generations为各批快照中依次读到的目录版本号"""
+
+    def __init__(self, tables, generations):
+        self.tables = tables
+        self.generations = generations
+        self.in_transaction = False
+        self.snapshots = 0
+
+    def cursor(self, cursor_class=None):
+        return ExportCursor(self)
+
+    def commit(self):
+        self.in_transaction = False
+
+    def close(self):
+        self.in_transaction = False
+
+
+class CatalogExportTest(unittest.TestCase):
+    """流式导出目录"""
+
+    TABLES = [{'id': table_id, 'owner': owner, 'table_name': table_name, 'comment': None,
+               'rows_count': 0, 'last_analyzed': None}
+              for table_id, (owner, table_name) in enumerate(
+                  [('APP', 'A'), ('APP', 'B'), ('APP', 'C'), ('HR', 'A'), ('HR', 'EMP')], start=1)]
+
+    def export(self, connection):
+        with mock.patch.object(models, 'create_streaming_connection', return_value=connection), \
+                mock.patch.object(models.catalog_snapshots, 'current', return_value=None), \
+                mock.patch.object(models, 'EXPORT_CHUNK_SIZE', 2):
+            for result in models.iter_catalog_export():
+                # 输出结果时事务已经提交，客户端接收速度不影响元数据锁
+                self.assertFalse(connection.in_transaction)
+                yield result
+
+    def test_chunks_are_read_in_short_transactions(self):
+        connection = ExportConnection(self.TABLES, [7])
+        results = list(self.export(connection))
+        self.assertEqual([(r['table_info']['owner'], r['table_info']['table_name']) for r in results],
+                         [('APP', 'A'), ('APP', 'B'), ('APP', 'C'), ('HR', 'A'), ('HR', 'EMP')])
+        self.assertEqual(results[0]['primary_keys'], ['ID'])
+        self.assertEqual(connection.snapshots, 4)
+
+    def test_generation_change_aborts_export(self):
+        connection = ExportConnection(self.TABLES, [7, 7, 8])
+        results = []
+        with self.assertRaises(models.CatalogChangedError):
+            for result in self.export(connection):
+                results.append(result)
+        self.assertEqual(len(results), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()